@@ -5,6 +5,17 @@
   Arduino -> Raspberry Pi serial payload (one JSON line per sample):
   {"pir":1,"dht11_temp_c":29.0,"dht11_humidity":61.0,"lm393_raw":678,"lm393_lux":337.5}
 
+  Build with -DBINARY_FRAMES to send compact binary frames instead (set
+  SERIAL_FRAME_FORMAT=binary or auto on the Pi). Each frame is a 14-byte
+  little-endian struct, COBS-encoded and terminated by a 0x00 byte (16 bytes on the wire):
+    uint8  version (1)
+    uint8  pir
+    int16  dht11_temp_c * 10
+    uint16 dht11_humidity * 10
+    uint16 lm393_raw
+    uint32 lm393_lux * 10
+    uint16 CRC-16/CCITT-FALSE of the 12 bytes above
+
   Library needed:
   - DHT sensor library by Adafruit
 */
@@ -13,7 +24,15 @@
 #define DHT_TYPE DHT11
 #define PIR_PIN 3
 #define LM393_ANALOG_PIN A0
+#ifndef SAMPLE_INTERVAL_MS
 #define SAMPLE_INTERVAL_MS 2000
+#endif
+
+#ifdef BINARY_FRAMES
+#define FRAME_VERSION 1
+#define FRAME_BODY_SIZE 12
+#define FRAME_SIZE (FRAME_BODY_SIZE + 2)
+#endif
 
 DHT dht(DHT_PIN, DHT_TYPE);
 unsigned long last_sample_ms = 0;
@@ -34,6 +53,71 @@ static float lm393_raw_to_lux(int raw_value) {
   return (static_cast<float>(clamped) / 1023.0f) * 1000.0f;
 }
 
+#ifdef BINARY_FRAMES
+static uint16_t crc16_ccitt(const uint8_t *data, size_t length) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < length; i++) {
+    crc ^= static_cast<uint16_t>(data[i]) << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? static_cast<uint16_t>((crc << 1) ^ 0x1021) : static_cast<uint16_t>(crc << 1);
+    }
+  }
+  return crc;
+}
+
+static void put_u16(uint8_t *dst, uint16_t value) {
+  dst[0] = value & 0xFF;
+  dst[1] = value >> 8;
+}
+
+static void put_u32(uint8_t *dst, uint32_t value) {
+  dst[0] = value & 0xFF;
+  dst[1] = (value >> 8) & 0xFF;
+  dst[2] = (value >> 16) & 0xFF;
+  dst[3] = value >> 24;
+}
+
+static size_t cobs_encode(const uint8_t *src, size_t length, uint8_t *dst) {
+  size_t write_index = 1;
+  size_t code_index = 0;
+  uint8_t code = 1;
+  for (size_t read_index = 0; read_index < length; read_index++) {
+    if (src[read_index] == 0) {
+      dst[code_index] = code;
+      code_index = write_index++;
+      code = 1;
+      continue;
+    }
+    dst[write_index++] = src[read_index];
+    code++;
+    if (code == 0xFF) {
+      dst[code_index] = code;
+      code_index = write_index++;
+      code = 1;
+    }
+  }
+  dst[code_index] = code;
+  return write_index;
+}
+
+static void send_binary_frame(int pir, float temp_c, float humidity, int lm393_raw, float lm393_lux) {
+  uint8_t frame[FRAME_SIZE];
+  uint8_t encoded[FRAME_SIZE + 2];
+
+  frame[0] = FRAME_VERSION;
+  frame[1] = static_cast<uint8_t>(pir);
+  put_u16(&frame[2], static_cast<uint16_t>(static_cast<int16_t>(lroundf(temp_c * 10.0f))));
+  put_u16(&frame[4], static_cast<uint16_t>(lroundf(humidity * 10.0f)));
+  put_u16(&frame[6], static_cast<uint16_t>(lm393_raw));
+  put_u32(&frame[8], static_cast<uint32_t>(lroundf(lm393_lux * 10.0f)));
+  put_u16(&frame[FRAME_BODY_SIZE], crc16_ccitt(frame, FRAME_BODY_SIZE));
+
+  const size_t encoded_length = cobs_encode(frame, FRAME_SIZE, encoded);
+  encoded[encoded_length] = 0x00;
+  Serial.write(encoded, encoded_length + 1);
+}
+#endif
+
 void setup() {
   Serial.begin(9600);
   pinMode(PIR_PIN, INPUT);
@@ -65,6 +149,9 @@ void loop() {
   const int lm393_raw = clamp_int(analogRead(LM393_ANALOG_PIN), 0, 1023);
   const float lm393_lux = lm393_raw_to_lux(lm393_raw);
 
+#ifdef BINARY_FRAMES
+  send_binary_frame(pir, temp_c, humidity, lm393_raw, lm393_lux);
+#else
   Serial.print("{\"pir\":");
   Serial.print(pir);
   Serial.print(",\"dht11_temp_c\":");
@@ -76,4 +163,5 @@ void loop() {
   Serial.print(",\"lm393_lux\":");
   Serial.print(lm393_lux, 1);
   Serial.println("}");
+#endif
 }
@@ -0,0 +1,67 @@
+"""Sensor publish throughput at QoS 0 vs QoS 1 against a live broker (default: local mosquitto).
+
+Run with: PYTHONPATH=src python benchmarks/bench_mqtt_qos.py [messages] [host] [port]
+"""
+from __future__ import annotations
+
+from dataclasses import replace
+import sys
+import time
+
+from bridge.config import from_env
+from bridge.mqtt_client import MQTTBridgeClient, mqtt
+
+PAYLOAD = {
+    "device_id": "bench-01",
+    "source": "arduino-serial",
+    "received_at": "2026-02-16T12:00:00+00:00",
+    "sensors": {"pir": 1, "dht11_temp_c": 28.5, "dht11_humidity": 62.0, "lm393_raw": 678, "lm393_lux": 337.5},
+}
+
+
+def _measure(config, qos: int, count: int) -> float:
+    bridge = MQTTBridgeClient(
+        replace(config, mqtt_sensor_qos=qos, mqtt_sensor_topic=f"bench/pi/sensors/qos{qos}"),
+        on_command=lambda _payload, _topic: None,
+    )
+    bridge.connect()
+    try:
+        start = time.perf_counter()
+        sent = 0
+        while sent < count:
+            if bridge.publish_sensor(PAYLOAD):
+                sent += 1
+        while bridge.inflight:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        stats = bridge.publish_stats()
+    finally:
+        bridge.close()
+
+    latency = next(iter(stats["latency"].values()), {})
+    rate = count / elapsed
+    print(
+        f"qos={qos} {rate:>12,.0f} msgs/sec"
+        f"  p50={latency.get('p50_ms') or 0:.2f}ms p99={latency.get('p99_ms') or 0:.2f}ms"
+        f"  backpressure={stats['backpressure_rejections']}"
+    )
+    return rate
+
+
+def main() -> None:
+    if mqtt is None:
+        sys.exit("paho-mqtt is required for this benchmark")
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    config = from_env()
+    if len(sys.argv) > 2:
+        config = replace(config, mqtt_host=sys.argv[2])
+    if len(sys.argv) > 3:
+        config = replace(config, mqtt_port=int(sys.argv[3]))
+
+    qos1 = _measure(config, 1, count)
+    qos0 = _measure(config, 0, count)
+    print(f"qos0/qos1: {qos0 / qos1:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Frames/sec of parse_serial_line() fast path vs the generic decode + json.loads path.
+
+Run with: PYTHONPATH=src python benchmarks/bench_parse_serial_line.py [frames]
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+from bridge.serial_reader import _parse_json_line, parse_serial_line
+
+FRAME = b'{"pir":1,"dht11_temp_c":28.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}'
+
+
+def _generic(frame: bytes) -> dict[str, float | int]:
+    return _parse_json_line(frame.decode("utf-8", errors="ignore").strip())
+
+
+def _measure(label: str, parse, frame, count: int, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(count):
+            parse(frame)
+        best = min(best, time.perf_counter() - start)
+    rate = count / best
+    print(f"{label:<28} {rate:>12,.0f} frames/sec")
+    return rate
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    assert parse_serial_line(FRAME) == _generic(FRAME)
+
+    baseline = _measure("generic (decode+json)", _generic, FRAME, count)
+    fast = _measure("fast path (bytes)", parse_serial_line, FRAME, count)
+    _measure("fast path (memoryview)", parse_serial_line, memoryview(FRAME), count)
+    print(f"speedup: {fast / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import functools
+import logging
+import signal
+from typing import Any, Callable
+
+from .command_dispatcher import command_device_id
+from .command_limiter import CommandLimiter
+from .config import Config
+from .main import (
+    SensorFrameProcessor,
+    build_audit_log,
+    build_automation,
+    build_command_callback,
+    build_command_limiter,
+    build_deadband_filter,
+    build_limited_callback,
+    build_request_cache,
+    build_sensor_batcher,
+    build_sensor_store,
+    build_serial_source,
+    build_spool,
+)
+from .mqtt_client import MQTTBridgeClient
+from .serial_hub import SerialHub
+from .serial_reader import SerialReader
+
+LOGGER = logging.getLogger(__name__)
+
+MQTT_ERR_NO_CONN = 4
+
+
+class AsyncSerialTransport:
+    def __init__(
+        self,
+        source: SerialReader | SerialHub,
+        device_id: str,
+        on_frame: Callable[[str, bytes, datetime], None],
+        retry_delay: float = 1.0,
+    ) -> None:
+        self._source = source
+        self._device_id = device_id
+        self._on_frame = on_frame
+        self.retry_delay = retry_delay
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        rescan_task = None
+        if isinstance(self._source, SerialHub):
+            rescan_task = asyncio.create_task(self._rescan_loop())
+        try:
+            while True:
+                fd = await self._open(loop)
+                lost: asyncio.Future[None] = loop.create_future()
+                loop.add_reader(fd, self._on_readable, lost)
+                try:
+                    await lost
+                finally:
+                    loop.remove_reader(fd)
+                await asyncio.sleep(self.retry_delay)
+        finally:
+            if rescan_task is not None:
+                rescan_task.cancel()
+
+    async def _open(self, loop: asyncio.AbstractEventLoop) -> int:
+        if isinstance(self._source, SerialHub):
+            self._source.rescan()
+            return self._source.fileno()
+
+        while True:
+            await loop.run_in_executor(None, self._source.connect)
+            fd = self._source.fileno()
+            if fd is not None:
+                return fd
+            if self._source.connected:
+                raise RuntimeError("asyncio runtime requires a serial port with a selectable file descriptor")
+
+    async def _rescan_loop(self) -> None:
+        assert isinstance(self._source, SerialHub)
+        while True:
+            await asyncio.sleep(self._source.rescan_interval)
+            self._source.rescan()
+
+    def _on_readable(self, lost: asyncio.Future[None]) -> None:
+        if isinstance(self._source, SerialHub):
+            frames = self._source.poll(timeout=0.0)
+        else:
+            frames = [(self._device_id, frame) for frame in self._source.read_available()]
+
+        if frames:
+            received_at = datetime.now(timezone.utc)
+            for device_id, frame in frames:
+                self._on_frame(device_id, frame, received_at)
+
+        if isinstance(self._source, SerialReader) and not self._source.connected and not lost.done():
+            lost.set_result(None)
+
+
+class AsyncMQTTAdapter:
+    def __init__(self, bridge: MQTTBridgeClient, misc_interval: float = 1.0) -> None:
+        self._bridge = bridge
+        self.misc_interval = misc_interval
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._misc_task: asyncio.Task[None] | None = None
+
+    async def connect(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self._loop.run_in_executor(None, functools.partial(self._bridge.connect, start_loop=False))
+
+        client = self._bridge.client
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+
+        sock = client.socket()
+        if sock is not None:
+            self._add_socket(sock)
+            if client.want_write():
+                self._loop.add_writer(sock, client.loop_write)
+        self._misc_task = asyncio.create_task(self._misc_loop())
+
+    def _call_in_loop(self, callback: Callable[..., None], *args: Any) -> None:
+        assert self._loop is not None
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    def _add_socket(self, sock: Any) -> None:
+        assert self._loop is not None
+        self._loop.add_reader(sock, self._bridge.client.loop_read)
+
+    def _on_socket_open(self, _client: Any, _userdata: Any, sock: Any) -> None:
+        self._call_in_loop(self._add_socket, sock)
+
+    def _on_socket_close(self, _client: Any, _userdata: Any, sock: Any) -> None:
+        assert self._loop is not None
+        self._call_in_loop(self._loop.remove_reader, sock)
+
+    def _on_socket_register_write(self, client: Any, _userdata: Any, sock: Any) -> None:
+        assert self._loop is not None
+        self._call_in_loop(self._loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, _client: Any, _userdata: Any, sock: Any) -> None:
+        assert self._loop is not None
+        self._call_in_loop(self._loop.remove_writer, sock)
+
+    async def _misc_loop(self) -> None:
+        assert self._loop is not None
+        while True:
+            await asyncio.sleep(self.misc_interval)
+            client = self._bridge.client
+            if client is None:
+                return
+            if client.loop_misc() != MQTT_ERR_NO_CONN:
+                continue
+            try:
+                await self._loop.run_in_executor(None, client.reconnect)
+                LOGGER.info("MQTT reconnected")
+            except Exception as exc:
+                LOGGER.warning("MQTT reconnect failed: %s", exc)
+
+    async def close(self) -> None:
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+            try:
+                await self._misc_task
+            except asyncio.CancelledError:
+                pass
+            self._misc_task = None
+
+        client = self._bridge.client
+        if client is not None and self._loop is not None:
+            sock = client.socket()
+            if sock is not None:
+                self._loop.remove_reader(sock)
+                self._loop.remove_writer(sock)
+        self._bridge.close()
+
+
+class AsyncCommandRunner:
+    def __init__(
+        self,
+        handler: Callable[[str, str], dict[str, Any]],
+        workers: int = 1,
+        limiter: CommandLimiter | None = None,
+        on_limited: Callable[[str, str, str], dict[str, Any] | None] | None = None,
+    ) -> None:
+        self._handler = handler
+        self._limiter = limiter
+        self._on_limited = on_limited
+        self._bridge: MQTTBridgeClient | None = None
+        # Single-thread executors keep per-device order while the file I/O stays off the event loop.
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"commands-{idx}") for idx in range(max(1, workers))
+        ]
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def bind(self, bridge: MQTTBridgeClient) -> None:
+        self._bridge = bridge
+
+    def submit(self, payload: str, topic: str) -> None:
+        device_id = command_device_id(payload)
+        ticket = 0
+        if self._limiter is not None and device_id is not None:
+            ticket = self._limiter.admit(device_id)
+        task = asyncio.get_running_loop().create_task(self._handle(payload, topic, device_id, ticket))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, payload: str, topic: str, device_id: str | None, ticket: int) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            if ticket:
+                if self._limiter.coalesce_seconds > 0:
+                    await asyncio.sleep(self._limiter.coalesce_seconds)
+                verdict = self._limiter.check(device_id, ticket)
+                if verdict is not None:
+                    ack = self._on_limited(payload, topic, verdict) if self._on_limited is not None else None
+                    self._publish_ack(ack)
+                    return
+            executor = self._executors[hash(device_id or topic) % len(self._executors)]
+            ack = await loop.run_in_executor(executor, self._handler, payload, topic)
+        except Exception:
+            LOGGER.exception("Command handler failed for topic %s", topic)
+            return
+        self._publish_ack(ack)
+
+    def _publish_ack(self, ack: dict[str, Any] | None) -> None:
+        if self._bridge is None or ack is None:
+            return
+        ack_topic = ack.pop("_ack_topic", None)
+        self._bridge.publish_ack(ack, topic=ack_topic)
+
+    async def drain(self, timeout: float = 5.0) -> None:
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+        for executor in self._executors:
+            executor.shutdown(wait=False)
+
+
+async def _tick_loop(processor: SensorFrameProcessor, interval: float) -> None:
+    while True:
+        await asyncio.sleep(processor.next_tick_in(interval))
+        processor.tick()
+
+
+async def run_bridge(config: Config, stop_event: asyncio.Event | None = None) -> None:
+    loop = asyncio.get_running_loop()
+    stop_event = stop_event or asyncio.Event()
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    audit_log = build_audit_log(config)
+    request_cache = build_request_cache(config)
+    limiter = build_command_limiter(config)
+    automation = build_automation(config)
+    commands = AsyncCommandRunner(
+        build_command_callback(config, audit_log, request_cache, automation=automation, limiter=limiter),
+        workers=config.command_workers,
+        limiter=limiter,
+        on_limited=build_limited_callback(config),
+    )
+    spool = build_spool(config)
+    mqtt_client = MQTTBridgeClient(config, on_command=commands.submit, spool=spool)
+    commands.bind(mqtt_client)
+    mqtt = AsyncMQTTAdapter(mqtt_client)
+
+    serial_source, _read_frames = build_serial_source(config)
+    store = build_sensor_store(config)
+    processor = SensorFrameProcessor(
+        mqtt_client,
+        automation,
+        batcher=build_sensor_batcher(config),
+        publish_single=config.mqtt_sensor_single_enabled,
+        deadband=build_deadband_filter(config),
+        snapshot_path=config.automation_snapshot_path,
+        snapshot_interval=config.automation_snapshot_interval_seconds,
+        local_dispatch=config.automation_local_dispatch,
+        store=store,
+        frame_format=config.serial_frame_format,
+    )
+    transport = AsyncSerialTransport(serial_source, config.device_id, on_frame=processor.process)
+
+    await mqtt.connect()
+    serial_task = asyncio.create_task(transport.run())
+    tick_task = asyncio.create_task(_tick_loop(processor, config.serial_timeout))
+    stop_task = asyncio.create_task(stop_event.wait())
+    try:
+        done, _pending = await asyncio.wait({serial_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        if serial_task in done:
+            serial_task.result()
+        LOGGER.info("Shutting down asyncio runtime")
+    finally:
+        for task in (serial_task, tick_task, stop_task):
+            task.cancel()
+        await asyncio.gather(serial_task, tick_task, stop_task, return_exceptions=True)
+        # In-flight commands confirm device state from their ACKs, so drain them before the final snapshot.
+        await commands.drain()
+        processor.flush()
+        serial_source.close()
+        LOGGER.info("MQTT publish stats at shutdown: %s", mqtt_client.publish_stats())
+        await mqtt.close()
+        audit_log.close()
+        if request_cache is not None:
+            LOGGER.info("Command dedup cache stats at shutdown: %s", request_cache.stats())
+        if limiter is not None:
+            LOGGER.info("Command limiter stats at shutdown: %s", limiter.stats())
+        if spool is not None:
+            LOGGER.info("Spool stats at shutdown: %s", spool.stats())
+            spool.close()
+        if store is not None:
+            LOGGER.info("Sensor store stats at shutdown: %s", store.stats())
+            store.close()
+
+
+def run_async(config: Config) -> None:
+    asyncio.run(run_bridge(config))
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+LOGGER = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("none", "interval", "batch")
+
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+INDEX_SUFFIX = ".idx.json"
+
+
+def rotated_segment_path(log_path: Path, stamp: str, seq: int) -> Path:
+    return log_path.with_name(f"{log_path.stem}.{stamp}-{seq:06d}{log_path.suffix}")
+
+
+def pending_segments(log_path: Path) -> list[Path]:
+    return sorted(log_path.parent.glob(f"{log_path.stem}.*-*{log_path.suffix}"))
+
+
+def compressed_segments(log_path: Path) -> list[Path]:
+    return sorted(log_path.parent.glob(f"{log_path.stem}.*-*{log_path.suffix}.gz"))
+
+
+def segment_index_path(segment_path: Path) -> Path:
+    name = segment_path.name
+    if name.endswith(".gz"):
+        name = name[: -len(".gz")]
+    return segment_path.with_name(Path(name).stem + INDEX_SUFFIX)
+
+
+def record_request_id(record: Any) -> str | None:
+    if not isinstance(record, dict):
+        return None
+    command = record.get("command")
+    if isinstance(command, dict) and isinstance(command.get("requestId"), str):
+        return command["requestId"]
+    request_id = record.get("requestId")
+    return request_id if isinstance(request_id, str) else None
+
+
+def record_timestamp(record: Any) -> datetime | None:
+    if not isinstance(record, dict):
+        return None
+    raw = record.get("receivedAt") or record.get("received_at")
+    if not isinstance(raw, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(raw)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def compress_segment(path: Path, block_bytes: int = 65536) -> Path:
+    gz_path = path.with_name(path.name + ".gz")
+    tmp_path = gz_path.with_name(gz_path.name + ".tmp")
+    blocks: list[dict[str, Any]] = []
+    requests: dict[str, list[list[int]]] = {}
+
+    block: list[bytes] = []
+    block_size = 0
+    first_ts: datetime | None = None
+    last_ts: datetime | None = None
+
+    with path.open("rb") as src, tmp_path.open("wb") as dst:
+
+        def _write_block() -> None:
+            # Each block is its own gzip member, so a reader can inflate just that block.
+            compressed = gzip.compress(b"".join(block), mtime=0)
+            blocks.append(
+                {
+                    "offset": dst.tell(),
+                    "length": len(compressed),
+                    "lines": len(block),
+                    "first_ts": first_ts.isoformat() if first_ts else None,
+                    "last_ts": last_ts.isoformat() if last_ts else None,
+                }
+            )
+            dst.write(compressed)
+
+        for line in src:
+            if block and block_size + len(line) > block_bytes:
+                _write_block()
+                block, block_size, first_ts, last_ts = [], 0, None, None
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            request_id = record_request_id(record)
+            if request_id is not None:
+                requests.setdefault(request_id, []).append([len(blocks), block_size])
+            ts = record_timestamp(record)
+            if ts is not None:
+                first_ts = ts if first_ts is None or ts < first_ts else first_ts
+                last_ts = ts if last_ts is None or ts > last_ts else last_ts
+            block.append(line)
+            block_size += len(line)
+        if block:
+            _write_block()
+        dst.flush()
+        os.fsync(dst.fileno())
+
+    starts = [block["first_ts"] for block in blocks if block["first_ts"]]
+    ends = [block["last_ts"] for block in blocks if block["last_ts"]]
+    index = {
+        "segment": gz_path.name,
+        "first_ts": min(starts, key=datetime.fromisoformat) if starts else None,
+        "last_ts": max(ends, key=datetime.fromisoformat) if ends else None,
+        "blocks": blocks,
+        "requests": requests,
+    }
+    index_path = segment_index_path(gz_path)
+    index_tmp = index_path.with_name(index_path.name + ".tmp")
+    index_tmp.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_path, gz_path)
+    os.replace(index_tmp, index_path)
+    path.unlink()
+    return gz_path
+
+
+class AuditLogWriter:
+    def __init__(
+        self,
+        path: str | Path,
+        max_batch_bytes: int = 65536,
+        flush_interval: float = 1.0,
+        fsync_policy: str = "interval",
+        fsync_interval: float = 5.0,
+        rotate_bytes: int = 0,
+        rotate_seconds: float = 0.0,
+        max_segments: int = 0,
+        index_block_bytes: int = 65536,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of: {', '.join(FSYNC_POLICIES)}")
+        self.path = Path(path)
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.max_segments = max_segments
+        self.index_block_bytes = index_block_bytes
+        self._clock = clock
+        self._wall_clock = wall_clock
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.path.open("ab")
+        self._size = self._handle.tell()
+        self._opened_at = clock()
+        self._segment_seq = 0
+        self._lock = threading.Lock()
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._last_fsync = clock()
+        self._unsynced = False
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._compress_queue: queue.Queue[Path | None] = queue.Queue()
+        self._compressor: threading.Thread | None = None
+
+        self.lines_written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.rotations = 0
+
+    def start(self) -> None:
+        if self._compressor is None and self.rotate_bytes + self.rotate_seconds > 0:
+            for leftover in pending_segments(self.path):
+                self._compress_queue.put(leftover)
+            self._compressor = threading.Thread(target=self._run_compressor, name="audit-log-compress", daemon=True)
+            self._compressor.start()
+        if self._flusher is not None or self.flush_interval <= 0:
+            return
+        self._flusher = threading.Thread(target=self._run_flusher, name="audit-log", daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as exc:
+                LOGGER.error("Audit log flush failed: %s", exc)
+
+    def _run_compressor(self) -> None:
+        while True:
+            segment = self._compress_queue.get()
+            if segment is None:
+                return
+            self._compress(segment)
+
+    def _compress(self, segment: Path) -> None:
+        try:
+            compress_segment(segment, self.index_block_bytes)
+        except OSError as exc:
+            LOGGER.error("Audit log compression of %s failed: %s", segment.name, exc)
+            return
+        if self.max_segments > 0:
+            for stale in compressed_segments(self.path)[: -self.max_segments]:
+                LOGGER.info("Removing old audit log segment %s", stale.name)
+                stale.unlink(missing_ok=True)
+                segment_index_path(stale).unlink(missing_ok=True)
+
+    def write(self, record: dict[str, Any]) -> None:
+        self.write_many([record])
+
+    def write_many(self, records: list[dict[str, Any]]) -> None:
+        lines = [(json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8") for record in records]
+        with self._lock:
+            if self._handle is None:
+                raise RuntimeError("Audit log is closed")
+            self._pending.extend(lines)
+            self._pending_bytes += sum(len(line) for line in lines)
+            if self._pending_bytes >= self.max_batch_bytes or self._flusher is None:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._handle is None:
+            return
+        if self._pending:
+            self._handle.write(b"".join(self._pending))
+            self._handle.flush()
+            self.lines_written += len(self._pending)
+            self.flushes += 1
+            self._size += self._pending_bytes
+            self._pending = []
+            self._pending_bytes = 0
+            self._unsynced = True
+            if self.fsync_policy == "batch":
+                self._fsync_locked()
+        if (
+            self.fsync_policy == "interval"
+            and self._unsynced
+            and self._clock() - self._last_fsync >= self.fsync_interval
+        ):
+            self._fsync_locked()
+        if self._should_rotate():
+            self._rotate_locked()
+
+    def _fsync_locked(self) -> None:
+        os.fsync(self._handle.fileno())
+        self._unsynced = False
+        self._last_fsync = self._clock()
+        self.fsyncs += 1
+
+    def _should_rotate(self) -> bool:
+        if self._size == 0:
+            return False
+        if self.rotate_bytes > 0 and self._size >= self.rotate_bytes:
+            return True
+        return self.rotate_seconds > 0 and self._clock() - self._opened_at >= self.rotate_seconds
+
+    def _rotate_locked(self) -> None:
+        if self.fsync_policy != "none" and self._unsynced:
+            self._fsync_locked()
+        self._handle.close()
+        stamp = time.strftime(SEGMENT_TIME_FORMAT, time.gmtime(self._wall_clock()))
+        self._segment_seq += 1
+        segment = rotated_segment_path(self.path, stamp, self._segment_seq)
+        while segment.exists():
+            self._segment_seq += 1
+            segment = rotated_segment_path(self.path, stamp, self._segment_seq)
+        os.replace(self.path, segment)
+        self._handle = self.path.open("ab")
+        self._size = 0
+        self._opened_at = self._clock()
+        self.rotations += 1
+        if self._compressor is not None:
+            self._compress_queue.put(segment)
+        else:
+            self._compress(segment)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "pending_lines": len(self._pending),
+                "lines_written": self.lines_written,
+                "flushes": self.flushes,
+                "fsyncs": self.fsyncs,
+                "rotations": self.rotations,
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        with self._lock:
+            if self._handle is not None:
+                self._flush_locked()
+                if self.fsync_policy != "none" and self._unsynced:
+                    self._fsync_locked()
+                self._handle.close()
+                self._handle = None
+        if self._compressor is not None:
+            self._compress_queue.put(None)
+            self._compressor.join()
+            self._compressor = None
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+import gzip
+import json
+from pathlib import Path
+import sys
+from typing import Any, Iterator
+
+from .audit_log import (
+    compressed_segments,
+    pending_segments,
+    record_request_id,
+    record_timestamp,
+    segment_index_path,
+)
+
+
+def _load_index(segment: Path) -> dict[str, Any]:
+    return json.loads(segment_index_path(segment).read_text(encoding="utf-8"))
+
+
+def _read_block(segment: Path, block: dict[str, Any]) -> bytes:
+    with segment.open("rb") as handle:
+        handle.seek(block["offset"])
+        return gzip.decompress(handle.read(block["length"]))
+
+
+def _iter_plain(path: Path) -> Iterator[dict[str, Any]]:
+    try:
+        handle = path.open("rb")
+    except FileNotFoundError:
+        return
+    with handle:
+        for line in handle:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _uncompressed_segments(log_path: Path) -> list[Path]:
+    return [*pending_segments(log_path), log_path]
+
+
+def find_request(log_path: str | Path, request_id: str) -> list[dict[str, Any]]:
+    log_path = Path(log_path)
+    matches: list[dict[str, Any]] = []
+    for segment in compressed_segments(log_path):
+        try:
+            index = _load_index(segment)
+        except (OSError, ValueError):
+            continue
+        positions = index["requests"].get(request_id)
+        if not positions:
+            continue
+        blocks: dict[int, bytes] = {}
+        for block_no, line_offset in positions:
+            if block_no not in blocks:
+                blocks[block_no] = _read_block(segment, index["blocks"][block_no])
+            data = blocks[block_no]
+            matches.append(json.loads(data[line_offset : data.index(b"\n", line_offset)]))
+
+    for path in _uncompressed_segments(log_path):
+        matches.extend(record for record in _iter_plain(path) if record_request_id(record) == request_id)
+    return matches
+
+
+def _overlaps(first: str | None, last: str | None, since: datetime | None, until: datetime | None) -> bool:
+    if first is None or last is None:
+        return False
+    if since is not None and datetime.fromisoformat(last) < since:
+        return False
+    return until is None or datetime.fromisoformat(first) <= until
+
+
+def _in_range(record: Any, since: datetime | None, until: datetime | None) -> bool:
+    ts = record_timestamp(record)
+    if ts is None:
+        return False
+    return (since is None or ts >= since) and (until is None or ts <= until)
+
+
+def query_time_range(
+    log_path: str | Path,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> Iterator[dict[str, Any]]:
+    log_path = Path(log_path)
+    for segment in compressed_segments(log_path):
+        try:
+            index = _load_index(segment)
+        except (OSError, ValueError):
+            continue
+        if not _overlaps(index["first_ts"], index["last_ts"], since, until):
+            continue
+        for block in index["blocks"]:
+            if not _overlaps(block["first_ts"], block["last_ts"], since, until):
+                continue
+            for line in _read_block(segment, block).splitlines():
+                record = json.loads(line)
+                if _in_range(record, since, until):
+                    yield record
+
+    for path in _uncompressed_segments(log_path):
+        for record in _iter_plain(path):
+            if _in_range(record, since, until):
+                yield record
+
+
+def _parse_timestamp(raw: str) -> datetime:
+    parsed = datetime.fromisoformat(raw)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bridge.audit_query", description="Query the command audit log")
+    parser.add_argument("--log", help="audit log path (default: COMMAND_LOG_PATH)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--request-id", help="print every entry for this requestId")
+    group.add_argument("--since", type=_parse_timestamp, help="ISO-8601 start of time range")
+    parser.add_argument("--until", type=_parse_timestamp, help="ISO-8601 end of time range")
+    args = parser.parse_args(argv)
+
+    log_path = args.log
+    if log_path is None:
+        from .config import from_env
+
+        log_path = from_env().command_log_path
+
+    if args.request_id is not None:
+        records: Any = find_request(log_path, args.request_id)
+        if not records:
+            return 1
+    else:
+        records = query_time_range(log_path, args.since, args.until)
+
+    for record in records:
+        sys.stdout.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
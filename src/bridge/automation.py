@@ -1,11 +1,49 @@
 from __future__ import annotations
 
+from array import array
 from datetime import datetime, timezone
+import json
 import logging
-from typing import Any
+import math
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Callable, Mapping
+
+from .rules import RulePlan, default_rule_spec
 
 LOGGER = logging.getLogger(__name__)
 
+AUTOMATION_MODES = ("tumbling", "sliding")
+SNAPSHOT_VERSION = 1
+POWER_STATES = ("on", "off")
+
+
+def save_snapshot(path: str | Path, snapshot: dict[str, Any]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        handle.write(json.dumps(snapshot, separators=(",", ":")))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str | Path) -> dict[str, Any] | None:
+    try:
+        snapshot = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        LOGGER.warning("Ignoring unreadable automation snapshot %s: %s", path, exc)
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        LOGGER.warning("Ignoring automation snapshot %s with unknown format", path)
+        return None
+    return snapshot
+
 
 class AutomationController:
     def __init__(
@@ -15,82 +53,310 @@ class AutomationController:
         fan_off_temp_c: float,
         light_on_lux: float,
         light_off_lux: float,
+        mode: str = "tumbling",
+        eval_interval_seconds: float = 5.0,
+        rules: RulePlan | None = None,
+        min_samples: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
     ) -> None:
+        if mode not in AUTOMATION_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(AUTOMATION_MODES)}")
+        if mode == "sliding" and not 0 < eval_interval_seconds <= window_seconds:
+            raise ValueError("eval_interval_seconds must be positive and not longer than window_seconds")
         self.window_seconds = window_seconds
+        self.mode = mode
+        self.eval_interval_seconds = eval_interval_seconds
+        self.min_samples = min_samples
+        self._clock = clock
+        self._wall_clock = wall_clock
         self.fan_on_temp_c = fan_on_temp_c
         self.fan_off_temp_c = fan_off_temp_c
         self.light_on_lux = light_on_lux
         self.light_off_lux = light_off_lux
+        self.rules = rules or RulePlan.from_dict(
+            default_rule_spec(fan_on_temp_c, fan_off_temp_c, light_on_lux, light_off_lux)
+        )
 
-        self._window_started_at: datetime | None = None
-        self._sum_temp_c = 0.0
-        self._sum_lux = 0.0
+        sensors = len(self.rules.sensors)
+        # Monotonic time at which the open tumbling window closes, or the next sliding evaluation is due.
+        self._deadline: float | None = None
         self._sample_count = 0
+        self._sum = array("d", bytes(8 * sensors))
+        self._count = array("q", bytes(8 * sensors))
+        self._last = array("d", bytes(8 * sensors))
+
+        # Per-bucket accumulators, flattened as bucket * sensors + sensor. Tumbling mode uses a single
+        # bucket; sliding mode uses one per evaluation interval, reused in place as the window moves.
+        buckets = math.ceil(window_seconds / eval_interval_seconds) if mode == "sliding" else 1
+        self._buckets = buckets
+        self._bucket_sum = array("d", bytes(8 * buckets * sensors))
+        self._bucket_count = array("q", bytes(8 * buckets * sensors))
+        self._bucket_min = array("d", [math.inf]) * (buckets * sensors)
+        self._bucket_max = array("d", [-math.inf]) * (buckets * sensors)
+        self._bucket_samples = array("q", bytes(8 * buckets))
+        self._bucket_index: int | None = None
+        self.skipped_windows = 0
+
+        self._power = {device_id: "off" for device_id in self.rules.devices}
+        # Last power state each device acknowledged, fed from accepted command ACKs (other threads).
+        self._confirmed: dict[str, str] = {}
+        self._confirmed_lock = threading.Lock()
+
+    def confirm(self, device_id: str, power: str) -> None:
+        if device_id in self._power and power in POWER_STATES:
+            with self._confirmed_lock:
+                self._confirmed[device_id] = power
+
+    def power_state(self) -> dict[str, str]:
+        return dict(self._power)
+
+    def snapshot(self) -> dict[str, Any]:
+        now = self._clock()
+        sensors = len(self.rules.sensors)
+        buckets = []
+        for slot in range(self._buckets):
+            if self._bucket_samples[slot] == 0:
+                continue
+            base = slot * sensors
+            counts = list(self._bucket_count[base : base + sensors])
+            buckets.append(
+                {
+                    "age": 0 if self._bucket_index is None else (self._bucket_index - slot) % self._buckets,
+                    "samples": self._bucket_samples[slot],
+                    "sum": list(self._bucket_sum[base : base + sensors]),
+                    "count": counts,
+                    "min": [v if n else None for v, n in zip(self._bucket_min[base : base + sensors], counts)],
+                    "max": [v if n else None for v, n in zip(self._bucket_max[base : base + sensors], counts)],
+                }
+            )
+        with self._confirmed_lock:
+            confirmed = dict(self._confirmed)
+        return {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": self._wall_clock(),
+            "mode": self.mode,
+            "window_seconds": self.window_seconds,
+            "eval_interval_seconds": self.eval_interval_seconds,
+            "sensors": list(self.rules.sensors),
+            "power": dict(self._power),
+            "confirmed": confirmed,
+            "deadline_in": None if self._deadline is None else self._deadline - now,
+            "last": [v if n else None for v, n in zip(self._last, self._count)],
+            "buckets": buckets,
+        }
+
+    def restore(self, snapshot: Mapping[str, Any]) -> None:
+        confirmed = snapshot.get("confirmed") or {}
+        power = snapshot.get("power") or {}
+        for device_id in self._power:
+            # A device's acknowledged state wins over what automation last asked for.
+            state = confirmed.get(device_id, power.get(device_id))
+            if state in POWER_STATES:
+                self._power[device_id] = state
+            if confirmed.get(device_id) in POWER_STATES:
+                self.confirm(device_id, confirmed[device_id])
+
+        same_window = (
+            snapshot.get("mode") == self.mode
+            and snapshot.get("window_seconds") == self.window_seconds
+            and snapshot.get("eval_interval_seconds") == self.eval_interval_seconds
+            and snapshot.get("sensors") == list(self.rules.sensors)
+        )
+        deadline_in = snapshot.get("deadline_in")
+        if not same_window or deadline_in is None or not snapshot.get("buckets"):
+            return
+        downtime = max(0.0, self._wall_clock() - float(snapshot["saved_at"]))
+        remaining = float(deadline_in) - downtime
+        if self.mode == "tumbling" and remaining <= 0:
+            # The window would have closed while the bridge was down; its data is stale.
+            return
+
+        now = self._clock()
+        shift = 0
+        if self.mode == "sliding":
+            shift = math.floor(downtime / self.eval_interval_seconds)
+            self._bucket_index = math.floor(now / self.eval_interval_seconds)
+        restored = False
+        for bucket in snapshot["buckets"]:
+            age = int(bucket["age"]) + shift
+            if age >= self._buckets:
+                continue
+            slot = 0 if self._bucket_index is None else (self._bucket_index - age) % self._buckets
+            self._load_bucket(slot, bucket)
+            restored = True
+        if not restored:
+            self._bucket_index = None
+            return
+        for idx, value in enumerate(snapshot.get("last") or []):
+            if value is not None and idx < len(self._last):
+                self._last[idx] = float(value)
+        self._deadline = now + max(0.0, remaining)
 
-        self._fan_power = "off"
-        self._light_power = "off"
+    def _load_bucket(self, slot: int, bucket: Mapping[str, Any]) -> None:
+        sensors = len(self.rules.sensors)
+        base = slot * sensors
+        for idx in range(sensors):
+            count = int(bucket["count"][idx])
+            if count == 0:
+                continue
+            self._bucket_sum[base + idx] = float(bucket["sum"][idx])
+            self._bucket_count[base + idx] = count
+            self._bucket_min[base + idx] = float(bucket["min"][idx])
+            self._bucket_max[base + idx] = float(bucket["max"][idx])
+            self._sum[idx] += float(bucket["sum"][idx])
+            self._count[idx] += count
+        self._bucket_samples[slot] = int(bucket["samples"])
+        self._sample_count += int(bucket["samples"])
 
     def add_sample(
         self,
         temperature_c: float,
         lux: float,
-        observed_at: datetime | None = None,
+        observed_at: datetime | float | None = None,
     ) -> list[dict[str, Any]]:
-        now = observed_at or datetime.now(timezone.utc)
-        if self._window_started_at is None:
-            self._window_started_at = now
+        return self.add_values({"dht11_temp_c": temperature_c, "lm393_lux": lux}, observed_at)
 
-        self._sum_temp_c += temperature_c
-        self._sum_lux += lux
-        self._sample_count += 1
+    def add_values(
+        self,
+        sensor_values: Mapping[str, float | int],
+        observed_at: datetime | float | None = None,
+    ) -> list[dict[str, Any]]:
+        now, sent_at = self._resolve_time(observed_at)
+        if self.mode == "sliding":
+            bucket = self._advance(now)
+        else:
+            bucket = 0
+            if self._deadline is None:
+                self._deadline = now + self.window_seconds
+        self._accumulate(bucket, sensor_values)
+        return self._close_due(now, sent_at)
 
-        elapsed = (now - self._window_started_at).total_seconds()
-        if elapsed < self.window_seconds:
+    def tick(self, now: datetime | float | None = None) -> list[dict[str, Any]]:
+        current, sent_at = self._resolve_time(now)
+        if self._deadline is None or current < self._deadline:
             return []
+        if self.mode == "sliding":
+            self._advance(current)
+        return self._close_due(current, sent_at)
 
-        avg_temp_c = self._sum_temp_c / self._sample_count
-        avg_lux = self._sum_lux / self._sample_count
+    def next_deadline(self) -> float | None:
+        return self._deadline
 
-        LOGGER.info(
-            "Automation window completed: samples=%s avg_temp_c=%.2f avg_lux=%.2f",
-            self._sample_count,
-            avg_temp_c,
-            avg_lux,
-        )
+    def _resolve_time(self, observed_at: datetime | float | None) -> tuple[float, datetime | None]:
+        # Live samples use the monotonic clock; datetimes are accepted for replays and tests.
+        if observed_at is None:
+            return self._clock(), None
+        if isinstance(observed_at, datetime):
+            return observed_at.timestamp(), observed_at
+        return float(observed_at), None
 
-        commands = self._evaluate(avg_temp_c=avg_temp_c, avg_lux=avg_lux, observed_at=now)
-        self._reset_window()
-        return commands
+    def _close_due(self, now: float, sent_at: datetime | None) -> list[dict[str, Any]]:
+        if self._deadline is None or now < self._deadline:
+            return []
 
-    def _reset_window(self) -> None:
-        self._window_started_at = None
-        self._sum_temp_c = 0.0
-        self._sum_lux = 0.0
-        self._sample_count = 0
+        samples = self._sample_count
+        values = self._aggregate() if samples >= self.min_samples else None
+        if self.mode == "sliding":
+            self._deadline += self.eval_interval_seconds
+            if self._deadline <= now:
+                self._deadline = now + self.eval_interval_seconds
+        else:
+            self._deadline = None
+            self._clear_bucket(0)
 
-    def _evaluate(self, avg_temp_c: float, avg_lux: float, observed_at: datetime) -> list[dict[str, Any]]:
-        commands: list[dict[str, Any]] = []
+        if values is None:
+            self.skipped_windows += 1
+            LOGGER.info("Automation window skipped: samples=%s < min_samples=%s", samples, self.min_samples)
+            return []
+        log = LOGGER.info if self.mode == "tumbling" else LOGGER.debug
+        log("Automation window completed: samples=%s %s", samples, self._describe(values))
+        return self._evaluate(values, sent_at)
+
+    def _accumulate(self, bucket: int, sensor_values: Mapping[str, float | int]) -> None:
+        base = bucket * len(self.rules.sensors)
+        for idx, key in enumerate(self.rules.sensors):
+            raw = sensor_values.get(key)
+            if raw is None:
+                continue
+            value = float(raw)
+            slot = base + idx
+            self._bucket_sum[slot] += value
+            self._bucket_count[slot] += 1
+            if value < self._bucket_min[slot]:
+                self._bucket_min[slot] = value
+            if value > self._bucket_max[slot]:
+                self._bucket_max[slot] = value
+            self._sum[idx] += value
+            self._count[idx] += 1
+            self._last[idx] = value
+        self._bucket_samples[bucket] += 1
+        self._sample_count += 1
+
+    def _clear_bucket(self, bucket: int) -> None:
+        sensors = len(self.rules.sensors)
+        base = bucket * sensors
+        for idx in range(sensors):
+            slot = base + idx
+            self._sum[idx] -= self._bucket_sum[slot]
+            self._count[idx] -= self._bucket_count[slot]
+            if self._count[idx] == 0:
+                # Drop accumulated rounding error whenever a sensor's window empties.
+                self._sum[idx] = 0.0
+            self._bucket_sum[slot] = 0.0
+            self._bucket_count[slot] = 0
+            self._bucket_min[slot] = math.inf
+            self._bucket_max[slot] = -math.inf
+        self._sample_count -= self._bucket_samples[bucket]
+        self._bucket_samples[bucket] = 0
 
-        fan_next = self._fan_power
-        if self._fan_power == "off" and avg_temp_c > self.fan_on_temp_c:
-            fan_next = "on"
-        elif self._fan_power == "on" and avg_temp_c < self.fan_off_temp_c:
-            fan_next = "off"
+    def _aggregate(self) -> list[float | None]:
+        sensors = len(self.rules.sensors)
+        values: list[float | None] = []
+        for idx, aggregate in self.rules.slots:
+            if self._count[idx] == 0:
+                values.append(None)
+            elif aggregate == "mean":
+                values.append(self._sum[idx] / self._count[idx])
+            elif aggregate == "last":
+                values.append(self._last[idx])
+            elif aggregate == "min":
+                values.append(min(self._bucket_min[b * sensors + idx] for b in range(self._buckets)))
+            else:
+                values.append(max(self._bucket_max[b * sensors + idx] for b in range(self._buckets)))
+        return values
 
-        light_next = self._light_power
-        if self._light_power == "off" and avg_lux < self.light_on_lux:
-            light_next = "on"
-        elif self._light_power == "on" and avg_lux > self.light_off_lux:
-            light_next = "off"
+    def _describe(self, values: list[float | None]) -> str:
+        return " ".join(
+            f"{aggregate}({self.rules.sensors[idx]})={'-' if value is None else f'{value:.2f}'}"
+            for (idx, aggregate), value in zip(self.rules.slots, values)
+        )
 
-        if fan_next != self._fan_power:
-            self._fan_power = fan_next
-            commands.append(self._build_command(device_id="fan_01", power=fan_next, sent_at=observed_at))
+    def _advance(self, now: float) -> int:
+        index = math.floor(now / self.eval_interval_seconds)
+        if self._bucket_index is None:
+            self._bucket_index = index
+            self._deadline = now + self.window_seconds
+        elif index > self._bucket_index:
+            self._expire_buckets(index)
+        else:
+            # Late samples count towards the newest bucket instead of one that may already be reused.
+            index = self._bucket_index
+        return index % self._buckets
 
-        if light_next != self._light_power:
-            self._light_power = light_next
-            commands.append(self._build_command(device_id="light_01", power=light_next, sent_at=observed_at))
+    def _expire_buckets(self, index: int) -> None:
+        # At most one pass over the ring, however long the gap since the previous sample.
+        for stale in range(max(self._bucket_index + 1, index - self._buckets + 1), index + 1):
+            self._clear_bucket(stale % self._buckets)
+        self._bucket_index = index
 
+    def _evaluate(self, values: list[float | None], sent_at: datetime | None) -> list[dict[str, Any]]:
+        commands: list[dict[str, Any]] = []
+        for device_id, power in self.rules.decide(values, self._power):
+            if sent_at is None:
+                sent_at = datetime.fromtimestamp(self._wall_clock(), timezone.utc)
+            self._power[device_id] = power
+            commands.append(self._build_command(device_id=device_id, power=power, sent_at=sent_at))
         return commands
 
     def _build_command(self, device_id: str, power: str, sent_at: datetime) -> dict[str, Any]:
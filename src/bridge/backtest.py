@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+import itertools
+import json
+from pathlib import Path
+import sys
+import time
+from typing import Any, Iterable, Iterator
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - only needed for offline backtesting
+    np = None
+
+# rule name -> (sensor key, rising); rising rules switch on above the on threshold (fan), falling ones below (light).
+RULE_PRESETS = {
+    "fan": ("dht11_temp_c", True),
+    "light": ("lm393_lux", False),
+}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for backtesting (pip install numpy)")
+
+
+def iter_sensor_payloads(path: str | Path) -> Iterator[dict[str, Any]]:
+    with Path(path).open("r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] not in "[{":
+                # `mosquitto_sub -v` captures prefix each payload with its topic.
+                _topic, _sep, line = line.partition(" ")
+            try:
+                parsed = json.loads(line)
+            except ValueError:
+                continue
+            for payload in parsed if isinstance(parsed, list) else (parsed,):
+                if isinstance(payload, dict) and isinstance(payload.get("sensors"), dict):
+                    yield payload
+
+
+def _timestamp(raw: Any) -> float | None:
+    if not isinstance(raw, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(raw)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def load_history(paths: Iterable[str | Path], sensor: str) -> tuple[Any, Any]:
+    _require_numpy()
+    timestamps: list[float] = []
+    values: list[float] = []
+    for path in paths:
+        for payload in iter_sensor_payloads(path):
+            ts = _timestamp(payload.get("received_at"))
+            value = payload["sensors"].get(sensor)
+            if ts is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            timestamps.append(ts)
+            values.append(float(value))
+
+    ts_array = np.asarray(timestamps, dtype=np.float64)
+    value_array = np.asarray(values, dtype=np.float64)
+    order = np.argsort(ts_array, kind="stable")
+    return ts_array[order], value_array[order]
+
+
+def tumbling_windows(ts: Any, window_seconds: float) -> tuple[Any, Any]:
+    # Same boundaries as the live AutomationController, whose tick closes a window at its deadline:
+    # a window opens at a sample, holds the samples before start + window_seconds (end exclusive) and
+    # is evaluated at that deadline; the next window opens at the first sample at or after it. The
+    # trailing window is dropped unless the capture reaches its deadline.
+    starts: list[int] = []
+    ends: list[int] = []
+    start = 0
+    while start < len(ts) and ts[-1] >= ts[start] + window_seconds:
+        end = int(np.searchsorted(ts, ts[start] + window_seconds, side="left"))
+        starts.append(start)
+        ends.append(end)
+        start = end
+    return np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+
+
+def hysteresis_states(means: Any, on: Any, off: Any, rising: bool) -> Any:
+    # One row per (on, off) pair. A window either triggers on, triggers off, or holds (a NaN mean,
+    # i.e. a skipped window, holds); because the thresholds do not overlap, the state is the last
+    # trigger carried forward (initially off).
+    means = means[np.newaxis, :]
+    on = np.asarray(on, dtype=np.float64)[:, np.newaxis]
+    off = np.asarray(off, dtype=np.float64)[:, np.newaxis]
+    if rising:
+        trigger_on, trigger_off = means > on, means < off
+    else:
+        trigger_on, trigger_off = means < on, means > off
+
+    event = np.where(trigger_on, 1, np.where(trigger_off, 0, -1))
+    positions = np.where(event >= 0, np.arange(event.shape[1]), -1)
+    last = np.maximum.accumulate(positions, axis=1)
+    held = np.take_along_axis(event, np.maximum(last, 0), axis=1)
+    return np.where(last >= 0, held, 0).astype(np.int8)
+
+
+def _run_starts(mask: Any) -> Any:
+    return np.flatnonzero(mask & ~np.concatenate(([False], mask[:-1])))
+
+
+def _reaction_latencies(ts: Any, runs: Any, last_idx: Any, closes: Any, flips: Any) -> Any:
+    # Time from the start of the raw-sample run past the threshold to the window close that acted on it.
+    if flips.size == 0 or runs.size == 0:
+        return np.empty(0, dtype=np.float64)
+    run_pos = np.searchsorted(runs, last_idx[flips], side="right") - 1
+    valid = run_pos >= 0
+    return closes[flips][valid] - ts[runs[run_pos[valid]]]
+
+
+def backtest(
+    ts: Any,
+    values: Any,
+    windows: Iterable[float],
+    on_thresholds: Iterable[float],
+    off_thresholds: Iterable[float],
+    rising: bool = True,
+    min_samples: int = 1,
+) -> list[dict[str, Any]]:
+    _require_numpy()
+    pairs = [
+        (on, off)
+        for on, off in itertools.product(on_thresholds, off_thresholds)
+        if (off <= on if rising else off >= on)
+    ]
+    if not pairs or ts.size == 0:
+        return []
+    on = np.asarray([pair[0] for pair in pairs])
+    off = np.asarray([pair[1] for pair in pairs])
+    span = float(ts[-1] - ts[0]) or 1.0
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    run_cache: dict[tuple[float, bool], Any] = {}
+
+    def _runs(threshold: float, above: bool) -> Any:
+        key = (threshold, above)
+        if key not in run_cache:
+            run_cache[key] = _run_starts(values > threshold if above else values < threshold)
+        return run_cache[key]
+
+    results = []
+    for window in windows:
+        starts, ends = tumbling_windows(ts, window)
+        if starts.size == 0:
+            continue
+        counts = ends - starts
+        closes = ts[starts] + window
+        # Windows below AUTOMATION_MIN_SAMPLES are skipped and leave the devices as they were.
+        means = np.where(counts >= min_samples, (sums[ends] - sums[starts]) / counts, np.nan)
+        states = hysteresis_states(means, on, off, rising)
+
+        changes = np.diff(states, axis=1, prepend=0)
+        toggles = np.count_nonzero(changes, axis=1)
+        held_for = np.diff(np.append(closes, ts[-1]))
+        on_seconds = states @ held_for
+
+        for idx, (on_threshold, off_threshold) in enumerate(pairs):
+            latencies = np.concatenate(
+                (
+                    _reaction_latencies(
+                        ts, _runs(on_threshold, rising), ends - 1, closes, np.flatnonzero(changes[idx] == 1)
+                    ),
+                    _reaction_latencies(
+                        ts, _runs(off_threshold, not rising), ends - 1, closes, np.flatnonzero(changes[idx] == -1)
+                    ),
+                )
+            )
+            results.append(
+                {
+                    "window_seconds": window,
+                    "on": float(on_threshold),
+                    "off": float(off_threshold),
+                    "windows": int(starts.size),
+                    "skipped": int(np.count_nonzero(counts < min_samples)),
+                    "toggles": int(toggles[idx]),
+                    "on_fraction": round(float(on_seconds[idx]) / span, 4),
+                    "mean_latency_s": round(float(latencies.mean()), 1) if latencies.size else None,
+                    "max_latency_s": round(float(latencies.max()), 1) if latencies.size else None,
+                }
+            )
+    return results
+
+
+def parse_grid(raw: str) -> list[float]:
+    # "29" or "28,29,30" or "27:31:0.5" (start:stop:step, stop inclusive).
+    if ":" in raw:
+        parts = [float(part) for part in raw.split(":")]
+        if len(parts) != 3 or parts[2] <= 0:
+            raise argparse.ArgumentTypeError(f"invalid range {raw!r}, expected start:stop:step")
+        start, stop, step = parts
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + idx * step, 6) for idx in range(max(count, 0))]
+    try:
+        return [float(part) for part in raw.split(",") if part]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid value list {raw!r}") from exc
+
+
+def _format_table(results: list[dict[str, Any]]) -> str:
+    columns = ["window_seconds", "on", "off", "windows", "skipped", "toggles", "on_fraction", "mean_latency_s", "max_latency_s"]
+    rows = [[("-" if row[col] is None else str(row[col])) for col in columns] for row in results]
+    widths = [max(len(col), *(len(row[idx]) for row in rows)) for idx, col in enumerate(columns)]
+    lines = ["  ".join(col.rjust(width) for col, width in zip(columns, widths))]
+    lines.extend("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bridge.backtest",
+        description="Replay recorded sensor history against a grid of automation thresholds and windows",
+    )
+    parser.add_argument("history", nargs="+", help="JSONL captures of sensor payloads (single or batched)")
+    parser.add_argument("--rule", choices=sorted(RULE_PRESETS), default="fan")
+    parser.add_argument("--sensor", help="sensor key (default: the rule's sensor)")
+    parser.add_argument("--on", type=parse_grid, required=True, help="on thresholds, e.g. 28:31:0.5")
+    parser.add_argument("--off", type=parse_grid, required=True, help="off thresholds, e.g. 26,27,27.5")
+    parser.add_argument("--window", type=parse_grid, default=[120.0], help="window lengths in seconds")
+    parser.add_argument(
+        "--min-samples", type=int, default=1, help="skip windows with fewer samples (AUTOMATION_MIN_SAMPLES)"
+    )
+    parser.add_argument("--json", action="store_true", help="print one JSON object per combination")
+    args = parser.parse_args(argv)
+
+    if np is None:
+        parser.error("numpy is required for backtesting (pip install numpy)")
+    sensor, rising = RULE_PRESETS[args.rule]
+    sensor = args.sensor or sensor
+
+    started = time.perf_counter()
+    ts, values = load_history(args.history, sensor)
+    if ts.size == 0:
+        sys.stderr.write(f"No samples with {sensor} found\n")
+        return 1
+    loaded = time.perf_counter()
+    results = backtest(ts, values, args.window, args.on, args.off, rising=rising, min_samples=args.min_samples)
+    finished = time.perf_counter()
+
+    if args.json:
+        for row in results:
+            sys.stdout.write(json.dumps(row, separators=(",", ":")) + "\n")
+    else:
+        sys.stdout.write(_format_table(results) + "\n")
+    sys.stderr.write(
+        f"{ts.size} samples, {len(results)} combinations: load {loaded - started:.2f}s, "
+        f"backtest {finished - loaded:.2f}s\n"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
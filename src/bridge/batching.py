@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable
+
+
+class SensorBatcher:
+    def __init__(
+        self,
+        max_count: int = 50,
+        max_bytes: int = 32768,
+        max_linger_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_count <= 0:
+            raise ValueError("max_count must be positive")
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_linger_seconds = max_linger_seconds
+        self._clock = clock
+
+        self._items: list[str] = []
+        self._size = 2
+        self._first_added_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, payload: dict[str, Any]) -> list[str]:
+        item = json.dumps(payload, separators=(",", ":"))
+        ready: list[str] = []
+        if self._items and self._size + len(item) + 1 > self.max_bytes:
+            ready.append(self._drain())
+
+        self._items.append(item)
+        self._size += len(item) + (1 if len(self._items) > 1 else 0)
+        if self._first_added_at is None:
+            self._first_added_at = self._clock()
+
+        if len(self._items) >= self.max_count or self._size >= self.max_bytes:
+            ready.append(self._drain())
+        return ready
+
+    def next_deadline(self) -> float | None:
+        if self._first_added_at is None:
+            return None
+        return self._first_added_at + self.max_linger_seconds
+
+    def flush_due(self) -> str | None:
+        deadline = self.next_deadline()
+        if deadline is None or self._clock() < deadline:
+            return None
+        return self._drain()
+
+    def flush(self) -> str | None:
+        if not self._items:
+            return None
+        return self._drain()
+
+    def _drain(self) -> str:
+        batch = "[" + ",".join(self._items) + "]"
+        self._items = []
+        self._size = 2
+        self._first_added_at = None
+        return batch
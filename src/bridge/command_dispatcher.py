@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+from .command_limiter import CommandLimiter
+from .metrics import LatencyHistogram
+from .mqtt_client import MQTTBridgeClient
+
+LOGGER = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def command_device_id(payload: str) -> str | None:
+    try:
+        parsed = json.loads(payload)
+    except ValueError:
+        return None
+    if isinstance(parsed, dict) and isinstance(parsed.get("deviceId"), str):
+        return parsed["deviceId"]
+    return None
+
+
+def command_ordering_key(payload: str, topic: str) -> str:
+    return command_device_id(payload) or topic
+
+
+class CommandDispatcher:
+    def __init__(
+        self,
+        handler: Callable[[str, str], dict[str, Any] | None],
+        workers: int = 2,
+        queue_size: int = 256,
+        on_overflow: Callable[[str, str], dict[str, Any] | None] | None = None,
+        limiter: CommandLimiter | None = None,
+        on_limited: Callable[[str, str, str], dict[str, Any] | None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self._handler = handler
+        self._on_overflow = on_overflow
+        self._limiter = limiter
+        self._on_limited = on_limited
+        self._sleep = sleep
+        self._clock = clock
+        self._bridge: MQTTBridgeClient | None = None
+        # One queue per worker: commands for the same device always hash to the same worker.
+        self._queues: list[queue.Queue[Any]] = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads: list[threading.Thread] = []
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Set when stop() could not queue a stop marker in time: workers exit after their current command.
+        self._abandon = threading.Event()
+        self._processing_time = LatencyHistogram()
+        self._queue_time = LatencyHistogram()
+
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.high_watermark = 0
+
+    def bind(self, bridge: MQTTBridgeClient) -> None:
+        self._bridge = bridge
+
+    def start(self) -> None:
+        for idx, work_queue in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(work_queue,), name=f"commands-{idx}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, payload: str, topic: str) -> None:
+        device_id = command_device_id(payload)
+        key = device_id or topic
+        work_queue = self._queues[hash(key) % len(self._queues)]
+        try:
+            with self._submit_lock:
+                # Admit only commands that get queued, so a rejected command never supersedes a queued one.
+                if work_queue.full():
+                    raise queue.Full
+                ticket = 0
+                if self._limiter is not None and device_id is not None:
+                    ticket = self._limiter.admit(device_id)
+                work_queue.put_nowait((payload, topic, self._clock(), device_id, ticket))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            LOGGER.warning("Command queue full, rejecting command for %s on %s", key, topic)
+            if self._on_overflow is not None:
+                self._publish_ack(self._on_overflow(payload, topic))
+            return None
+
+        depth = work_queue.qsize()
+        with self._stats_lock:
+            self.submitted += 1
+            if depth > self.high_watermark:
+                self.high_watermark = depth
+        return None
+
+    def _run(self, work_queue: queue.Queue[Any]) -> None:
+        while True:
+            item = work_queue.get()
+            if item is _STOP or self._abandon.is_set():
+                return
+            payload, topic, enqueued_at, device_id, ticket = item
+            if ticket:
+                # Hold the command for the coalescing window; queue order keeps the holds in deadline order.
+                delay = enqueued_at + self._limiter.coalesce_seconds - self._clock()
+                if delay > 0:
+                    self._sleep(delay)
+                verdict = self._limiter.check(device_id, ticket)
+                if verdict is not None:
+                    if self._on_limited is not None:
+                        self._publish_ack(self._on_limited(payload, topic, verdict))
+                    continue
+            started_at = self._clock()
+            try:
+                ack = self._handler(payload, topic)
+            except Exception:
+                LOGGER.exception("Command handler failed for topic %s", topic)
+                with self._stats_lock:
+                    self.failed += 1
+                continue
+
+            finished_at = self._clock()
+            with self._stats_lock:
+                self.processed += 1
+                self._queue_time.record(started_at - enqueued_at)
+                self._processing_time.record(finished_at - started_at)
+            self._publish_ack(ack)
+
+    def _publish_ack(self, ack: dict[str, Any] | None) -> None:
+        if self._bridge is None or ack is None:
+            return
+        ack_topic = ack.pop("_ack_topic", None)
+        try:
+            self._bridge.publish_ack(ack, topic=ack_topic)
+        except RuntimeError as exc:
+            LOGGER.warning("Dropped command ack: %s", exc)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        for work_queue in self._queues:
+            try:
+                work_queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                LOGGER.warning(
+                    "Command queue still full at shutdown, abandoning %s queued commands", work_queue.qsize()
+                )
+                self._abandon.set()
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "workers": len(self._queues),
+                "queue_depth": [work_queue.qsize() for work_queue in self._queues],
+                "high_watermark": self.high_watermark,
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_time": self._queue_time.snapshot(),
+                "processing_time": self._processing_time.snapshot(),
+            }
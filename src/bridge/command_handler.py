@@ -1,20 +1,43 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+import functools
 import json
 from pathlib import Path
 from typing import Any
 
-VALID_DEVICE_IDS = {"fan_01", "light_01", "ac_01"}
+from .audit_log import AuditLogWriter
+from .command_limiter import LIMITED_REASONS, CommandLimiter
+from .device_registry import DeviceRegistry, load_device_registry
+from .request_cache import RequestCache
+
 VALID_POWER_STATES = {"on", "off"}
-MIN_AC_SETPOINT = 16
-MAX_AC_SETPOINT = 27
 
 
-def _append_jsonl(path: Path, payload: dict[str, Any]) -> None:
+@functools.lru_cache(maxsize=1)
+def _default_registry() -> DeviceRegistry:
+    return load_device_registry()
+
+
+def _append_jsonl(path: Path | AuditLogWriter, payload: dict[str, Any]) -> None:
+    _append_jsonl_many(path, [payload])
+
+
+def _append_jsonl_many(path: Path | AuditLogWriter, payloads: list[dict[str, Any]]) -> None:
+    if not payloads:
+        return
+    if isinstance(path, AuditLogWriter):
+        path.write_many(payloads)
+        return
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        handle.write("".join(json.dumps(payload, separators=(",", ":")) + "\n" for payload in payloads))
+
+
+def _resolve_log(log_path: str | Path | AuditLogWriter) -> Path | AuditLogWriter:
+    if isinstance(log_path, AuditLogWriter):
+        return log_path
+    return Path(log_path)
 
 
 def _read_json_object(payload: str) -> dict[str, Any]:
@@ -24,8 +47,8 @@ def _read_json_object(payload: str) -> dict[str, Any]:
     return parsed
 
 
-def handle_switch_command(payload: str, log_path: str | Path) -> dict[str, Any]:
-    path = Path(log_path)
+def handle_switch_command(payload: str, log_path: str | Path | AuditLogWriter) -> dict[str, Any]:
+    path = _resolve_log(log_path)
     now_iso = datetime.now(timezone.utc).isoformat()
 
     try:
@@ -66,111 +89,208 @@ def handle_switch_command(payload: str, log_path: str | Path) -> dict[str, Any]:
     return ack
 
 
-def handle_device_command(payload: str, log_path: str | Path) -> dict[str, Any]:
-    path = Path(log_path)
-    now_iso = datetime.now(timezone.utc).isoformat()
+def _evaluate_device_command(
+    parsed: dict[str, Any],
+    now_iso: str,
+    cache: RequestCache | None,
+    registry: DeviceRegistry,
+) -> tuple[dict[str, Any], dict[str, Any] | None]:
+    request_id = parsed.get("requestId")
+    device_id = parsed.get("deviceId")
 
-    try:
-        parsed = _read_json_object(payload)
-    except json.JSONDecodeError:
+    if not isinstance(request_id, str) or not request_id.strip():
         ack = {
             "status": "rejected",
-            "reason": "Invalid JSON payload",
+            "reason": "Invalid requestId",
             "receivedAt": now_iso,
         }
-        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": payload, "reason": ack["reason"]})
-        return ack
-    except ValueError as exc:
+        return ack, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]}
+
+    if cache is not None:
+        cached = cache.get(request_id)
+        if cached is not None:
+            return cached, None
+
+    validator = registry.get(device_id)
+    if validator is None:
         ack = {
+            "requestId": request_id,
             "status": "rejected",
-            "reason": str(exc),
+            "reason": "Invalid deviceId",
             "receivedAt": now_iso,
         }
-        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": payload, "reason": ack["reason"]})
-        return ack
+        row = {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]}
+    else:
+        reason, parameters = validator.validate(parsed)
+        if reason is not None:
+            ack = {
+                "requestId": request_id,
+                "deviceId": device_id,
+                "status": "rejected",
+                "reason": reason,
+                "receivedAt": now_iso,
+            }
+            row = {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]}
+        else:
+            ack = {
+                "requestId": request_id,
+                "status": "accepted",
+                "deviceId": device_id,
+                "power": parsed["power"],
+                "receivedAt": now_iso,
+            }
+            ack.update(parameters)
+            row = {"status": "accepted", "receivedAt": now_iso, "command": parsed}
 
-    request_id = parsed.get("requestId")
-    device_id = parsed.get("deviceId")
-    power = parsed.get("power")
-    setpoint = parsed.get("setpoint")
+    if cache is not None:
+        cache.put(request_id, ack)
+    return ack, row
 
-    if not isinstance(request_id, str) or not request_id.strip():
+
+def handle_device_command(
+    payload: str,
+    log_path: str | Path | AuditLogWriter,
+    cache: RequestCache | None = None,
+    registry: DeviceRegistry | None = None,
+    max_bulk: int = 100,
+    limiter: CommandLimiter | None = None,
+) -> dict[str, Any]:
+    path = _resolve_log(log_path)
+    registry = registry or _default_registry()
+    now_iso = datetime.now(timezone.utc).isoformat()
+
+    try:
+        parsed = json.loads(payload)
+    except json.JSONDecodeError:
         ack = {
             "status": "rejected",
-            "reason": "Invalid requestId",
+            "reason": "Invalid JSON payload",
             "receivedAt": now_iso,
         }
-        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]})
+        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": payload, "reason": ack["reason"]})
         return ack
 
-    if device_id not in VALID_DEVICE_IDS:
+    if isinstance(parsed, list):
+        return _handle_bulk(parsed, None, payload, path, now_iso, cache, registry, max_bulk, limiter)
+    if not isinstance(parsed, dict):
         ack = {
-            "requestId": request_id,
             "status": "rejected",
-            "reason": "Invalid deviceId",
+            "reason": "Command payload must be a JSON object",
             "receivedAt": now_iso,
         }
-        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]})
+        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": payload, "reason": ack["reason"]})
         return ack
 
-    if power not in VALID_POWER_STATES:
+    ack, row = _evaluate_device_command(parsed, now_iso, cache, registry)
+    if row is not None:
+        _append_jsonl(path, row)
+    return ack
+
+
+def handle_bulk_device_command(
+    payload: str,
+    log_path: str | Path | AuditLogWriter,
+    cache: RequestCache | None = None,
+    registry: DeviceRegistry | None = None,
+    max_bulk: int = 100,
+    limiter: CommandLimiter | None = None,
+) -> dict[str, Any]:
+    path = _resolve_log(log_path)
+    registry = registry or _default_registry()
+    now_iso = datetime.now(timezone.utc).isoformat()
+
+    try:
+        parsed = json.loads(payload)
+    except json.JSONDecodeError:
+        parsed = None
+    bulk_id = None
+    if isinstance(parsed, dict):
+        bulk_id = parsed.get("requestId") if isinstance(parsed.get("requestId"), str) else None
+        parsed = parsed.get("commands")
+    if not isinstance(parsed, list):
         ack = {
-            "requestId": request_id,
-            "deviceId": device_id,
             "status": "rejected",
-            "reason": "Invalid power, expected 'on' or 'off'",
+            "reason": "Bulk payload must be a JSON array or an object with a commands array",
             "receivedAt": now_iso,
         }
-        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]})
+        if bulk_id is not None:
+            ack = {"requestId": bulk_id, **ack}
+        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": payload, "reason": ack["reason"]})
         return ack
+    return _handle_bulk(parsed, bulk_id, payload, path, now_iso, cache, registry, max_bulk, limiter)
 
-    if device_id == "ac_01":
-        if setpoint is not None:
-            if isinstance(setpoint, bool) or not isinstance(setpoint, (int, float)):
-                ack = {
-                    "requestId": request_id,
-                    "deviceId": device_id,
-                    "status": "rejected",
-                    "reason": "AC setpoint must be numeric",
-                    "receivedAt": now_iso,
-                }
-                _append_jsonl(
-                    path, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]}
-                )
-                return ack
-            setpoint = int(round(setpoint))
-            if not MIN_AC_SETPOINT <= setpoint <= MAX_AC_SETPOINT:
-                ack = {
-                    "requestId": request_id,
-                    "deviceId": device_id,
-                    "status": "rejected",
-                    "reason": f"AC setpoint must be in range {MIN_AC_SETPOINT}-{MAX_AC_SETPOINT}",
-                    "receivedAt": now_iso,
-                }
-                _append_jsonl(
-                    path, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]}
-                )
-                return ack
-    elif setpoint is not None:
-        ack = {
-            "requestId": request_id,
-            "deviceId": device_id,
-            "status": "rejected",
-            "reason": "setpoint is only valid for ac_01",
-            "receivedAt": now_iso,
-        }
-        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": parsed, "reason": ack["reason"]})
+
+def _handle_bulk(
+    commands: list[Any],
+    bulk_id: str | None,
+    payload: str,
+    path: Path | AuditLogWriter,
+    now_iso: str,
+    cache: RequestCache | None,
+    registry: DeviceRegistry,
+    max_bulk: int,
+    limiter: CommandLimiter | None = None,
+) -> dict[str, Any]:
+    reason = None
+    if not commands:
+        reason = "Bulk command is empty"
+    elif len(commands) > max_bulk:
+        reason = f"Bulk command exceeds {max_bulk} entries"
+    if reason is not None:
+        ack: dict[str, Any] = {"status": "rejected", "reason": reason, "receivedAt": now_iso}
+        if bulk_id is not None:
+            ack = {"requestId": bulk_id, **ack}
+        _append_jsonl(path, {"status": "rejected", "receivedAt": now_iso, "command": payload, "reason": reason})
         return ack
 
-    ack: dict[str, Any] = {
-        "requestId": request_id,
-        "status": "accepted",
-        "deviceId": device_id,
-        "power": power,
+    # Bulk payloads bypass the dispatcher's per-command limiting, so each entry is limited here. Every
+    # entry is admitted before any is checked: with coalescing only the last entry per device runs.
+    tickets: dict[int, int] = {}
+    if limiter is not None:
+        for idx, command in enumerate(commands):
+            if isinstance(command, dict) and isinstance(command.get("deviceId"), str):
+                tickets[idx] = limiter.admit(command["deviceId"])
+
+    results: list[dict[str, Any]] = []
+    rows: list[dict[str, Any]] = []
+    for idx, command in enumerate(commands):
+        verdict = limiter.check(command["deviceId"], tickets[idx]) if idx in tickets else None
+        if verdict is not None:
+            result = {
+                "deviceId": command["deviceId"],
+                "status": verdict,
+                "reason": LIMITED_REASONS[verdict],
+                "receivedAt": now_iso,
+            }
+            if isinstance(command.get("requestId"), str):
+                result = {"requestId": command["requestId"], **result}
+            row = None
+        elif isinstance(command, dict):
+            result, row = _evaluate_device_command(command, now_iso, cache, registry)
+        else:
+            result = {"status": "rejected", "reason": "Command payload must be a JSON object", "receivedAt": now_iso}
+            row = {"status": "rejected", "receivedAt": now_iso, "command": command, "reason": result["reason"]}
+        results.append(result)
+        if row is not None:
+            if bulk_id is not None:
+                row["bulkId"] = bulk_id
+            rows.append(row)
+    _append_jsonl_many(path, rows)
+
+    accepted = sum(1 for result in results if result.get("status") == "accepted")
+    if accepted == len(results):
+        status = "accepted"
+    elif accepted:
+        status = "partial"
+    else:
+        status = "rejected"
+    ack = {
+        "status": status,
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
         "receivedAt": now_iso,
     }
-    if setpoint is not None:
-        ack["setpoint"] = setpoint
-
-    _append_jsonl(path, {"status": "accepted", "receivedAt": now_iso, "command": parsed})
+    if bulk_id is not None:
+        ack = {"requestId": bulk_id, **ack}
     return ack
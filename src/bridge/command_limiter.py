@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+from typing import Callable
+
+SUPERSEDED = "superseded"
+RATE_LIMITED = "rate_limited"
+LIMITED_REASONS = {
+    SUPERSEDED: "Superseded by a newer command for this device",
+    RATE_LIMITED: "Device command rate limit exceeded",
+}
+
+
+@dataclass
+class _DeviceState:
+    tokens: float
+    updated_at: float
+    latest_ticket: int = 0
+
+
+class CommandLimiter:
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: int = 10,
+        coalesce_seconds: float = 0.0,
+        max_devices: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_devices <= 0:
+            raise ValueError("max_devices must be positive")
+        if rate > 0 and burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.coalesce_seconds = coalesce_seconds
+        self.max_devices = max_devices
+        self._clock = clock
+        self._devices: OrderedDict[str, _DeviceState] = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_ticket = 0
+
+        self.admitted = 0
+        self.superseded = 0
+        self.rate_limited = 0
+        self.evictions = 0
+
+    def _state_locked(self, device_id: str) -> _DeviceState:
+        state = self._devices.get(device_id)
+        if state is None:
+            state = _DeviceState(tokens=float(self.burst), updated_at=self._clock())
+            self._devices[device_id] = state
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._devices.move_to_end(device_id)
+        return state
+
+    def admit(self, device_id: str) -> int:
+        with self._lock:
+            self._next_ticket += 1
+            self._state_locked(device_id).latest_ticket = self._next_ticket
+            self.admitted += 1
+            return self._next_ticket
+
+    def check(self, device_id: str, ticket: int) -> str | None:
+        with self._lock:
+            state = self._state_locked(device_id)
+            # A newer command for the device arrived while this one was held: only the newest runs.
+            if self.coalesce_seconds > 0 and state.latest_ticket > ticket:
+                self.superseded += 1
+                return SUPERSEDED
+            if self.rate <= 0:
+                return None
+            now = self._clock()
+            state.tokens = min(float(self.burst), state.tokens + (now - state.updated_at) * self.rate)
+            state.updated_at = now
+            if state.tokens < 1.0:
+                self.rate_limited += 1
+                return RATE_LIMITED
+            state.tokens -= 1.0
+            return None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "devices": len(self._devices),
+                "admitted": self.admitted,
+                "superseded": self.superseded,
+                "rate_limited": self.rate_limited,
+                "evictions": self.evictions,
+            }
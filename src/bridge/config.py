@@ -26,14 +26,77 @@ class Config:
     mqtt_device_command_ack_topic: str
     device_id: str
     command_log_path: str
+    device_registry_path: str = ""
+    mqtt_device_bulk_command_topic: str = "home/pi/commands/device/bulk"
+    command_bulk_max: int = 100
+    command_log_batch_bytes: int = 65536
+    command_log_flush_ms: int = 1000
+    command_log_fsync: str = "interval"
+    command_log_fsync_interval_ms: int = 5000
+    command_log_rotate_bytes: int = 8388608
+    command_log_rotate_seconds: float = 86400.0
+    command_log_max_segments: int = 30
+    command_dedup_max_entries: int = 1024
+    command_dedup_ttl_seconds: float = 600.0
+    command_workers: int = 2
+    command_queue_size: int = 256
+    command_rate_limit: float = 0.0
+    command_rate_burst: int = 10
+    command_coalesce_ms: int = 0
+    command_limiter_max_devices: int = 1024
     automation_enabled: bool = True
     automation_window_seconds: int = 120
+    automation_mode: str = "tumbling"
+    automation_eval_interval_seconds: float = 5.0
+    automation_rules_path: str = ""
+    automation_min_samples: int = 1
+    automation_snapshot_path: str = ""
+    automation_snapshot_interval_seconds: float = 30.0
+    automation_local_dispatch: bool = False
+    automation_mirror_topic: str = ""
     auto_fan_on_temp_c: float = 29.0
     auto_fan_off_temp_c: float = 27.5
     auto_light_on_lux: float = 300.0
     auto_light_off_lux: float = 380.0
     mqtt_keepalive: int = 60
+    mqtt_sensor_qos: int = 1
+    mqtt_sensor_retain: bool = False
+    mqtt_sensor_latest_topic: str = ""
+    mqtt_command_qos: int = 1
+    mqtt_command_retain: bool = False
+    mqtt_ack_qos: int = 1
+    mqtt_ack_retain: bool = False
+    mqtt_max_inflight: int = 100
+    mqtt_inflight_timeout_ms: int = 100
+    mqtt_sensor_single_enabled: bool = True
+    mqtt_sensor_batch_enabled: bool = False
+    mqtt_sensor_batch_topic: str = "home/pi/sensors/batch"
+    mqtt_sensor_batch_max_count: int = 50
+    mqtt_sensor_batch_max_bytes: int = 32768
+    mqtt_sensor_batch_max_linger_ms: int = 1000
+    sensor_deadband_enabled: bool = False
+    sensor_deadband: str = "dht11_temp_c=0.5,dht11_humidity=1,lm393_raw=8,lm393_lux=5%"
+    sensor_heartbeat_seconds: float = 60.0
+    spool_enabled: bool = False
+    spool_dir: str = "/var/lib/rpi-sensor-bridge/spool"
+    spool_segment_bytes: int = 1048576
+    spool_max_bytes: int = 67108864
+    spool_max_age_seconds: float = 604800.0
+    spool_drain_rate: float = 20.0
+    spool_use_mmap: bool = False
+    sensor_store_enabled: bool = False
+    sensor_store_dir: str = "/var/lib/rpi-sensor-bridge/store"
+    sensor_store_segment_rows: int = 65536
+    sensor_store_max_segments: int = 8
     serial_timeout: float = 1.0
+    serial_read_mode: str = "batched"
+    serial_frame_format: str = "json"
+    serial_ports: str = ""
+    serial_rescan_seconds: float = 5.0
+    bridge_runtime: str = "threaded"
+    pipeline_enabled: bool = False
+    pipeline_capacity: int = 1024
+    pipeline_overflow_policy: str = "drop_oldest"
 
 
 def _read_int(env: Mapping[str, str], key: str, default: int) -> int:
@@ -68,11 +131,28 @@ def _read_bool(env: Mapping[str, str], key: str, default: bool) -> bool:
     raise ValueError(f"Environment variable {key} must be a boolean")
 
 
+def _read_qos(env: Mapping[str, str], key: str, default: int) -> int:
+    qos = _read_int(env, key, default)
+    if qos not in (0, 1, 2):
+        raise ValueError(f"Environment variable {key} must be 0, 1 or 2")
+    return qos
+
+
+def _read_choice(env: Mapping[str, str], key: str, default: str, choices: tuple[str, ...]) -> str:
+    raw = env.get(key)
+    if raw in (None, ""):
+        return default
+    normalized = raw.strip().lower()
+    if normalized not in choices:
+        raise ValueError(f"Environment variable {key} must be one of: {', '.join(choices)}")
+    return normalized
+
+
 def from_env(env: Mapping[str, str] | None = None) -> Config:
     load_dotenv()
     source = dict(os.environ) if env is None else dict(env)
 
-    return Config(
+    config = Config(
         serial_port=source.get("SERIAL_PORT", "/dev/ttyACM0"),
         serial_baud=_read_int(source, "SERIAL_BAUD", 9600),
         mqtt_host=source.get("MQTT_HOST", "127.0.0.1"),
@@ -86,12 +166,87 @@ def from_env(env: Mapping[str, str] | None = None) -> Config:
         mqtt_device_command_ack_topic=source.get("MQTT_DEVICE_COMMAND_ACK_TOPIC", "home/pi/commands/device/ack"),
         device_id=source.get("DEVICE_ID", "rpi-01"),
         command_log_path=source.get("COMMAND_LOG_PATH", "/var/log/rpi-sensor-bridge/commands.jsonl"),
+        device_registry_path=source.get("DEVICE_REGISTRY_PATH", ""),
+        mqtt_device_bulk_command_topic=source.get("MQTT_DEVICE_BULK_COMMAND_TOPIC", "home/pi/commands/device/bulk"),
+        command_bulk_max=_read_int(source, "COMMAND_BULK_MAX", 100),
+        command_log_batch_bytes=_read_int(source, "COMMAND_LOG_BATCH_BYTES", 65536),
+        command_log_flush_ms=_read_int(source, "COMMAND_LOG_FLUSH_MS", 1000),
+        command_log_fsync=_read_choice(source, "COMMAND_LOG_FSYNC", "interval", ("none", "interval", "batch")),
+        command_log_fsync_interval_ms=_read_int(source, "COMMAND_LOG_FSYNC_INTERVAL_MS", 5000),
+        command_log_rotate_bytes=_read_int(source, "COMMAND_LOG_ROTATE_BYTES", 8388608),
+        command_log_rotate_seconds=_read_float(source, "COMMAND_LOG_ROTATE_SECONDS", 86400.0),
+        command_log_max_segments=_read_int(source, "COMMAND_LOG_MAX_SEGMENTS", 30),
+        command_dedup_max_entries=_read_int(source, "COMMAND_DEDUP_MAX_ENTRIES", 1024),
+        command_dedup_ttl_seconds=_read_float(source, "COMMAND_DEDUP_TTL_SECONDS", 600.0),
+        command_workers=_read_int(source, "COMMAND_WORKERS", 2),
+        command_queue_size=_read_int(source, "COMMAND_QUEUE_SIZE", 256),
+        command_rate_limit=_read_float(source, "COMMAND_RATE_LIMIT", 0.0),
+        command_rate_burst=_read_int(source, "COMMAND_RATE_BURST", 10),
+        command_coalesce_ms=_read_int(source, "COMMAND_COALESCE_MS", 0),
+        command_limiter_max_devices=_read_int(source, "COMMAND_LIMITER_MAX_DEVICES", 1024),
         automation_enabled=_read_bool(source, "AUTOMATION_ENABLE", True),
         automation_window_seconds=_read_int(source, "AUTOMATION_WINDOW_SECONDS", 120),
+        automation_mode=_read_choice(source, "AUTOMATION_MODE", "tumbling", ("tumbling", "sliding")),
+        automation_eval_interval_seconds=_read_float(source, "AUTOMATION_EVAL_INTERVAL_SECONDS", 5.0),
+        automation_rules_path=source.get("AUTOMATION_RULES_PATH", ""),
+        automation_min_samples=_read_int(source, "AUTOMATION_MIN_SAMPLES", 1),
+        automation_snapshot_path=source.get("AUTOMATION_SNAPSHOT_PATH", ""),
+        automation_snapshot_interval_seconds=_read_float(source, "AUTOMATION_SNAPSHOT_INTERVAL_SECONDS", 30.0),
+        automation_local_dispatch=_read_bool(source, "AUTOMATION_LOCAL_DISPATCH", False),
+        automation_mirror_topic=source.get("AUTOMATION_MIRROR_TOPIC", ""),
         auto_fan_on_temp_c=_read_float(source, "AUTO_FAN_ON_TEMP_C", 29.0),
         auto_fan_off_temp_c=_read_float(source, "AUTO_FAN_OFF_TEMP_C", 27.5),
         auto_light_on_lux=_read_float(source, "AUTO_LIGHT_ON_LUX", 300.0),
         auto_light_off_lux=_read_float(source, "AUTO_LIGHT_OFF_LUX", 380.0),
         mqtt_keepalive=_read_int(source, "MQTT_KEEPALIVE", 60),
+        mqtt_sensor_qos=_read_qos(source, "MQTT_SENSOR_QOS", 1),
+        mqtt_sensor_retain=_read_bool(source, "MQTT_SENSOR_RETAIN", False),
+        mqtt_sensor_latest_topic=source.get("MQTT_SENSOR_LATEST_TOPIC", ""),
+        mqtt_command_qos=_read_qos(source, "MQTT_COMMAND_QOS", 1),
+        mqtt_command_retain=_read_bool(source, "MQTT_COMMAND_RETAIN", False),
+        mqtt_ack_qos=_read_qos(source, "MQTT_ACK_QOS", 1),
+        mqtt_ack_retain=_read_bool(source, "MQTT_ACK_RETAIN", False),
+        mqtt_max_inflight=_read_int(source, "MQTT_MAX_INFLIGHT", 100),
+        mqtt_inflight_timeout_ms=_read_int(source, "MQTT_INFLIGHT_TIMEOUT_MS", 100),
+        mqtt_sensor_single_enabled=_read_bool(source, "MQTT_SENSOR_SINGLE_ENABLE", True),
+        mqtt_sensor_batch_enabled=_read_bool(source, "MQTT_SENSOR_BATCH_ENABLE", False),
+        mqtt_sensor_batch_topic=source.get("MQTT_SENSOR_BATCH_TOPIC", "home/pi/sensors/batch"),
+        mqtt_sensor_batch_max_count=_read_int(source, "MQTT_SENSOR_BATCH_MAX_COUNT", 50),
+        mqtt_sensor_batch_max_bytes=_read_int(source, "MQTT_SENSOR_BATCH_MAX_BYTES", 32768),
+        mqtt_sensor_batch_max_linger_ms=_read_int(source, "MQTT_SENSOR_BATCH_MAX_LINGER_MS", 1000),
+        sensor_deadband_enabled=_read_bool(source, "SENSOR_DEADBAND_ENABLE", False),
+        sensor_deadband=source.get(
+            "SENSOR_DEADBAND",
+            "dht11_temp_c=0.5,dht11_humidity=1,lm393_raw=8,lm393_lux=5%",
+        ),
+        sensor_heartbeat_seconds=_read_float(source, "SENSOR_HEARTBEAT_SECONDS", 60.0),
+        spool_enabled=_read_bool(source, "SPOOL_ENABLE", False),
+        spool_dir=source.get("SPOOL_DIR", "/var/lib/rpi-sensor-bridge/spool"),
+        spool_segment_bytes=_read_int(source, "SPOOL_SEGMENT_BYTES", 1048576),
+        spool_max_bytes=_read_int(source, "SPOOL_MAX_BYTES", 67108864),
+        spool_max_age_seconds=_read_float(source, "SPOOL_MAX_AGE_SECONDS", 604800.0),
+        spool_drain_rate=_read_float(source, "SPOOL_DRAIN_RATE", 20.0),
+        spool_use_mmap=_read_bool(source, "SPOOL_USE_MMAP", False),
+        sensor_store_enabled=_read_bool(source, "SENSOR_STORE_ENABLE", False),
+        sensor_store_dir=source.get("SENSOR_STORE_DIR", "/var/lib/rpi-sensor-bridge/store"),
+        sensor_store_segment_rows=_read_int(source, "SENSOR_STORE_SEGMENT_ROWS", 65536),
+        sensor_store_max_segments=_read_int(source, "SENSOR_STORE_MAX_SEGMENTS", 8),
         serial_timeout=_read_float(source, "SERIAL_TIMEOUT", 1.0),
+        serial_read_mode=_read_choice(source, "SERIAL_READ_MODE", "batched", ("batched", "line")),
+        serial_frame_format=_read_choice(source, "SERIAL_FRAME_FORMAT", "json", ("json", "binary", "auto")),
+        serial_ports=source.get("SERIAL_PORTS", ""),
+        serial_rescan_seconds=_read_float(source, "SERIAL_RESCAN_SECONDS", 5.0),
+        bridge_runtime=_read_choice(source, "BRIDGE_RUNTIME", "threaded", ("threaded", "asyncio")),
+        pipeline_enabled=_read_bool(source, "PIPELINE_ENABLE", False),
+        pipeline_capacity=_read_int(source, "PIPELINE_CAPACITY", 1024),
+        pipeline_overflow_policy=_read_choice(
+            source,
+            "PIPELINE_OVERFLOW_POLICY",
+            "drop_oldest",
+            ("drop_oldest", "drop_newest", "block"),
+        ),
     )
+    # Line reads split on newline and return text; COBS frames end with 0x00 and need read_frames().
+    if config.serial_read_mode == "line" and config.serial_frame_format != "json":
+        raise ValueError("SERIAL_READ_MODE=line requires SERIAL_FRAME_FORMAT=json")
+    return config
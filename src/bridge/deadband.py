@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+from typing import Callable, Mapping
+
+from .serial_reader import REQUIRED_SENSOR_KEYS
+
+ALWAYS_PUBLISH_KEYS = ("pir",)
+
+
+@dataclass(frozen=True)
+class DeadbandRule:
+    absolute: float = 0.0
+    percent: float = 0.0
+
+    def exceeded(self, previous: float, current: float) -> bool:
+        delta = abs(current - previous)
+        if self.absolute and delta > self.absolute:
+            return True
+        if self.percent and delta > abs(previous) * self.percent / 100:
+            return True
+        return not self.absolute and not self.percent and delta > 0
+
+
+def parse_deadband_spec(raw: str) -> dict[str, DeadbandRule]:
+    rules: dict[str, DeadbandRule] = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, threshold = item.partition("=")
+        key = key.strip()
+        threshold = threshold.strip()
+        if not sep or key not in REQUIRED_SENSOR_KEYS:
+            raise ValueError(f"Invalid deadband entry: {item}")
+        try:
+            if threshold.endswith("%"):
+                rules[key] = DeadbandRule(percent=float(threshold[:-1]))
+            else:
+                rules[key] = DeadbandRule(absolute=float(threshold))
+        except ValueError as exc:
+            raise ValueError(f"Invalid deadband threshold for {key}: {threshold}") from exc
+    return rules
+
+
+class DeadbandFilter:
+    def __init__(
+        self,
+        rules: Mapping[str, DeadbandRule],
+        heartbeat_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rules = dict(rules)
+        self.heartbeat_seconds = heartbeat_seconds
+        self._clock = clock
+        self._last_values: dict[str, dict[str, float | int]] = {}
+        self._last_published_at: dict[str, float] = {}
+
+        self.published = 0
+        self.suppressed = 0
+
+    def should_publish(self, device_id: str, sensor_values: Mapping[str, float | int]) -> bool:
+        now = self._clock()
+        previous = self._last_values.get(device_id)
+        if previous is None or self._changed(previous, sensor_values):
+            return self._accept(device_id, sensor_values, now)
+
+        if self.heartbeat_seconds > 0 and now - self._last_published_at[device_id] >= self.heartbeat_seconds:
+            return self._accept(device_id, sensor_values, now)
+
+        self.suppressed += 1
+        return False
+
+    def _changed(self, previous: Mapping[str, float | int], current: Mapping[str, float | int]) -> bool:
+        for key in ALWAYS_PUBLISH_KEYS:
+            if previous.get(key) != current.get(key):
+                return True
+        for key, value in current.items():
+            if key in ALWAYS_PUBLISH_KEYS:
+                continue
+            last = previous.get(key)
+            if last is None:
+                return True
+            rule = self.rules.get(key)
+            if rule is None:
+                if value != last:
+                    return True
+            elif rule.exceeded(float(last), float(value)):
+                return True
+        return False
+
+    def _accept(self, device_id: str, sensor_values: Mapping[str, float | int], now: float) -> bool:
+        self._last_values[device_id] = dict(sensor_values)
+        self._last_published_at[device_id] = now
+        self.published += 1
+        return True
+
+    def stats(self) -> dict[str, int]:
+        return {"published": self.published, "suppressed": self.suppressed}
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+from typing import Any, Mapping
+
+DEFAULT_DEVICE_REGISTRY: dict[str, Any] = {
+    "devices": [
+        {"id": "fan_01", "power": ["on", "off"]},
+        {"id": "light_01", "power": ["on", "off"]},
+        {
+            "id": "ac_01",
+            "power": ["on", "off"],
+            "parameters": {"setpoint": {"label": "AC setpoint", "type": "int", "min": 16, "max": 27}},
+        },
+    ]
+}
+
+
+@dataclass(frozen=True)
+class ParameterRule:
+    name: str
+    label: str
+    minimum: float
+    maximum: float
+    integer: bool
+
+    def normalize(self, value: Any) -> tuple[str | None, float | int | None]:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"{self.label} must be numeric", None
+        normalized: float | int = int(round(value)) if self.integer else float(value)
+        if not self.minimum <= normalized <= self.maximum:
+            return f"{self.label} must be in range {_format_bound(self.minimum)}-{_format_bound(self.maximum)}", None
+        return None, normalized
+
+
+def _format_bound(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+class DeviceValidator:
+    def __init__(
+        self,
+        device_id: str,
+        power_states: tuple[str, ...],
+        parameters: tuple[ParameterRule, ...],
+        unsupported: tuple[tuple[str, str], ...],
+    ) -> None:
+        self.device_id = device_id
+        self.power_states = frozenset(power_states)
+        self.parameters = parameters
+        self._power_reason = "Invalid power, expected " + " or ".join(f"'{state}'" for state in power_states)
+        # (parameter name, rejection reason) for registry parameters this device does not support.
+        self._unsupported = unsupported
+
+    def validate(self, command: Mapping[str, Any]) -> tuple[str | None, dict[str, Any]]:
+        if command.get("power") not in self.power_states:
+            return self._power_reason, {}
+
+        values: dict[str, Any] = {}
+        for rule in self.parameters:
+            raw = command.get(rule.name)
+            if raw is None:
+                continue
+            reason, normalized = rule.normalize(raw)
+            if reason is not None:
+                return reason, {}
+            values[rule.name] = normalized
+
+        for name, reason in self._unsupported:
+            if command.get(name) is not None:
+                return reason, {}
+        return None, values
+
+
+class DeviceRegistry:
+    def __init__(self, validators: Mapping[str, DeviceValidator]) -> None:
+        self._validators = dict(validators)
+
+    def __len__(self) -> int:
+        return len(self._validators)
+
+    def __contains__(self, device_id: object) -> bool:
+        return device_id in self._validators
+
+    def get(self, device_id: Any) -> DeviceValidator | None:
+        if not isinstance(device_id, str):
+            return None
+        return self._validators.get(device_id)
+
+    @classmethod
+    def from_dict(cls, spec: Mapping[str, Any]) -> DeviceRegistry:
+        devices = spec.get("devices") if isinstance(spec, Mapping) else None
+        if not isinstance(devices, list) or not devices:
+            raise ValueError("Invalid device registry: expected a non-empty 'devices' list")
+
+        parsed: list[tuple[str, tuple[str, ...], tuple[ParameterRule, ...]]] = []
+        seen: set[str] = set()
+        supported_by: dict[str, list[str]] = {}
+        for entry in devices:
+            device_id, power_states, parameters = _parse_device(entry)
+            if device_id in seen:
+                raise ValueError(f"Invalid device registry: duplicate device id {device_id}")
+            seen.add(device_id)
+            parsed.append((device_id, power_states, parameters))
+            for rule in parameters:
+                supported_by.setdefault(rule.name, []).append(device_id)
+
+        unsupported_reasons = {
+            name: f"{name} is only valid for {', '.join(device_ids)}" for name, device_ids in supported_by.items()
+        }
+        validators = {}
+        for device_id, power_states, parameters in parsed:
+            own = {rule.name for rule in parameters}
+            unsupported = tuple((name, reason) for name, reason in unsupported_reasons.items() if name not in own)
+            validators[device_id] = DeviceValidator(device_id, power_states, parameters, unsupported)
+        return cls(validators)
+
+
+def _parse_device(entry: Any) -> tuple[str, tuple[str, ...], tuple[ParameterRule, ...]]:
+    if not isinstance(entry, Mapping) or not isinstance(entry.get("id"), str) or not entry["id"]:
+        raise ValueError(f"Invalid device registry entry: {entry!r}")
+    device_id = entry["id"]
+
+    power_states = entry.get("power", ["on", "off"])
+    if not isinstance(power_states, list) or not power_states or not all(isinstance(s, str) for s in power_states):
+        raise ValueError(f"Invalid device registry entry for {device_id}: power must be a list of strings")
+
+    parameters = entry.get("parameters", {})
+    if not isinstance(parameters, Mapping):
+        raise ValueError(f"Invalid device registry entry for {device_id}: parameters must be an object")
+    rules = []
+    for name, rule in parameters.items():
+        try:
+            minimum = float(rule["min"])
+            maximum = float(rule["max"])
+        except (TypeError, KeyError, ValueError) as exc:
+            raise ValueError(
+                f"Invalid device registry entry for {device_id}: parameter {name} needs numeric min and max"
+            ) from exc
+        if rule.get("type", "int") not in ("int", "float"):
+            raise ValueError(f"Invalid device registry entry for {device_id}: parameter {name} type must be int or float")
+        rules.append(
+            ParameterRule(
+                name=name,
+                label=str(rule.get("label", name)),
+                minimum=minimum,
+                maximum=maximum,
+                integer=rule.get("type", "int") == "int",
+            )
+        )
+    return device_id, tuple(power_states), tuple(rules)
+
+
+def load_device_registry(path: str | Path | None = None) -> DeviceRegistry:
+    if not path:
+        return DeviceRegistry.from_dict(DEFAULT_DEVICE_REGISTRY)
+    try:
+        spec = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"Invalid device registry {path}: {exc}") from exc
+    return DeviceRegistry.from_dict(spec)
@@ -1,17 +1,30 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+import json
 import logging
 import signal
 import threading
 import time
-from typing import Any
+from typing import Any, Callable
 
-from .automation import AutomationController
-from .command_handler import handle_device_command, handle_switch_command
+from .audit_log import AuditLogWriter
+from .automation import AutomationController, load_snapshot, save_snapshot
+from .batching import SensorBatcher
+from .command_dispatcher import CommandDispatcher, command_device_id
+from .command_handler import handle_bulk_device_command, handle_device_command, handle_switch_command
+from .command_limiter import LIMITED_REASONS, CommandLimiter
 from .config import Config, from_env
+from .deadband import DeadbandFilter, parse_deadband_spec
+from .device_registry import load_device_registry
 from .mqtt_client import MQTTBridgeClient
-from .serial_reader import SerialReader, parse_serial_line
+from .pipeline import SensorPipeline
+from .request_cache import RequestCache
+from .rules import default_rule_spec, load_rule_plan
+from .sensor_store import SensorStore
+from .serial_hub import SerialHub, parse_port_specs
+from .serial_reader import SerialReader, parse_frame
+from .spool import Spool
 
 LOGGER = logging.getLogger(__name__)
 
@@ -30,91 +43,571 @@ def build_sensor_payload(
     }
 
 
-def run(config: Config) -> None:
-    stop_event = threading.Event()
+def read_serial_frames(serial_reader: SerialReader, read_mode: str) -> list[str | bytes]:
+    if read_mode == "batched":
+        return serial_reader.read_frames()
 
-    def _signal_handler(signum: int, _frame: Any) -> None:
-        LOGGER.info("Received signal %s, shutting down", signum)
-        stop_event.set()
+    line = serial_reader.read_line()
+    if line is None:
+        time.sleep(0.05)
+        return []
+    return [line]
 
-    signal.signal(signal.SIGINT, _signal_handler)
-    signal.signal(signal.SIGTERM, _signal_handler)
+
+def build_audit_log(config: Config) -> AuditLogWriter:
+    audit_log = AuditLogWriter(
+        config.command_log_path,
+        max_batch_bytes=config.command_log_batch_bytes,
+        flush_interval=config.command_log_flush_ms / 1000,
+        fsync_policy=config.command_log_fsync,
+        fsync_interval=config.command_log_fsync_interval_ms / 1000,
+        rotate_bytes=config.command_log_rotate_bytes,
+        rotate_seconds=config.command_log_rotate_seconds,
+        max_segments=config.command_log_max_segments,
+    )
+    audit_log.start()
+    return audit_log
+
+
+def build_request_cache(config: Config) -> RequestCache | None:
+    if config.command_dedup_max_entries <= 0:
+        return None
+    return RequestCache(
+        max_entries=config.command_dedup_max_entries,
+        ttl_seconds=config.command_dedup_ttl_seconds,
+    )
+
+
+def build_command_callback(
+    config: Config,
+    audit_log: AuditLogWriter | None = None,
+    request_cache: RequestCache | None = None,
+    automation: AutomationController | None = None,
+    limiter: CommandLimiter | None = None,
+) -> Callable[[str, str], dict[str, Any]]:
+    log = audit_log or config.command_log_path
+    registry = load_device_registry(config.device_registry_path)
+    LOGGER.info("Device registry loaded: %s devices", len(registry))
 
     def _on_command(payload: str, topic: str) -> dict[str, Any]:
         if topic == config.mqtt_device_command_topic:
-            ack = handle_device_command(payload, config.command_log_path)
+            ack = handle_device_command(
+                payload,
+                log,
+                cache=request_cache,
+                registry=registry,
+                max_bulk=config.command_bulk_max,
+                limiter=limiter,
+            )
+            ack["_ack_topic"] = config.mqtt_device_command_ack_topic
+        elif config.mqtt_device_bulk_command_topic and topic == config.mqtt_device_bulk_command_topic:
+            ack = handle_bulk_device_command(
+                payload,
+                log,
+                cache=request_cache,
+                registry=registry,
+                max_bulk=config.command_bulk_max,
+                limiter=limiter,
+            )
             ack["_ack_topic"] = config.mqtt_device_command_ack_topic
         else:
-            ack = handle_switch_command(payload, config.command_log_path)
+            ack = handle_switch_command(payload, log)
             ack["_ack_topic"] = config.mqtt_command_ack_topic
+            LOGGER.info("Processed command from %s with status=%s", topic, ack.get("status"))
+            return ack
+        if automation is not None:
+            _confirm_device_acks(automation, ack)
         LOGGER.info("Processed command from %s with status=%s", topic, ack.get("status"))
         return ack
 
-    mqtt_client = MQTTBridgeClient(config, on_command=_on_command)
+    return _on_command
+
+
+def _device_ack(config: Config, payload: str, status: str, reason: str) -> dict[str, Any]:
+    ack: dict[str, Any] = {"status": status, "reason": reason, "receivedAt": datetime.now(timezone.utc).isoformat()}
+    try:
+        parsed = json.loads(payload)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, dict):
+        if isinstance(parsed.get("deviceId"), str):
+            ack = {"deviceId": parsed["deviceId"], **ack}
+        if isinstance(parsed.get("requestId"), str):
+            ack = {"requestId": parsed["requestId"], **ack}
+    ack["_ack_topic"] = config.mqtt_device_command_ack_topic
+    return ack
+
+
+def build_overflow_callback(config: Config) -> Callable[[str, str], dict[str, Any]]:
+    def _on_overflow(payload: str, topic: str) -> dict[str, Any]:
+        if topic not in (config.mqtt_device_command_topic, config.mqtt_device_bulk_command_topic):
+            return {
+                "status": "rejected",
+                "reason": "Command queue full",
+                "received_at": datetime.now(timezone.utc).isoformat(),
+                "_ack_topic": config.mqtt_command_ack_topic,
+            }
+        return _device_ack(config, payload, "rejected", "Command queue full")
+
+    return _on_overflow
+
+
+def build_limited_callback(config: Config) -> Callable[[str, str, str], dict[str, Any]]:
+    def _on_limited(payload: str, _topic: str, verdict: str) -> dict[str, Any]:
+        return _device_ack(config, payload, verdict, LIMITED_REASONS[verdict])
+
+    return _on_limited
+
+
+def build_command_limiter(config: Config) -> CommandLimiter | None:
+    if config.command_rate_limit <= 0 and config.command_coalesce_ms <= 0:
+        return None
+    LOGGER.info(
+        "Command limiter: rate=%s/s burst=%s coalesce_ms=%s",
+        config.command_rate_limit,
+        config.command_rate_burst,
+        config.command_coalesce_ms,
+    )
+    return CommandLimiter(
+        rate=config.command_rate_limit,
+        burst=config.command_rate_burst,
+        coalesce_seconds=config.command_coalesce_ms / 1000,
+        max_devices=config.command_limiter_max_devices,
+    )
+
+
+def _limit_inline(
+    on_command: Callable[[str, str], dict[str, Any]],
+    limiter: CommandLimiter,
+    on_limited: Callable[[str, str, str], dict[str, Any]],
+) -> Callable[[str, str], dict[str, Any]]:
+    # Without workers there is nothing to hold commands in, so only the token bucket applies.
+    def _on_command(payload: str, topic: str) -> dict[str, Any]:
+        device_id = command_device_id(payload)
+        if device_id is not None:
+            verdict = limiter.check(device_id, limiter.admit(device_id))
+            if verdict is not None:
+                return on_limited(payload, topic, verdict)
+        return on_command(payload, topic)
+
+    return _on_command
+
+
+def build_command_dispatcher(
+    config: Config,
+    on_command: Callable[[str, str], dict[str, Any]],
+    limiter: CommandLimiter | None = None,
+) -> CommandDispatcher | None:
+    if config.command_workers <= 0:
+        return None
+    LOGGER.info(
+        "Command worker pool: workers=%s queue_size=%s",
+        config.command_workers,
+        config.command_queue_size,
+    )
+    return CommandDispatcher(
+        on_command,
+        workers=config.command_workers,
+        queue_size=config.command_queue_size,
+        on_overflow=build_overflow_callback(config),
+        limiter=limiter,
+        on_limited=build_limited_callback(config),
+    )
+
+
+def build_serial_source(config: Config) -> tuple[SerialHub | SerialReader, Callable[[], list[tuple[str, str | bytes]]]]:
+    if config.serial_ports:
+        serial_hub = SerialHub(
+            parse_port_specs(config.serial_ports),
+            baud=config.serial_baud,
+            device_id=config.device_id,
+            timeout=config.serial_timeout,
+            rescan_interval=config.serial_rescan_seconds,
+            frame_format=config.serial_frame_format,
+        )
+
+        def _read_hub_frames() -> list[tuple[str, str | bytes]]:
+            return list(serial_hub.poll())
+
+        return serial_hub, _read_hub_frames
+
     serial_reader = SerialReader(
         port=config.serial_port,
         baud=config.serial_baud,
         timeout=config.serial_timeout,
+        frame_format=config.serial_frame_format,
     )
-    automation: AutomationController | None = None
-    if config.automation_enabled:
-        automation = AutomationController(
-            window_seconds=config.automation_window_seconds,
-            fan_on_temp_c=config.auto_fan_on_temp_c,
-            fan_off_temp_c=config.auto_fan_off_temp_c,
-            light_on_lux=config.auto_light_on_lux,
-            light_off_lux=config.auto_light_off_lux,
-        )
-        LOGGER.info(
-            "Automation enabled: window=%ss fan_on=%.2f fan_off=%.2f light_on=%.2f light_off=%.2f",
-            config.automation_window_seconds,
+
+    def _read_reader_frames() -> list[tuple[str, str | bytes]]:
+        return [(config.device_id, frame) for frame in read_serial_frames(serial_reader, config.serial_read_mode)]
+
+    return serial_reader, _read_reader_frames
+
+
+def build_automation(config: Config) -> AutomationController | None:
+    if not config.automation_enabled:
+        return None
+    if config.automation_mirror_topic and config.automation_mirror_topic in (
+        config.mqtt_device_command_topic,
+        config.mqtt_device_bulk_command_topic,
+    ):
+        # The bridge subscribes to these, so the mirror copy would come back and be executed again.
+        raise ValueError("AUTOMATION_MIRROR_TOPIC must differ from the device command topics")
+
+    rules = load_rule_plan(
+        config.automation_rules_path,
+        default_rule_spec(
             config.auto_fan_on_temp_c,
             config.auto_fan_off_temp_c,
             config.auto_light_on_lux,
             config.auto_light_off_lux,
+        ),
+    )
+    automation = AutomationController(
+        window_seconds=config.automation_window_seconds,
+        fan_on_temp_c=config.auto_fan_on_temp_c,
+        fan_off_temp_c=config.auto_fan_off_temp_c,
+        light_on_lux=config.auto_light_on_lux,
+        light_off_lux=config.auto_light_off_lux,
+        mode=config.automation_mode,
+        eval_interval_seconds=config.automation_eval_interval_seconds,
+        rules=rules,
+        min_samples=config.automation_min_samples,
+    )
+    LOGGER.info(
+        "Automation enabled: mode=%s window=%ss fan_on=%.2f fan_off=%.2f light_on=%.2f light_off=%.2f",
+        config.automation_mode,
+        config.automation_window_seconds,
+        config.auto_fan_on_temp_c,
+        config.auto_fan_off_temp_c,
+        config.auto_light_on_lux,
+        config.auto_light_off_lux,
+    )
+    if config.automation_rules_path:
+        LOGGER.info(
+            "Automation rules loaded from %s: %s rules over %s sensor aggregates",
+            config.automation_rules_path,
+            len(rules),
+            len(rules.slots),
         )
+    if config.automation_snapshot_path:
+        snapshot = load_snapshot(config.automation_snapshot_path)
+        if snapshot is not None:
+            try:
+                automation.restore(snapshot)
+            except (KeyError, TypeError, ValueError, IndexError) as exc:
+                LOGGER.warning("Ignoring invalid automation snapshot: %s", exc)
+            else:
+                LOGGER.info(
+                    "Automation state restored from %s: power=%s",
+                    config.automation_snapshot_path,
+                    automation.power_state(),
+                )
+    return automation
 
-    mqtt_client.connect()
 
-    try:
-        while not stop_event.is_set():
-            line = serial_reader.read_line()
-            if line is None:
-                time.sleep(0.05)
-                continue
+def _confirm_device_acks(automation: AutomationController, ack: dict[str, Any]) -> None:
+    for result in ack.get("results", [ack]):
+        if result.get("status") == "accepted" and "deviceId" in result and "power" in result:
+            automation.confirm(result["deviceId"], result["power"])
+
+
+def build_sensor_batcher(config: Config) -> SensorBatcher | None:
+    if not config.mqtt_sensor_batch_enabled:
+        return None
+    LOGGER.info(
+        "Sensor batching enabled: topic=%s max_count=%s max_bytes=%s max_linger_ms=%s",
+        config.mqtt_sensor_batch_topic,
+        config.mqtt_sensor_batch_max_count,
+        config.mqtt_sensor_batch_max_bytes,
+        config.mqtt_sensor_batch_max_linger_ms,
+    )
+    return SensorBatcher(
+        max_count=config.mqtt_sensor_batch_max_count,
+        max_bytes=config.mqtt_sensor_batch_max_bytes,
+        max_linger_seconds=config.mqtt_sensor_batch_max_linger_ms / 1000,
+    )
+
+
+def build_deadband_filter(config: Config) -> DeadbandFilter | None:
+    if not config.sensor_deadband_enabled:
+        return None
+    LOGGER.info(
+        "Sensor deadband enabled: %s heartbeat=%ss",
+        config.sensor_deadband,
+        config.sensor_heartbeat_seconds,
+    )
+    return DeadbandFilter(
+        parse_deadband_spec(config.sensor_deadband),
+        heartbeat_seconds=config.sensor_heartbeat_seconds,
+    )
+
+
+def build_spool(config: Config) -> Spool | None:
+    if not config.spool_enabled:
+        return None
+    spool = Spool(
+        config.spool_dir,
+        segment_bytes=config.spool_segment_bytes,
+        max_bytes=config.spool_max_bytes,
+        max_age_seconds=config.spool_max_age_seconds,
+        drain_rate=config.spool_drain_rate,
+        use_mmap=config.spool_use_mmap,
+    )
+    LOGGER.info(
+        "Publish spool enabled: dir=%s max_bytes=%s max_age=%ss drain_rate=%s/s pending_bytes=%s",
+        config.spool_dir,
+        config.spool_max_bytes,
+        config.spool_max_age_seconds,
+        config.spool_drain_rate,
+        spool.pending_bytes,
+    )
+    return spool
 
+
+def build_sensor_store(config: Config) -> SensorStore | None:
+    if not config.sensor_store_enabled:
+        return None
+    store = SensorStore(
+        config.sensor_store_dir,
+        segment_rows=config.sensor_store_segment_rows,
+        max_segments=config.sensor_store_max_segments,
+    )
+    LOGGER.info(
+        "Sensor store enabled: dir=%s segment_rows=%s max_segments=%s",
+        config.sensor_store_dir,
+        config.sensor_store_segment_rows,
+        config.sensor_store_max_segments,
+    )
+    return store
+
+
+class SensorFrameProcessor:
+    def __init__(
+        self,
+        mqtt_client: MQTTBridgeClient,
+        automation: AutomationController | None,
+        batcher: SensorBatcher | None = None,
+        publish_single: bool = True,
+        deadband: DeadbandFilter | None = None,
+        snapshot_path: str = "",
+        snapshot_interval: float = 30.0,
+        local_dispatch: bool = False,
+        store: SensorStore | None = None,
+        frame_format: str = "auto",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._mqtt_client = mqtt_client
+        self._automation = automation
+        self._batcher = batcher
+        self._publish_single = publish_single or batcher is None
+        self._deadband = deadband
+        self._snapshot_path = snapshot_path if automation is not None else ""
+        self._snapshot_interval = snapshot_interval
+        self._local_dispatch = local_dispatch
+        self._store = store
+        self._frame_format = frame_format
+        self._clock = clock
+        self._snapshot_due = clock() + snapshot_interval
+
+    def process(self, device_id: str, frame: str | bytes, received_at: datetime | None = None) -> None:
+        try:
+            sensor_values = parse_frame(frame, self._frame_format)
+        except ValueError as exc:
+            LOGGER.warning("Dropped serial frame: %s", exc)
+            return
+
+        if self._store is not None:
             try:
-                sensor_values = parse_serial_line(line)
-            except ValueError as exc:
-                LOGGER.warning("Dropped serial frame: %s", exc)
-                continue
+                self._store.append(device_id, sensor_values, received_at.timestamp() if received_at else None)
+            except (OSError, TypeError, ValueError) as exc:
+                LOGGER.warning("Failed to store sensor sample: %s", exc)
 
-            payload = build_sensor_payload(sensor_values, device_id=config.device_id)
-            published = mqtt_client.publish_sensor(payload)
+        if self._deadband is None or self._deadband.should_publish(device_id, sensor_values):
+            self._publish_sample(device_id, sensor_values, received_at)
+
+        if self._automation is None:
+            return
+
+        for command in self._automation.add_values(sensor_values):
+            self.publish_automation_command(command)
+
+    def _publish_sample(
+        self,
+        device_id: str,
+        sensor_values: dict[str, float | int],
+        received_at: datetime | None,
+    ) -> None:
+        payload = build_sensor_payload(sensor_values, device_id=device_id, received_at=received_at)
+        if self._publish_single:
+            published = self._mqtt_client.publish_sensor(payload)
             if not published:
                 LOGGER.warning("Failed to publish sensor payload")
 
-            if automation is not None:
-                commands = automation.add_sample(
-                    temperature_c=float(sensor_values["dht11_temp_c"]),
-                    lux=float(sensor_values["lm393_lux"]),
-                )
-                for command in commands:
-                    sent = mqtt_client.publish_device_command(command)
-                    if not sent:
-                        LOGGER.warning(
-                            "Failed to publish automation command for %s",
-                            command.get("deviceId"),
-                        )
-                    else:
-                        LOGGER.info(
-                            "Published automation command: device=%s power=%s",
-                            command.get("deviceId"),
-                            command.get("power"),
-                        )
+        if self._batcher is not None:
+            for batch in self._batcher.add(payload):
+                self._publish_batch(batch)
+
+    def tick(self) -> None:
+        if self._automation is not None:
+            for command in self._automation.tick():
+                self.publish_automation_command(command)
+        if self._batcher is not None:
+            batch = self._batcher.flush_due()
+            if batch is not None:
+                self._publish_batch(batch)
+        if self._snapshot_path and self._clock() >= self._snapshot_due:
+            self.save_snapshot()
+        self._mqtt_client.drain_spool()
+
+    def next_tick_in(self, interval: float) -> float:
+        deadline = self._automation.next_deadline() if self._automation is not None else None
+        if deadline is None:
+            return interval
+        return max(0.0, min(interval, deadline - time.monotonic()))
+
+    def flush(self) -> None:
+        if self._batcher is not None:
+            batch = self._batcher.flush()
+            if batch is not None:
+                self._publish_batch(batch)
+        if self._snapshot_path:
+            self.save_snapshot()
+
+    def save_snapshot(self) -> None:
+        self._snapshot_due = self._clock() + self._snapshot_interval
+        try:
+            save_snapshot(self._snapshot_path, self._automation.snapshot())
+        except OSError as exc:
+            LOGGER.warning("Failed to save automation snapshot to %s: %s", self._snapshot_path, exc)
+
+    def _publish_batch(self, batch: str) -> None:
+        if not self._mqtt_client.publish_sensor_batch(batch):
+            LOGGER.warning("Failed to publish sensor batch")
+
+    def publish_automation_command(self, command: dict[str, Any]) -> None:
+        if self._local_dispatch:
+            self._mqtt_client.dispatch_device_command(command)
+            LOGGER.info(
+                "Dispatched automation command locally: device=%s power=%s",
+                command.get("deviceId"),
+                command.get("power"),
+            )
+            return
+        sent = self._mqtt_client.publish_device_command(command)
+        if not sent:
+            LOGGER.warning(
+                "Failed to publish automation command for %s",
+                command.get("deviceId"),
+            )
+        else:
+            LOGGER.info(
+                "Published automation command: device=%s power=%s",
+                command.get("deviceId"),
+                command.get("power"),
+            )
+
+
+def run(config: Config) -> None:
+    stop_event = threading.Event()
+
+    def _signal_handler(signum: int, _frame: Any) -> None:
+        LOGGER.info("Received signal %s, shutting down", signum)
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, _signal_handler)
+    signal.signal(signal.SIGTERM, _signal_handler)
+
+    spool = build_spool(config)
+    audit_log = build_audit_log(config)
+    request_cache = build_request_cache(config)
+    automation = build_automation(config)
+    limiter = build_command_limiter(config)
+    handle_command = build_command_callback(config, audit_log, request_cache, automation=automation, limiter=limiter)
+    dispatcher = build_command_dispatcher(config, handle_command, limiter)
+    if dispatcher is not None:
+        on_command = dispatcher.submit
+    elif limiter is not None:
+        on_command = _limit_inline(handle_command, limiter, build_limited_callback(config))
+    else:
+        on_command = handle_command
+    mqtt_client = MQTTBridgeClient(config, on_command=on_command, spool=spool)
+    if dispatcher is not None:
+        dispatcher.bind(mqtt_client)
+        dispatcher.start()
+    serial_source, read_frames = build_serial_source(config)
+    store = build_sensor_store(config)
+    processor = SensorFrameProcessor(
+        mqtt_client,
+        automation,
+        batcher=build_sensor_batcher(config),
+        publish_single=config.mqtt_sensor_single_enabled,
+        deadband=build_deadband_filter(config),
+        snapshot_path=config.automation_snapshot_path,
+        snapshot_interval=config.automation_snapshot_interval_seconds,
+        local_dispatch=config.automation_local_dispatch,
+        store=store,
+        frame_format=config.serial_frame_format,
+    )
+
+    pipeline: SensorPipeline | None = None
+    if config.pipeline_enabled:
+        pipeline = SensorPipeline(
+            read_frames,
+            capacity=config.pipeline_capacity,
+            overflow_policy=config.pipeline_overflow_policy,
+        )
+        LOGGER.info(
+            "Pipeline enabled: capacity=%s overflow_policy=%s",
+            config.pipeline_capacity,
+            config.pipeline_overflow_policy,
+        )
+
+    mqtt_client.connect()
+
+    try:
+        if pipeline is None:
+            while not stop_event.is_set():
+                for device_id, frame in read_frames():
+                    processor.process(device_id, frame)
+                processor.tick()
+        else:
+            pipeline.start()
+            reported_drops = 0
+            while not stop_event.is_set():
+                for device_id, frame, received_at in pipeline.get_batch(timeout=config.serial_timeout):
+                    processor.process(device_id, frame, received_at)
+                processor.tick()
+                if pipeline.buffer.dropped != reported_drops:
+                    LOGGER.warning(
+                        "Pipeline dropped %s frames (policy=%s)",
+                        pipeline.buffer.dropped - reported_drops,
+                        config.pipeline_overflow_policy,
+                    )
+                    reported_drops = pipeline.buffer.dropped
     finally:
-        serial_reader.close()
+        if pipeline is not None:
+            pipeline.stop()
+            LOGGER.info("Pipeline stats at shutdown: %s", pipeline.stats())
+        serial_source.close()
+        if dispatcher is not None:
+            # In-flight commands confirm device state from their ACKs, so stop the workers before the final snapshot.
+            dispatcher.stop()
+            LOGGER.info("Command dispatcher stats at shutdown: %s", dispatcher.stats())
+        processor.flush()
+        LOGGER.info("MQTT publish stats at shutdown: %s", mqtt_client.publish_stats())
         mqtt_client.close()
+        audit_log.close()
+        if request_cache is not None:
+            LOGGER.info("Command dedup cache stats at shutdown: %s", request_cache.stats())
+        if limiter is not None:
+            LOGGER.info("Command limiter stats at shutdown: %s", limiter.stats())
+        if spool is not None:
+            LOGGER.info("Spool stats at shutdown: %s", spool.stats())
+            spool.close()
+        if store is not None:
+            LOGGER.info("Sensor store stats at shutdown: %s", store.stats())
+            store.close()
 
 
 def main() -> None:
@@ -123,6 +616,11 @@ def main() -> None:
         format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
     )
     config = from_env()
+    if config.bridge_runtime == "asyncio":
+        from .async_runtime import run_async
+
+        run_async(config)
+        return
     run(config)
 
 
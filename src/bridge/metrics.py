@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import bisect
+from typing import Sequence
+
+# 0.25 ms .. ~65 s in sqrt(2) steps; percentiles are reported at bucket resolution.
+DEFAULT_LATENCY_BOUNDS_MS = tuple(0.25 * 2 ** (step / 2) for step in range(37))
+
+
+class LatencyHistogram:
+    def __init__(self, bounds_ms: Sequence[float] = DEFAULT_LATENCY_BOUNDS_MS) -> None:
+        if not bounds_ms or list(bounds_ms) != sorted(bounds_ms):
+            raise ValueError("bounds_ms must be a non-empty ascending sequence")
+        self.bounds_ms = tuple(bounds_ms)
+        self._counts = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        value_ms = seconds * 1000
+        self._counts[bisect.bisect_left(self.bounds_ms, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, percent: float) -> float | None:
+        if self.count == 0:
+            return None
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for idx, bucket in enumerate(self._counts):
+            seen += bucket
+            if seen >= rank:
+                if idx == len(self.bounds_ms):
+                    return self.max_ms
+                return min(self.bounds_ms[idx], self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> dict[str, float | int | None]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms if self.count else None,
+        }
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+from collections import Counter
 import json
 import logging
+import threading
+import time
 from typing import Any, Callable
 
 from .config import Config
+from .metrics import LatencyHistogram
+from .spool import Spool
 
 try:
     import paho.mqtt.client as mqtt
@@ -13,6 +18,10 @@ except ModuleNotFoundError:  # pragma: no cover - exercised on Raspberry Pi runt
 
 LOGGER = logging.getLogger(__name__)
 
+# paho.mqtt.client return codes (the module is optional here).
+MQTT_ERR_SUCCESS = 0
+MQTT_ERR_NO_CONN = 4
+
 
 class MQTTBridgeClient:
     def __init__(
@@ -20,11 +29,39 @@ class MQTTBridgeClient:
         config: Config,
         on_command: Callable[[str, str], dict[str, Any]],
         mqtt_factory: Callable[[], Any] | None = None,
+        spool: Spool | None = None,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
         self._config = config
         self._on_command = on_command
         self._mqtt_factory = mqtt_factory
+        self._spool = spool
+        self._clock = clock
         self._client = None
+        self._spooled_policies = {
+            config.mqtt_sensor_topic: (config.mqtt_sensor_qos, config.mqtt_sensor_retain),
+            config.mqtt_sensor_batch_topic: (config.mqtt_sensor_qos, False),
+            config.mqtt_device_command_topic: (config.mqtt_command_qos, config.mqtt_command_retain),
+        }
+        self._loop_started = False
+
+        self.max_inflight = config.mqtt_max_inflight
+        self.inflight_timeout = config.mqtt_inflight_timeout_ms / 1000
+        self._inflight_lock = threading.Lock()
+        self._inflight_released = threading.Condition(self._inflight_lock)
+        self._inflight: dict[int, tuple[str, float]] = {}
+        self._inflight_per_topic: Counter[str] = Counter()
+        self._early_acks: set[int] = set()
+        self._reserved = 0
+        self._publisher_thread: threading.Thread | None = None
+        self._latency: dict[str, LatencyHistogram] = {}
+        self.backpressure_rejections = 0
+        self.queued_offline = 0
+        self.failed_acks = 0
+
+    @property
+    def client(self) -> Any:
+        return self._client
 
     def _resolve_factory(self) -> Callable[[], Any]:
         if self._mqtt_factory is not None:
@@ -33,80 +70,251 @@ class MQTTBridgeClient:
             raise RuntimeError("paho-mqtt is required to use MQTTBridgeClient")
         return mqtt.Client
 
-    def connect(self) -> None:
+    def connect(self, start_loop: bool = True) -> None:
         factory = self._resolve_factory()
         self._client = factory()
         self._client.on_connect = self._handle_connect
         self._client.on_message = self._handle_message
+        self._client.on_publish = self._handle_publish
+        if hasattr(self._client, "max_inflight_messages_set"):
+            self._client.max_inflight_messages_set(self.max_inflight)
 
         if self._config.mqtt_username:
             self._client.username_pw_set(self._config.mqtt_username, self._config.mqtt_password)
 
         self._client.connect(self._config.mqtt_host, self._config.mqtt_port, self._config.mqtt_keepalive)
-        self._client.loop_start()
+        if start_loop:
+            # Only the connecting thread waits for the window; paho's loop thread delivers the PUBACKs.
+            self._publisher_thread = threading.current_thread()
+            self._client.loop_start()
+            self._loop_started = True
 
     def _handle_connect(self, client: Any, _userdata: Any, _flags: Any, rc: int, _properties: Any = None) -> None:
         if rc != 0:
             LOGGER.error("MQTT connection failed with rc=%s", rc)
             return
-        client.subscribe(self._config.mqtt_command_topic, qos=1)
-        client.subscribe(self._config.mqtt_device_command_topic, qos=1)
+        client.subscribe(self._config.mqtt_command_topic, qos=self._config.mqtt_command_qos)
+        client.subscribe(self._config.mqtt_device_command_topic, qos=self._config.mqtt_command_qos)
         LOGGER.info(
             "Subscribed to command topics %s and %s",
             self._config.mqtt_command_topic,
             self._config.mqtt_device_command_topic,
         )
+        if self._config.mqtt_device_bulk_command_topic:
+            client.subscribe(self._config.mqtt_device_bulk_command_topic, qos=self._config.mqtt_command_qos)
+            LOGGER.info("Subscribed to bulk command topic %s", self._config.mqtt_device_bulk_command_topic)
 
     def _handle_message(self, _client: Any, _userdata: Any, msg: Any) -> None:
         try:
             payload = msg.payload.decode("utf-8")
         except Exception:
             payload = ""
+        self.dispatch_command(payload, msg.topic)
 
-        ack = self._on_command(payload, msg.topic)
+    def dispatch_command(self, payload: str, topic: str) -> None:
+        ack = self._on_command(payload, topic)
         if ack is not None:
             ack_topic = ack.pop("_ack_topic", None) if isinstance(ack, dict) else None
             self.publish_ack(ack, topic=ack_topic)
 
-    def publish_sensor(self, payload: dict[str, Any]) -> bool:
+    def _handle_publish(self, _client: Any, _userdata: Any, mid: int, *_args: Any) -> None:
+        now = self._clock()
+        with self._inflight_lock:
+            entry = self._inflight.pop(mid, None)
+            if entry is None:
+                self._early_acks.add(mid)
+                return
+            topic, enqueued_at = entry
+            self._complete(topic, now - enqueued_at)
+
+    def _complete(self, topic: str, latency: float) -> None:
+        self._inflight_per_topic[topic] -= 1
+        if not self._inflight_per_topic[topic]:
+            del self._inflight_per_topic[topic]
+        histogram = self._latency.get(topic)
+        if histogram is None:
+            histogram = self._latency[topic] = LatencyHistogram()
+        histogram.record(latency)
+        self._inflight_released.notify_all()
+
+    def _window_used(self) -> int:
+        return len(self._inflight) + self._reserved
+
+    def _reserve_slot(self, exempt: bool = False) -> bool:
+        with self._inflight_lock:
+            if exempt:
+                # ACKs and commands are few and must not be starved by sensor traffic; they count
+                # towards the window but never wait for or get rejected by it.
+                self._reserved += 1
+                return True
+            if (
+                self._window_used() >= self.max_inflight
+                and self.inflight_timeout > 0
+                and self._loop_started
+                and threading.current_thread() is self._publisher_thread
+            ):
+                self._inflight_released.wait_for(
+                    lambda: self._window_used() < self.max_inflight,
+                    timeout=self.inflight_timeout,
+                )
+            if self._window_used() >= self.max_inflight:
+                self.backpressure_rejections += 1
+                return False
+            self._reserved += 1
+            return True
+
+    def _track(self, topic: str, mid: int | None, enqueued_at: float) -> None:
+        with self._inflight_lock:
+            self._reserved -= 1
+            if mid is None:
+                self._inflight_released.notify_all()
+                return
+            self._inflight_per_topic[topic] += 1
+            if mid in self._early_acks:
+                self._early_acks.discard(mid)
+                self._complete(topic, self._clock() - enqueued_at)
+            else:
+                self._inflight[mid] = (topic, enqueued_at)
+
+    def _publish(
+        self,
+        topic: str,
+        payload: str,
+        qos: int = 1,
+        retain: bool = False,
+        spool: bool = False,
+        exempt: bool = False,
+    ) -> bool:
         if self._client is None:
             raise RuntimeError("MQTT client is not connected")
 
-        result = self._client.publish(
-            self._config.mqtt_sensor_topic,
-            json.dumps(payload, separators=(",", ":")),
-            qos=1,
-            retain=False,
+        published = False
+        if self._reserve_slot(exempt):
+            # Not under _inflight_lock: paho holds its own message mutex while calling on_publish.
+            enqueued_at = self._clock()
+            result = None
+            try:
+                result = self._client.publish(topic, payload, qos=qos, retain=retain)
+            finally:
+                rc = getattr(result, "rc", 1)
+                # paho keeps QoS>=1 messages published while disconnected and sends them after the
+                # reconnect; spooling them as well would deliver them (and run commands) twice.
+                # MQTT_ERR_QUEUE_SIZE and QoS 0 messages are dropped by paho and do get spooled.
+                queued = qos > 0 and rc == MQTT_ERR_NO_CONN
+                published = rc == MQTT_ERR_SUCCESS or queued
+                self._track(topic, getattr(result, "mid", None) if published else None, enqueued_at)
+            if queued:
+                with self._inflight_lock:
+                    self.queued_offline += 1
+
+        if not published and spool and self._spool is not None:
+            self._spool.append(topic, payload)
+        return published
+
+    def publish_sensor(self, payload: dict[str, Any]) -> bool:
+        config = self._config
+        body = json.dumps(payload, separators=(",", ":"))
+        published = self._publish(
+            config.mqtt_sensor_topic,
+            body,
+            qos=config.mqtt_sensor_qos,
+            retain=config.mqtt_sensor_retain,
+            spool=True,
         )
-        return getattr(result, "rc", 1) == 0
+        if config.mqtt_sensor_latest_topic:
+            latest_topic = config.mqtt_sensor_latest_topic.replace("{device_id}", str(payload.get("device_id", "")))
+            self._publish(latest_topic, body, qos=config.mqtt_sensor_qos, retain=True)
+        return published
 
-    def publish_ack(self, payload: dict[str, Any], topic: str | None = None) -> bool:
-        if self._client is None:
-            raise RuntimeError("MQTT client is not connected")
+    def publish_sensor_batch(self, batch: str) -> bool:
+        return self._publish(
+            self._config.mqtt_sensor_batch_topic,
+            batch,
+            qos=self._config.mqtt_sensor_qos,
+            spool=True,
+        )
 
-        result = self._client.publish(
-            topic or self._config.mqtt_command_ack_topic,
+    def publish_ack(self, payload: dict[str, Any], topic: str | None = None) -> bool:
+        topic = topic or self._config.mqtt_command_ack_topic
+        published = self._publish(
+            topic,
             json.dumps(payload, separators=(",", ":")),
-            qos=1,
-            retain=False,
+            qos=self._config.mqtt_ack_qos,
+            retain=self._config.mqtt_ack_retain,
+            exempt=True,
         )
-        return getattr(result, "rc", 1) == 0
+        if not published:
+            with self._inflight_lock:
+                self.failed_acks += 1
+            LOGGER.warning(
+                "Failed to publish ACK to %s: requestId=%s status=%s",
+                topic,
+                payload.get("requestId"),
+                payload.get("status"),
+            )
+        return published
 
     def publish_device_command(self, payload: dict[str, Any]) -> bool:
-        if self._client is None:
-            raise RuntimeError("MQTT client is not connected")
-
-        result = self._client.publish(
+        return self._publish(
             self._config.mqtt_device_command_topic,
             json.dumps(payload, separators=(",", ":")),
-            qos=1,
-            retain=False,
+            qos=self._config.mqtt_command_qos,
+            retain=self._config.mqtt_command_retain,
+            spool=True,
+            exempt=True,
         )
-        return getattr(result, "rc", 1) == 0
+
+    def dispatch_device_command(self, payload: dict[str, Any]) -> None:
+        # Feeds a locally generated command straight into the command pipeline; only its ACK (and the
+        # optional mirror copy) goes to the broker instead of a publish/subscribe round trip.
+        encoded = json.dumps(payload, separators=(",", ":"))
+        mirror_topic = self._config.automation_mirror_topic
+        if mirror_topic and not self._publish(mirror_topic, encoded, qos=self._config.mqtt_command_qos, exempt=True):
+            LOGGER.warning("Failed to publish automation command mirror to %s", mirror_topic)
+        self.dispatch_command(encoded, self._config.mqtt_device_command_topic)
+
+    def _publish_spooled(self, topic: str, payload: str) -> bool:
+        qos, retain = self._spooled_policies.get(topic, (1, False))
+        return self._publish(topic, payload, qos=qos, retain=retain)
+
+    def is_connected(self) -> bool:
+        if self._client is None:
+            return False
+        is_connected = getattr(self._client, "is_connected", None)
+        return True if is_connected is None else bool(is_connected())
+
+    def drain_spool(self) -> int:
+        if self._spool is None or not self._spool.pending_bytes or not self.is_connected():
+            return 0
+        return self._spool.drain(self._publish_spooled)
+
+    @property
+    def inflight(self) -> int:
+        with self._inflight_lock:
+            return len(self._inflight)
+
+    def publish_stats(self) -> dict[str, Any]:
+        with self._inflight_lock:
+            return {
+                "inflight": len(self._inflight),
+                "max_inflight": self.max_inflight,
+                "inflight_per_topic": dict(self._inflight_per_topic),
+                "backpressure_rejections": self.backpressure_rejections,
+                "queued_offline": self.queued_offline,
+                "failed_acks": self.failed_acks,
+                "latency": {topic: histogram.snapshot() for topic, histogram in self._latency.items()},
+            }
 
     def close(self) -> None:
         if self._client is None:
             return
-        self._client.loop_stop()
+        if self._loop_started:
+            self._client.loop_stop()
+            self._loop_started = False
         self._client.disconnect()
         self._client = None
+        with self._inflight_lock:
+            self._inflight.clear()
+            self._inflight_per_topic.clear()
+            self._early_acks.clear()
+            self._inflight_released.notify_all()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+LOGGER = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class RingBuffer:
+    def __init__(self, capacity: int, overflow_policy: str = "drop_oldest") -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of: {', '.join(OVERFLOW_POLICIES)}")
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+
+        self._slots: list[Any] = [None] * capacity
+        self._head = 0
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        self.pushed = 0
+        self.popped = 0
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def put(self, item: Any, timeout: float | None = None) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+
+            if self._size == self.capacity:
+                if self.overflow_policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.overflow_policy == "drop_oldest":
+                    self._slots[self._head] = None
+                    self._head = (self._head + 1) % self.capacity
+                    self._size -= 1
+                    self.dropped += 1
+                else:
+                    deadline = None if timeout is None else time.monotonic() + timeout
+                    while self._size == self.capacity and not self._closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._not_full.wait(remaining)
+                    if self._closed:
+                        return False
+
+            self._slots[(self._head + self._size) % self.capacity] = item
+            self._size += 1
+            self.pushed += 1
+            if self._size > self.high_watermark:
+                self.high_watermark = self._size
+            self._not_empty.notify()
+            return True
+
+    def get_batch(self, max_items: int, timeout: float | None = None) -> list[Any]:
+        with self._lock:
+            if self._size == 0 and not self._closed:
+                self._not_empty.wait(timeout)
+
+            count = min(max_items, self._size)
+            items = []
+            for _ in range(count):
+                items.append(self._slots[self._head])
+                self._slots[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+            self._size -= count
+            self.popped += count
+            if count:
+                self._not_full.notify_all()
+            return items
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "depth": self._size,
+                "capacity": self.capacity,
+                "pushed": self.pushed,
+                "popped": self.popped,
+                "dropped": self.dropped,
+                "high_watermark": self.high_watermark,
+            }
+
+
+class SensorPipeline:
+    def __init__(
+        self,
+        read_frames: Callable[[], list[tuple[str, Any]]],
+        capacity: int = 1024,
+        overflow_policy: str = "drop_oldest",
+        batch_size: int = 64,
+    ) -> None:
+        self._read_frames = read_frames
+        self.buffer = RingBuffer(capacity, overflow_policy)
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.frames_read = 0
+        self.read_errors = 0
+        self.frames_processed = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._reader_loop, name="serial-reader", daemon=True)
+        self._thread.start()
+
+    def _reader_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                frames = self._read_frames()
+            except Exception:
+                self.read_errors += 1
+                LOGGER.exception("Serial reader stage failed")
+                self._stop_event.wait(1.0)
+                continue
+
+            if not frames:
+                continue
+            received_at = datetime.now(timezone.utc)
+            for device_id, frame in frames:
+                self.frames_read += 1
+                self.buffer.put((device_id, frame, received_at))
+
+    def get_batch(self, timeout: float | None = None) -> list[tuple[str, Any, datetime]]:
+        items = self.buffer.get_batch(self.batch_size, timeout)
+        self.frames_processed += len(items)
+        return items
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop_event.set()
+        self.buffer.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "reader": {"frames_read": self.frames_read, "read_errors": self.read_errors},
+            "buffer": self.buffer.stats(),
+            "publisher": {"frames_processed": self.frames_processed},
+        }
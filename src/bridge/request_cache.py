@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Callable
+
+
+class RequestCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, request_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, ack = entry
+            if self.ttl_seconds > 0 and self._clock() - stored_at >= self.ttl_seconds:
+                del self._entries[request_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(request_id)
+            self.hits += 1
+            return dict(ack)
+
+    def put(self, request_id: str, ack: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[request_id] = (self._clock(), dict(ack))
+            self._entries.move_to_end(request_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+from typing import Any, Mapping, Sequence
+
+AGGREGATES = ("mean", "min", "max", "last")
+
+
+def default_rule_spec(
+    fan_on_temp_c: float,
+    fan_off_temp_c: float,
+    light_on_lux: float,
+    light_off_lux: float,
+) -> dict[str, Any]:
+    return {
+        "rules": [
+            {
+                "id": "fan",
+                "device": "fan_01",
+                "sensor": "dht11_temp_c",
+                "aggregate": "mean",
+                "on_above": fan_on_temp_c,
+                "off_below": fan_off_temp_c,
+            },
+            {
+                "id": "light",
+                "device": "light_01",
+                "sensor": "lm393_lux",
+                "aggregate": "mean",
+                "on_below": light_on_lux,
+                "off_above": light_off_lux,
+            },
+        ]
+    }
+
+
+@dataclass(frozen=True)
+class Condition:
+    slot: int
+    minimum: float | None
+    maximum: float | None
+
+    def holds(self, values: Sequence[float | None]) -> bool | None:
+        value = values[self.slot]
+        if value is None:
+            return None
+        if self.minimum is not None and value < self.minimum:
+            return False
+        return self.maximum is None or value <= self.maximum
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    rule_id: str
+    device_id: str
+    slot: int
+    on_threshold: float
+    off_threshold: float
+    # rising: on above on_threshold, off below off_threshold; falling is the mirror image.
+    rising: bool
+    conditions: tuple[Condition, ...]
+
+    def next_power(self, values: Sequence[float | None], power: str) -> str:
+        for condition in self.conditions:
+            holds = condition.holds(values)
+            if holds is None:
+                return power
+            if not holds:
+                return "off"
+
+        value = values[self.slot]
+        if value is None:
+            return power
+        if self.rising:
+            if power == "off" and value > self.on_threshold:
+                return "on"
+            if power == "on" and value < self.off_threshold:
+                return "off"
+        else:
+            if power == "off" and value < self.on_threshold:
+                return "on"
+            if power == "on" and value > self.off_threshold:
+                return "off"
+        return power
+
+
+class RulePlan:
+    def __init__(
+        self,
+        sensors: tuple[str, ...],
+        slots: tuple[tuple[int, str], ...],
+        rules: tuple[CompiledRule, ...],
+    ) -> None:
+        # Every (sensor, aggregate) pair is computed once per evaluation and shared by all rules using it.
+        self.sensors = sensors
+        self.slots = slots
+        self.rules = rules
+        self.devices = tuple(rule.device_id for rule in rules)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def decide(self, values: Sequence[float | None], power: Mapping[str, str]) -> list[tuple[str, str]]:
+        changes = []
+        for rule in self.rules:
+            current = power.get(rule.device_id, "off")
+            next_power = rule.next_power(values, current)
+            if next_power != current:
+                changes.append((rule.device_id, next_power))
+        return changes
+
+    @classmethod
+    def from_dict(cls, spec: Mapping[str, Any]) -> RulePlan:
+        rules = spec.get("rules") if isinstance(spec, Mapping) else None
+        if not isinstance(rules, list) or not rules:
+            raise ValueError("Invalid automation rules: expected a non-empty 'rules' list")
+
+        sensors: dict[str, int] = {}
+        slots: dict[tuple[int, str], int] = {}
+
+        def _slot(sensor: Any, aggregate: Any, where: str) -> int:
+            if not isinstance(sensor, str) or not sensor:
+                raise ValueError(f"Invalid automation rule {where}: sensor must be a non-empty string")
+            if aggregate not in AGGREGATES:
+                raise ValueError(f"Invalid automation rule {where}: aggregate must be one of: {', '.join(AGGREGATES)}")
+            key = (sensors.setdefault(sensor, len(sensors)), aggregate)
+            return slots.setdefault(key, len(slots))
+
+        compiled = []
+        devices: set[str] = set()
+        for entry in rules:
+            if not isinstance(entry, Mapping) or not isinstance(entry.get("device"), str) or not entry["device"]:
+                raise ValueError(f"Invalid automation rule: {entry!r}")
+            rule_id = str(entry.get("id", entry["device"]))
+            if entry["device"] in devices:
+                raise ValueError(f"Invalid automation rule {rule_id}: device {entry['device']} already has a rule")
+            devices.add(entry["device"])
+
+            slot = _slot(entry.get("sensor"), entry.get("aggregate", "mean"), rule_id)
+            on_threshold, off_threshold, rising = _parse_thresholds(entry, rule_id)
+
+            when = entry.get("when", [])
+            if not isinstance(when, list):
+                raise ValueError(f"Invalid automation rule {rule_id}: when must be a list")
+            conditions = []
+            for condition in when:
+                if not isinstance(condition, Mapping):
+                    raise ValueError(f"Invalid automation rule {rule_id}: condition {condition!r}")
+                conditions.append(
+                    Condition(
+                        slot=_slot(condition.get("sensor"), condition.get("aggregate", "last"), rule_id),
+                        minimum=_optional_number(condition, "min", rule_id),
+                        maximum=_optional_number(condition, "max", rule_id),
+                    )
+                )
+            compiled.append(
+                CompiledRule(
+                    rule_id=rule_id,
+                    device_id=entry["device"],
+                    slot=slot,
+                    on_threshold=on_threshold,
+                    off_threshold=off_threshold,
+                    rising=rising,
+                    conditions=tuple(conditions),
+                )
+            )
+
+        ordered_slots = tuple(sorted(slots, key=slots.__getitem__))
+        return cls(tuple(sensors), ordered_slots, tuple(compiled))
+
+
+def _optional_number(entry: Mapping[str, Any], key: str, rule_id: str) -> float | None:
+    value = entry.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Invalid automation rule {rule_id}: {key} must be numeric")
+    return float(value)
+
+
+def _parse_thresholds(entry: Mapping[str, Any], rule_id: str) -> tuple[float, float, bool]:
+    on_above = _optional_number(entry, "on_above", rule_id)
+    off_below = _optional_number(entry, "off_below", rule_id)
+    on_below = _optional_number(entry, "on_below", rule_id)
+    off_above = _optional_number(entry, "off_above", rule_id)
+
+    if on_above is not None and off_below is not None and on_below is None and off_above is None:
+        if off_below > on_above:
+            raise ValueError(f"Invalid automation rule {rule_id}: off_below must not exceed on_above")
+        return on_above, off_below, True
+    if on_below is not None and off_above is not None and on_above is None and off_below is None:
+        if off_above < on_below:
+            raise ValueError(f"Invalid automation rule {rule_id}: off_above must not be below on_below")
+        return on_below, off_above, False
+    raise ValueError(f"Invalid automation rule {rule_id}: expected on_above/off_below or on_below/off_above")
+
+
+def load_rule_plan(path: str | Path | None, default_spec: Mapping[str, Any]) -> RulePlan:
+    if not path:
+        return RulePlan.from_dict(default_spec)
+    try:
+        spec = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"Invalid automation rules {path}: {exc}") from exc
+    return RulePlan.from_dict(spec)
@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+import argparse
+from array import array
+import bisect
+from datetime import datetime, timezone
+import json
+import logging
+import math
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Iterator, Mapping, Sequence
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover - only needed for numpy=True scans
+    np = None
+
+from .serial_reader import REQUIRED_SENSOR_KEYS
+
+LOGGER = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "sensors-"
+SEGMENT_SUFFIX = ".seg"
+DEVICES_FILE = "devices.json"
+
+SEGMENT_MAGIC = b"BSTS"
+SEGMENT_VERSION = 1
+# magic, version, capacity, rows. rows is bumped only after a row's columns are written, so a reader
+# in another process never sees a half-written row.
+SEGMENT_HEADER = struct.Struct("<4sHxxII")
+ROWS_FIELD = struct.Struct("<I")
+ROWS_OFFSET = SEGMENT_HEADER.size - ROWS_FIELD.size
+HEADER_BYTES = 64
+
+# Column name -> array typecode. ts is unix seconds, device indexes devices.json; every required
+# sensor key gets its own column (pir and the raw ADC value are small integers, the rest float32).
+_SENSOR_TYPECODES = {"pir": "B", "lm393_raw": "H"}
+COLUMNS: dict[str, str] = {
+    "ts": "d",
+    "device": "H",
+    **{key: _SENSOR_TYPECODES.get(key, "f") for key in REQUIRED_SENSOR_KEYS},
+}
+SENSOR_COLUMNS = tuple(REQUIRED_SENSOR_KEYS)
+# Frames may carry integral readings as floats (e.g. "pir": 1.0); integer columns only take ints.
+_SENSOR_CASTS = tuple(float if COLUMNS[key] in "fd" else int for key in SENSOR_COLUMNS)
+
+
+def _column_layout(capacity: int) -> tuple[dict[str, tuple[int, int]], int]:
+    layout = {}
+    offset = HEADER_BYTES
+    for name, code in COLUMNS.items():
+        size = capacity * array(code).itemsize
+        layout[name] = (offset, size)
+        offset += (size + 7) & ~7
+    return layout, offset
+
+
+def segment_path(directory: Path, seq: int) -> Path:
+    return directory / f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory: Path) -> list[int]:
+    seqs = []
+    for path in directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+        try:
+            seqs.append(int(path.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]))
+        except ValueError:
+            continue
+    return sorted(seqs)
+
+
+class _Segment:
+    def __init__(self, path: Path, capacity: int = 0, writable: bool = False) -> None:
+        self.path = path
+        create = writable and not path.exists()
+        with path.open("w+b" if create else ("r+b" if writable else "rb")) as handle:
+            if create:
+                handle.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, capacity, 0))
+                handle.truncate(_column_layout(capacity)[1])
+                handle.flush()
+            self._map = mmap.mmap(
+                handle.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            )
+        magic, version, capacity, _rows = SEGMENT_HEADER.unpack_from(self._map, 0)
+        layout, size = _column_layout(capacity)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION or len(self._map) < size:
+            self._map.close()
+            raise ValueError(f"Invalid sensor store segment {path.name}")
+        self.capacity = capacity
+        self._view = memoryview(self._map)
+        self.columns = {
+            name: self._view[offset : offset + length].cast(COLUMNS[name])
+            for name, (offset, length) in layout.items()
+        }
+
+    @property
+    def rows(self) -> int:
+        return min(ROWS_FIELD.unpack_from(self._map, ROWS_OFFSET)[0], self.capacity)
+
+    def append(self, values: Sequence[float | int]) -> None:
+        row = self.rows
+        for column, value in zip(self.columns.values(), values):
+            column[row] = value
+        ROWS_FIELD.pack_into(self._map, ROWS_OFFSET, row + 1)
+
+    def bounds(self, start: float | None, end: float | None) -> tuple[int, int]:
+        rows = self.rows
+        ts = self.columns["ts"]
+        lo = 0 if start is None else bisect.bisect_left(ts, start, 0, rows)
+        hi = rows if end is None else bisect.bisect_left(ts, end, lo, rows)
+        return lo, hi
+
+    def flush(self) -> None:
+        self._map.flush()
+
+    def close(self) -> None:
+        for column in self.columns.values():
+            column.release()
+        self._view.release()
+        self._map.close()
+
+
+class SensorStore:
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_rows: int = 65536,
+        max_segments: int = 8,
+        readonly: bool = False,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        if segment_rows <= 0:
+            raise ValueError("segment_rows must be positive")
+        if max_segments <= 0:
+            raise ValueError("max_segments must be positive")
+        self.directory = Path(directory)
+        self.segment_rows = segment_rows
+        self.max_segments = max_segments
+        self.readonly = readonly
+        self._wall_clock = wall_clock
+        self._lock = threading.Lock()
+        self._writer: _Segment | None = None
+        self._write_seq = 0
+        self._last_ts = -math.inf
+
+        self.appended = 0
+        self.clamped = 0
+        self.rotations = 0
+        self.dropped_segments = 0
+
+        if not readonly:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._reload_devices()
+        if not readonly:
+            self._resume()
+
+    def _load_devices(self) -> list[str]:
+        try:
+            devices = json.loads((self.directory / DEVICES_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable sensor store device table: %s", exc)
+            return []
+        return [str(name) for name in devices] if isinstance(devices, list) else []
+
+    def _save_devices(self) -> None:
+        path = self.directory / DEVICES_FILE
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._devices), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _resume(self) -> None:
+        seqs = list_segments(self.directory)
+        self._write_seq = seqs[-1] if seqs else 0
+        if not seqs:
+            return
+        try:
+            segment = _Segment(segment_path(self.directory, seqs[-1]), writable=True)
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Not resuming sensor store segment %s: %s", seqs[-1], exc)
+            return
+        if segment.rows:
+            self._last_ts = segment.columns["ts"][segment.rows - 1]
+        if segment.rows >= segment.capacity:
+            segment.close()
+            return
+        self._writer = segment
+
+    def _rotate_locked(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+            self._writer.close()
+            self._writer = None
+            self.rotations += 1
+        self._write_seq += 1
+        self._writer = _Segment(segment_path(self.directory, self._write_seq), self.segment_rows, writable=True)
+        for seq in list_segments(self.directory)[: -self.max_segments]:
+            LOGGER.info("Removing old sensor store segment %s", seq)
+            segment_path(self.directory, seq).unlink(missing_ok=True)
+            self.dropped_segments += 1
+
+    def _device_locked(self, device_id: str) -> int:
+        idx = self._device_index.get(device_id)
+        if idx is None:
+            if len(self._devices) > 0xFFFF:
+                raise ValueError("Sensor store supports at most 65536 device ids")
+            idx = len(self._devices)
+            self._devices.append(device_id)
+            self._device_index[device_id] = idx
+            self._save_devices()
+        return idx
+
+    def append(self, device_id: str, sensor_values: Mapping[str, float | int], ts: float | None = None) -> None:
+        if self.readonly:
+            raise RuntimeError("Sensor store is read-only")
+        ts = self._wall_clock() if ts is None else ts
+        try:
+            row = [cast(sensor_values[key]) for key, cast in zip(SENSOR_COLUMNS, _SENSOR_CASTS)]
+        except (TypeError, OverflowError) as exc:
+            raise ValueError(f"Invalid sensor value: {exc}") from exc
+        with self._lock:
+            # The ts column is kept sorted so range scans can bisect; a wall clock stepping back
+            # (NTP) is clamped to the previous row's timestamp.
+            if ts < self._last_ts:
+                ts = self._last_ts
+                self.clamped += 1
+            if self._writer is None or self._writer.rows >= self._writer.capacity:
+                self._rotate_locked()
+            self._writer.append([ts, self._device_locked(device_id), *row])
+            self._last_ts = ts
+            self.appended += 1
+
+    def _iter_ranges(self, start: float | None, end: float | None) -> Iterator[tuple[_Segment, int, int]]:
+        with self._lock:
+            seqs = list_segments(self.directory)
+        for seq in seqs:
+            try:
+                segment = _Segment(segment_path(self.directory, seq))
+            except FileNotFoundError:
+                continue  # dropped by the writer since it was listed
+            except ValueError as exc:
+                LOGGER.warning("Skipping sensor store segment: %s", exc)
+                continue
+            try:
+                lo, hi = segment.bounds(start, end)
+                if hi > lo:
+                    yield segment, lo, hi
+            finally:
+                segment.close()
+
+    def scan(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        columns: Sequence[str] | None = None,
+        device_id: str | None = None,
+        numpy: bool = False,
+    ) -> dict[str, Any]:
+        # Rows with start <= ts < end, oldest first, one array (or NumPy array) per column.
+        names = list(columns or COLUMNS)
+        unknown = [name for name in names if name not in COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown sensor store columns: {', '.join(unknown)}")
+        if numpy and np is None:
+            raise RuntimeError("numpy is required for numpy=True scans (pip install numpy)")
+        device = None
+        if device_id is not None:
+            device = self._lookup_device(device_id)
+            if device is None:
+                return self._empty(names, numpy)
+
+        parts: dict[str, list[Any]] = {name: [] for name in names}
+        for segment, lo, hi in self._iter_ranges(start, end):
+            keep = None
+            if device is not None:
+                with segment.columns["device"][lo:hi] as devices:
+                    if numpy:
+                        keep = np.array(devices) == device
+                    elif any(value != device for value in devices):
+                        keep = [idx for idx, value in enumerate(devices) if value == device]
+            for name in names:
+                # Everything is copied out of the mapping; the segment is unmapped after each range.
+                with segment.columns[name][lo:hi] as view:
+                    if numpy:
+                        data = np.array(view)
+                        parts[name].append(data if keep is None else data[keep])
+                    elif keep is None:
+                        data = array(COLUMNS[name])
+                        with view.cast("B") as raw:
+                            data.frombytes(raw)
+                        parts[name].append(data)
+                    else:
+                        parts[name].append(array(COLUMNS[name], (view[idx] for idx in keep)))
+
+        result = self._empty(names, numpy)
+        for name, chunks in parts.items():
+            if numpy:
+                if chunks:
+                    result[name] = np.concatenate(chunks)
+            else:
+                for chunk in chunks:
+                    result[name].extend(chunk)
+        return result
+
+    def _reload_devices(self) -> None:
+        # A read-only store follows the device table the writing process keeps appending to.
+        self._devices = self._load_devices()
+        self._device_index = {name: idx for idx, name in enumerate(self._devices)}
+
+    def _lookup_device(self, device_id: str) -> int | None:
+        if self.readonly and device_id not in self._device_index:
+            self._reload_devices()
+        return self._device_index.get(device_id)
+
+    @staticmethod
+    def _empty(names: Sequence[str], numpy: bool) -> dict[str, Any]:
+        if numpy:
+            return {name: np.empty(0, dtype=COLUMNS[name]) for name in names}
+        return {name: array(COLUMNS[name]) for name in names}
+
+    def aggregate(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        columns: Sequence[str] | None = None,
+        device_id: str | None = None,
+        bucket_seconds: float | None = None,
+    ) -> list[dict[str, Any]]:
+        # count/min/max/mean per column, over the whole range or per bucket aligned to bucket_seconds.
+        names = list(columns or SENSOR_COLUMNS)
+        data = self.scan(start, end, ["ts", *names], device_id=device_id)
+        ts = data["ts"]
+        if not ts:
+            return []
+        if bucket_seconds is None:
+            edges = [(start if start is not None else ts[0], 0, len(ts))]
+        else:
+            if bucket_seconds <= 0:
+                raise ValueError("bucket_seconds must be positive")
+            edges = []
+            lo = 0
+            while lo < len(ts):
+                bucket_start = math.floor(ts[lo] / bucket_seconds) * bucket_seconds
+                hi = bisect.bisect_left(ts, bucket_start + bucket_seconds, lo)
+                edges.append((bucket_start, lo, hi))
+                lo = hi
+
+        rows = []
+        for bucket_start, lo, hi in edges:
+            stats = {}
+            for name in names:
+                values = data[name][lo:hi]
+                stats[name] = {
+                    "min": min(values),
+                    "max": max(values),
+                    "mean": math.fsum(values) / len(values),
+                }
+            rows.append(
+                {
+                    "start": bucket_start,
+                    "first_ts": ts[lo],
+                    "last_ts": ts[hi - 1],
+                    "count": hi - lo,
+                    "columns": stats,
+                }
+            )
+        return rows
+
+    def latest(self, device_id: str | None = None) -> dict[str, Any] | None:
+        with self._lock:
+            seqs = list_segments(self.directory)
+        device = None
+        if device_id is not None:
+            device = self._lookup_device(device_id)
+            if device is None:
+                return None
+        for seq in reversed(seqs):
+            try:
+                segment = _Segment(segment_path(self.directory, seq))
+            except (FileNotFoundError, ValueError):
+                continue
+            try:
+                for row in range(segment.rows - 1, -1, -1):
+                    if device is None or segment.columns["device"][row] == device:
+                        record = {name: segment.columns[name][row] for name in COLUMNS}
+                        record["device"] = self.device_name(record["device"])
+                        return record
+            finally:
+                segment.close()
+        return None
+
+    def device_name(self, index: int) -> str | None:
+        if index >= len(self._devices) and self.readonly:
+            self._reload_devices()
+        return self._devices[index] if index < len(self._devices) else None
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "segments": len(list_segments(self.directory)),
+                "appended": self.appended,
+                "clamped": self.clamped,
+                "rotations": self.rotations,
+                "dropped_segments": self.dropped_segments,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+                self._writer.close()
+                self._writer = None
+
+
+def _parse_timestamp(raw: str) -> float:
+    parsed = datetime.fromisoformat(raw)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _short(value: float | int) -> float | int:
+    # float32 columns print as noisy doubles (23.700000762939453); 7 significant digits is what they hold.
+    return float(f"{value:.7g}") if isinstance(value, float) else value
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bridge.sensor_store", description="Query the local sensor store")
+    parser.add_argument("--dir", help="store directory (default: SENSOR_STORE_DIR)")
+    parser.add_argument("--since", type=_parse_timestamp, help="ISO-8601 start of time range (inclusive)")
+    parser.add_argument("--until", type=_parse_timestamp, help="ISO-8601 end of time range (exclusive)")
+    parser.add_argument("--device", help="only samples from this device id")
+    parser.add_argument("--columns", help="comma-separated sensor keys (default: all)")
+    parser.add_argument("--bucket", type=float, help="print count/min/max/mean per bucket of this many seconds")
+    parser.add_argument("--summary", action="store_true", help="print one count/min/max/mean row for the range")
+    args = parser.parse_args(argv)
+
+    directory = args.dir
+    if directory is None:
+        from .config import from_env
+
+        directory = from_env().sensor_store_dir
+
+    columns = [name for name in args.columns.split(",") if name] if args.columns else list(SENSOR_COLUMNS)
+    store = SensorStore(directory, readonly=True)
+    try:
+        if args.bucket is not None or args.summary:
+            rows = store.aggregate(args.since, args.until, columns, device_id=args.device, bucket_seconds=args.bucket)
+            for row in rows:
+                row["start"], row["first_ts"], row["last_ts"] = _iso(row["start"]), _iso(row["first_ts"]), _iso(row["last_ts"])
+                for stats in row["columns"].values():
+                    stats.update((key, _short(value)) for key, value in stats.items())
+                sys.stdout.write(json.dumps(row, separators=(",", ":")) + "\n")
+            return 0
+
+        data = store.scan(args.since, args.until, ["ts", "device", *columns], device_id=args.device)
+        for idx, ts in enumerate(data["ts"]):
+            record = {"received_at": _iso(ts), "device_id": store.device_name(data["device"][idx])}
+            record.update((name, _short(data[name][idx])) for name in columns)
+            sys.stdout.write(json.dumps(record, separators=(",", ":")) + "\n")
+    except ValueError as exc:
+        parser.error(str(exc))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import glob
+import logging
+import os
+import selectors
+import time
+from typing import Any, Callable
+
+from .serial_reader import SerialReader
+
+LOGGER = logging.getLogger(__name__)
+
+GLOB_CHARS = ("*", "?", "[")
+
+
+def parse_port_specs(raw: str) -> list[tuple[str, str | None]]:
+    specs: list[tuple[str, str | None]] = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        pattern, sep, device_id = item.partition("=")
+        specs.append((pattern.strip(), device_id.strip() or None if sep else None))
+    return specs
+
+
+class SerialHub:
+    def __init__(
+        self,
+        port_specs: list[tuple[str, str | None]],
+        baud: int,
+        device_id: str,
+        timeout: float = 1.0,
+        rescan_interval: float = 5.0,
+        frame_format: str = "json",
+        serial_factory: Callable[..., Any] | None = None,
+        glob_func: Callable[[str], list[str]] = glob.glob,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.port_specs = port_specs
+        self.baud = baud
+        self.device_id = device_id
+        self.timeout = timeout
+        self.rescan_interval = rescan_interval
+        self.frame_format = frame_format
+        self._serial_factory = serial_factory
+        self._glob = glob_func
+        self._clock = clock
+
+        self._selector = selectors.DefaultSelector()
+        self._readers: dict[str, SerialReader] = {}
+        self._device_ids: dict[str, str] = {}
+        self._registered: dict[str, int] = {}
+        self._next_rescan = 0.0
+
+    @property
+    def ports(self) -> list[str]:
+        return sorted(self._registered)
+
+    def device_id_for(self, port: str) -> str:
+        return self._device_ids.get(port, self.device_id)
+
+    def _discover(self) -> dict[str, str]:
+        single = len(self.port_specs) == 1 and not any(c in self.port_specs[0][0] for c in GLOB_CHARS)
+        found: dict[str, str] = {}
+        for pattern, explicit_id in self.port_specs:
+            if any(c in pattern for c in GLOB_CHARS):
+                ports = sorted(self._glob(pattern))
+            else:
+                ports = [pattern]
+            for port in ports:
+                if port in found:
+                    continue
+                if explicit_id is not None:
+                    found[port] = explicit_id
+                elif single:
+                    found[port] = self.device_id
+                else:
+                    found[port] = f"{self.device_id}-{os.path.basename(port)}"
+        return found
+
+    def rescan(self) -> None:
+        self._next_rescan = self._clock() + self.rescan_interval
+        found = self._discover()
+
+        for port in list(self._readers):
+            if port not in found:
+                LOGGER.info("Serial port %s disappeared, dropping it", port)
+                self._drop(port)
+
+        for port, device_id in found.items():
+            if port in self._registered:
+                continue
+            reader = self._readers.get(port)
+            if reader is None:
+                reader = SerialReader(
+                    port=port,
+                    baud=self.baud,
+                    timeout=self.timeout,
+                    serial_factory=self._serial_factory,
+                    reconnect_delay=0.0,
+                    frame_format=self.frame_format,
+                )
+                self._readers[port] = reader
+                self._device_ids[port] = device_id
+
+            reader.connect()
+            fd = reader.fileno()
+            if fd is None:
+                reader.close()
+                continue
+            self._selector.register(fd, selectors.EVENT_READ, port)
+            self._registered[port] = fd
+            LOGGER.info("Serial hub attached %s as device %s", port, device_id)
+
+    def _unregister(self, port: str) -> None:
+        fd = self._registered.pop(port, None)
+        if fd is None:
+            return
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def _drop(self, port: str) -> None:
+        self._unregister(port)
+        reader = self._readers.pop(port, None)
+        self._device_ids.pop(port, None)
+        if reader is not None:
+            reader.close()
+
+    def fileno(self) -> int:
+        return self._selector.fileno()
+
+    def poll(self, timeout: float | None = None) -> list[tuple[str, bytes]]:
+        now = self._clock()
+        if now >= self._next_rescan:
+            self.rescan()
+            now = self._clock()
+
+        wait = max(0.0, min(self.timeout, self._next_rescan - now)) if timeout is None else timeout
+        if not self._registered:
+            time.sleep(wait)
+            return []
+
+        frames: list[tuple[str, bytes]] = []
+        for key, _events in self._selector.select(wait):
+            port = key.data
+            reader = self._readers[port]
+            device_id = self._device_ids[port]
+            for frame in reader.read_available():
+                frames.append((device_id, frame))
+            if not reader.connected:
+                LOGGER.warning("Serial port %s lost, will retry on next rescan", port)
+                self._unregister(port)
+        return frames
+
+    def close(self) -> None:
+        for port in list(self._readers):
+            self._drop(port)
+        self._selector.close()
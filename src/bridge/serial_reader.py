@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import binascii
 import json
 import logging
+import re
+import select
+import struct
 import time
 from typing import Any, Callable
 
@@ -29,6 +33,34 @@ LM393_RAW_MAX = 1023
 LM393_LUX_MIN = 0.0
 LM393_LUX_MAX = 10000.0
 
+MAX_FRAME_BYTES = 1024
+
+FRAME_FORMATS = ("auto", "json", "binary")
+
+_JSON_INT = rb"(0|[1-9][0-9]*)"
+_JSON_DECIMAL = rb"((?:0|[1-9][0-9]*)\.[0-9]+)"
+# Exact layout printed by arduino/pi_sensor_stream.cpp; anything else takes the json.loads path.
+_FIRMWARE_FRAME_RE = re.compile(
+    rb'[ \t\r\n]*\{"pir":'
+    + _JSON_INT
+    + rb',"dht11_temp_c":'
+    + _JSON_DECIMAL
+    + rb',"dht11_humidity":'
+    + _JSON_DECIMAL
+    + rb',"lm393_raw":'
+    + _JSON_INT
+    + rb',"lm393_lux":'
+    + _JSON_DECIMAL
+    + rb"\}[ \t\r\n]*"
+)
+
+# version, pir, temp (0.1 C), humidity (0.1 %), lm393 raw, lux (0.1 lux); CRC-16/CCITT-FALSE trailer.
+BINARY_FRAME_VERSION = 1
+BINARY_FRAME_STRUCT = struct.Struct("<BBhHHI")
+BINARY_FRAME_CRC = struct.Struct("<H")
+BINARY_FRAME_SIZE = BINARY_FRAME_STRUCT.size + BINARY_FRAME_CRC.size
+BINARY_FRAME_MAX_ENCODED = BINARY_FRAME_SIZE + 2
+
 
 class SerialReader:
     def __init__(
@@ -38,13 +70,19 @@ class SerialReader:
         timeout: float = 1.0,
         serial_factory: Callable[..., Any] | None = None,
         reconnect_delay: float = 1.0,
+        frame_format: str = "json",
     ) -> None:
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"frame_format must be one of: {', '.join(FRAME_FORMATS)}")
         self.port = port
         self.baud = baud
         self.timeout = timeout
         self.reconnect_delay = reconnect_delay
+        self.frame_format = frame_format
         self._serial_factory = serial_factory
         self._serial = None
+        self._buffer = bytearray()
+        self._detected_format: str | None = None if frame_format == "auto" else frame_format
 
     def _resolve_serial_factory(self) -> Callable[..., Any]:
         if self._serial_factory is not None:
@@ -86,7 +124,101 @@ class SerialReader:
         text = raw.decode("utf-8", errors="ignore").strip() if isinstance(raw, bytes) else str(raw).strip()
         return text or None
 
+    @property
+    def connected(self) -> bool:
+        return self._serial is not None
+
+    def fileno(self) -> int | None:
+        if self._serial is None:
+            return None
+        fileno = getattr(self._serial, "fileno", None)
+        if fileno is None:
+            return None
+        try:
+            return fileno()
+        except Exception:
+            return None
+
+    def read_frames(self) -> list[bytes]:
+        if self._serial is None:
+            self.connect()
+        if self._serial is None:
+            return []
+
+        fd = self.fileno()
+        if fd is not None:
+            try:
+                ready, _, _ = select.select([fd], [], [], self.timeout)
+            except (OSError, ValueError) as exc:
+                LOGGER.warning("Serial wait failed: %s", exc)
+                ready = [fd]
+            if not ready:
+                return []
+
+        frames = self.read_available()
+        if self._serial is None:
+            time.sleep(self.reconnect_delay)
+        return frames
+
+    def read_available(self) -> list[bytes]:
+        if self._serial is None:
+            return []
+
+        try:
+            waiting = self._serial.in_waiting
+            chunk = self._serial.read(max(waiting, 1))
+        except Exception as exc:
+            LOGGER.warning("Serial read failed: %s", exc)
+            self.close()
+            return []
+
+        if chunk:
+            self._buffer += chunk
+        return self._split_frames()
+
+    def _detect_format(self) -> str | None:
+        if self._detected_format is None:
+            if b"\x00" in self._buffer:
+                self._detected_format = "binary"
+            elif len(self._buffer) >= BINARY_FRAME_MAX_ENCODED:
+                self._detected_format = "json"
+            if self._detected_format is not None:
+                LOGGER.info("Detected %s serial frames on %s", self._detected_format, self.port)
+        return self._detected_format
+
+    def _split_frames(self) -> list[bytes]:
+        frame_format = self._detect_format()
+        if frame_format is None:
+            if len(self._buffer) > MAX_FRAME_BYTES:
+                LOGGER.warning("Discarding %s serial bytes without a frame delimiter", len(self._buffer))
+                self._buffer.clear()
+            return []
+
+        binary = frame_format == "binary"
+        delimiter = b"\x00" if binary else b"\n"
+        buffer = self._buffer
+        frames: list[bytes] = []
+        start = 0
+        while True:
+            end = buffer.find(delimiter, start)
+            if end < 0:
+                break
+            frame = bytes(buffer[start:end]) if binary else bytes(buffer[start:end]).strip()
+            if frame:
+                frames.append(frame)
+            start = end + 1
+        if start:
+            del buffer[:start]
+
+        if len(buffer) > MAX_FRAME_BYTES:
+            LOGGER.warning("Discarding %s serial bytes without a frame delimiter", len(buffer))
+            buffer.clear()
+        return frames
+
     def close(self) -> None:
+        self._buffer.clear()
+        if self.frame_format == "auto":
+            self._detected_format = None
         if self._serial is None:
             return
         try:
@@ -97,7 +229,41 @@ class SerialReader:
             self._serial = None
 
 
-def parse_serial_line(line: str) -> dict[str, float | int]:
+def parse_serial_line(line: str | bytes | memoryview) -> dict[str, float | int]:
+    if isinstance(line, (bytes, bytearray, memoryview)):
+        normalized = _parse_firmware_frame(line)
+        if normalized is not None:
+            return normalized
+        line = bytes(line).decode("utf-8", errors="ignore")
+    return _parse_json_line(line)
+
+
+def _parse_firmware_frame(frame: bytes | bytearray | memoryview) -> dict[str, float | int] | None:
+    match = _FIRMWARE_FRAME_RE.fullmatch(frame)
+    if match is None:
+        return None
+
+    pir, temp_c, humidity, raw, lux = match.groups()
+    normalized: dict[str, float | int] = {
+        "pir": int(pir),
+        "dht11_temp_c": float(temp_c),
+        "dht11_humidity": float(humidity),
+        "lm393_raw": int(raw),
+        "lm393_lux": float(lux),
+    }
+    if (
+        normalized["pir"] <= 1
+        and LM393_RAW_MIN <= normalized["lm393_raw"] <= LM393_RAW_MAX
+        and LM393_LUX_MIN <= normalized["lm393_lux"] <= LM393_LUX_MAX
+        and DHT11_TEMP_MIN_C <= normalized["dht11_temp_c"] <= DHT11_TEMP_MAX_C
+        and DHT11_HUMIDITY_MIN <= normalized["dht11_humidity"] <= DHT11_HUMIDITY_MAX
+    ):
+        return normalized
+    _validate_sensor_values(normalized)
+    return normalized
+
+
+def _parse_json_line(line: str) -> dict[str, float | int]:
     try:
         payload = json.loads(line)
     except json.JSONDecodeError as exc:
@@ -119,6 +285,11 @@ def parse_serial_line(line: str) -> dict[str, float | int]:
 
         normalized[key] = value
 
+    _validate_sensor_values(normalized)
+    return normalized
+
+
+def _validate_sensor_values(normalized: dict[str, float | int]) -> None:
     if normalized["pir"] not in (0, 1):
         raise ValueError("pir must be 0 or 1")
 
@@ -134,4 +305,96 @@ def parse_serial_line(line: str) -> dict[str, float | int]:
     if not DHT11_HUMIDITY_MIN <= float(normalized["dht11_humidity"]) <= DHT11_HUMIDITY_MAX:
         raise ValueError(f"dht11_humidity out of range [{DHT11_HUMIDITY_MIN}, {DHT11_HUMIDITY_MAX}]")
 
+
+def cobs_encode(data: bytes) -> bytes:
+    out = bytearray(b"\x00")
+    code_index = 0
+    code = 1
+    for byte in data:
+        if byte == 0:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+            continue
+        out.append(byte)
+        code += 1
+        if code == 0xFF:
+            out[code_index] = code
+            code_index = len(out)
+            out.append(0)
+            code = 1
+    out[code_index] = code
+    return bytes(out)
+
+
+def cobs_decode(data: bytes | bytearray | memoryview) -> bytearray:
+    out = bytearray()
+    index = 0
+    length = len(data)
+    while index < length:
+        code = data[index]
+        if code == 0:
+            raise ValueError("Unexpected zero byte in COBS frame")
+        end = index + code
+        if end > length:
+            raise ValueError("Truncated COBS frame")
+        out += data[index + 1 : end]
+        index = end
+        if code < 0xFF and index < length:
+            out.append(0)
+    return out
+
+
+def encode_serial_frame(sensor_values: dict[str, float | int]) -> bytes:
+    body = BINARY_FRAME_STRUCT.pack(
+        BINARY_FRAME_VERSION,
+        int(sensor_values["pir"]),
+        int(round(float(sensor_values["dht11_temp_c"]) * 10)),
+        int(round(float(sensor_values["dht11_humidity"]) * 10)),
+        int(sensor_values["lm393_raw"]),
+        int(round(float(sensor_values["lm393_lux"]) * 10)),
+    )
+    crc = binascii.crc_hqx(body, 0xFFFF)
+    return cobs_encode(body + BINARY_FRAME_CRC.pack(crc)) + b"\x00"
+
+
+def parse_serial_frame(frame: bytes | bytearray | memoryview) -> dict[str, float | int]:
+    try:
+        decoded = cobs_decode(frame)
+    except ValueError as exc:
+        raise ValueError(f"Invalid binary frame: {exc}") from exc
+
+    if len(decoded) != BINARY_FRAME_SIZE:
+        raise ValueError(f"Binary frame must be {BINARY_FRAME_SIZE} bytes, got {len(decoded)}")
+
+    (crc,) = BINARY_FRAME_CRC.unpack_from(decoded, BINARY_FRAME_STRUCT.size)
+    if binascii.crc_hqx(memoryview(decoded)[: BINARY_FRAME_STRUCT.size], 0xFFFF) != crc:
+        raise ValueError("Binary frame CRC mismatch")
+
+    version, pir, temp_c, humidity, lm393_raw, lux = BINARY_FRAME_STRUCT.unpack_from(decoded)
+    if version != BINARY_FRAME_VERSION:
+        raise ValueError(f"Unsupported binary frame version: {version}")
+
+    normalized: dict[str, float | int] = {
+        "pir": pir,
+        "dht11_temp_c": temp_c / 10,
+        "dht11_humidity": humidity / 10,
+        "lm393_raw": lm393_raw,
+        "lm393_lux": lux / 10,
+    }
+    _validate_sensor_values(normalized)
     return normalized
+
+
+def parse_frame(frame: str | bytes, frame_format: str = "auto") -> dict[str, float | int]:
+    if frame_format == "auto":
+        # A COBS frame starts with its code byte (at most BINARY_FRAME_MAX_ENCODED), a text line
+        # with a printable character, so malformed text still gets the JSON parser's error.
+        binary = isinstance(frame, (bytes, bytearray)) and len(frame) > 0 and frame[0] < 0x20
+        frame_format = "binary" if binary else "json"
+    if frame_format == "binary":
+        if not isinstance(frame, (bytes, bytearray, memoryview)):
+            raise ValueError("Invalid binary frame: expected bytes")
+        return parse_serial_frame(frame)
+    return parse_serial_line(frame)
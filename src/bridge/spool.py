@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import struct
+import time
+from typing import Any, Callable
+import zlib
+
+LOGGER = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+INDEX_FILE = "index.json"
+
+# body length, crc32(body), created_at (unix seconds), topic length; body = topic + payload (UTF-8).
+RECORD_HEADER = struct.Struct("<IIdH")
+
+
+class Spool:
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 1_048_576,
+        max_bytes: int = 64 * 1_048_576,
+        max_age_seconds: float = 7 * 86400,
+        drain_rate: float = 20.0,
+        use_mmap: bool = False,
+        clock: Callable[[], float] = time.time,
+        monotonic: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.drain_rate = drain_rate
+        self.use_mmap = use_mmap
+        self._clock = clock
+        self._monotonic = monotonic
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments: dict[int, int] = {}
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            seq = int(path.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+            self._segments[seq] = path.stat().st_size
+        self._drop_expired_segments()
+
+        self._write_seq = max(self._segments, default=0) + 1
+        self._writer: Any = None
+        self._read_segment, self._read_offset = self._load_index()
+
+        self._tokens = max(1.0, drain_rate)
+        self._tokens_at = monotonic()
+
+        self.appended = 0
+        self.drained = 0
+        self.expired = 0
+        self.dropped_bytes = 0
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}"
+
+    def _load_index(self) -> tuple[int, int]:
+        first = min(self._segments, default=self._write_seq)
+        try:
+            index = json.loads((self.directory / INDEX_FILE).read_text(encoding="utf-8"))
+            segment, offset = int(index["segment"]), int(index["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return first, 0
+        if segment not in self._segments:
+            return first, 0
+        return segment, offset
+
+    def _save_index(self) -> None:
+        path = self.directory / INDEX_FILE
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"segment": self._read_segment, "offset": self._read_offset}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, path)
+
+    def _drop_expired_segments(self) -> None:
+        cutoff = self._clock() - self.max_age_seconds
+        for seq in sorted(self._segments):
+            path = self._segment_path(seq)
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                pass
+            LOGGER.warning("Dropping expired spool segment %s", path.name)
+            self._delete_segment(seq)
+
+    def _delete_segment(self, seq: int) -> None:
+        self._segments.pop(seq, None)
+        try:
+            self._segment_path(seq).unlink()
+        except FileNotFoundError:
+            pass
+
+    @property
+    def pending_bytes(self) -> int:
+        total = sum(self._segments.values())
+        if self._read_segment in self._segments:
+            total -= self._read_offset
+        return total
+
+    def append(self, topic: str, payload: str) -> None:
+        topic_bytes = topic.encode("utf-8")
+        body = topic_bytes + payload.encode("utf-8")
+        record = RECORD_HEADER.pack(len(body), zlib.crc32(body), self._clock(), len(topic_bytes)) + body
+
+        if self._writer is None or (
+            self._segments[self._write_seq] > 0 and self._segments[self._write_seq] + len(record) > self.segment_bytes
+        ):
+            self._rotate()
+        self._writer.write(record)
+        self._writer.flush()
+        self._segments[self._write_seq] += len(record)
+        self.appended += 1
+        self._enforce_max_bytes()
+
+    def _rotate(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._write_seq += 1
+        self._writer = self._segment_path(self._write_seq).open("ab")
+        self._segments[self._write_seq] = 0
+        if self._read_segment not in self._segments:
+            self._read_segment, self._read_offset = min(self._segments), 0
+
+    def _enforce_max_bytes(self) -> None:
+        while sum(self._segments.values()) > self.max_bytes and len(self._segments) > 1:
+            oldest = min(self._segments)
+            self.dropped_bytes += self._segments[oldest]
+            LOGGER.warning("Spool over %s bytes, dropping oldest segment %s", self.max_bytes, oldest)
+            self._delete_segment(oldest)
+            if oldest == self._read_segment:
+                self._read_segment, self._read_offset = min(self._segments), 0
+                self._save_index()
+
+    def _refill_tokens(self) -> int:
+        now = self._monotonic()
+        self._tokens = min(max(1.0, self.drain_rate), self._tokens + (now - self._tokens_at) * self.drain_rate)
+        self._tokens_at = now
+        return int(self._tokens)
+
+    def _read_segment_data(self, seq: int, offset: int) -> tuple[Any, int]:
+        # Returns the segment contents and the file offset they start at: a closed segment is mapped
+        # whole (pages are only faulted in as records are read), otherwise only the unread tail is read.
+        path = self._segment_path(seq)
+        if self.use_mmap and seq != self._write_seq:
+            with path.open("rb") as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return b"", 0
+                return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ), 0
+        if seq == self._write_seq and self._writer is not None:
+            self._writer.flush()
+        with path.open("rb") as handle:
+            handle.seek(offset)
+            return handle.read(), offset
+
+    def drain(self, publish: Callable[[str, str], bool]) -> int:
+        allowed = self._refill_tokens()
+        if allowed <= 0:
+            return 0
+
+        sent = 0
+        advanced = False
+        blocked = False
+        cutoff = self._clock() - self.max_age_seconds
+        while sent < allowed and not blocked and self._read_segment in self._segments:
+            seq = self._read_segment
+            data, base = self._read_segment_data(seq, self._read_offset)
+            try:
+                offset = self._read_offset - base
+                size = len(data)
+                while sent < allowed and offset + RECORD_HEADER.size <= size:
+                    length, crc, created_at, topic_len = RECORD_HEADER.unpack_from(data, offset)
+                    end = offset + RECORD_HEADER.size + length
+                    if end > size:
+                        break
+                    body = bytes(data[offset + RECORD_HEADER.size : end])
+                    if zlib.crc32(body) != crc:
+                        LOGGER.warning("Corrupt spool record in segment %s at offset %s, skipping rest", seq, base + offset)
+                        offset = size
+                        break
+                    if created_at < cutoff:
+                        self.expired += 1
+                    elif publish(body[:topic_len].decode("utf-8"), body[topic_len:].decode("utf-8")):
+                        sent += 1
+                    else:
+                        blocked = True
+                        break
+                    offset = end
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+            if base + offset != self._read_offset:
+                self._read_offset = base + offset
+                advanced = True
+
+            if blocked or sent >= allowed or seq == self._write_seq:
+                break
+            if offset < size:
+                LOGGER.warning("Discarding %s trailing bytes of spool segment %s", size - offset, seq)
+            self._delete_segment(seq)
+            self._read_segment, self._read_offset = min(self._segments, default=self._write_seq), 0
+            advanced = True
+
+        self._tokens -= sent
+        self.drained += sent
+        if advanced:
+            self._save_index()
+        return sent
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "segments": len(self._segments),
+            "pending_bytes": self.pending_bytes,
+            "appended": self.appended,
+            "drained": self.drained,
+            "expired": self.expired,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._save_index()
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import socket
+import unittest
+
+from bridge.async_runtime import AsyncCommandRunner, AsyncMQTTAdapter, AsyncSerialTransport
+from bridge.serial_reader import SerialReader
+
+
+class PipeSerial:
+    def __init__(self) -> None:
+        self.read_fd, self.write_fd = os.pipe()
+
+    def fileno(self) -> int:
+        return self.read_fd
+
+    @property
+    def in_waiting(self) -> int:
+        return 4096
+
+    def read(self, size=1) -> bytes:
+        return os.read(self.read_fd, size)
+
+    def close(self) -> None:
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+class FakeBridge:
+    def __init__(self, client=None) -> None:
+        self.client = client
+        self.acks = []
+        self.connected_with = None
+        self.closed = False
+
+    def connect(self, start_loop: bool = True) -> None:
+        self.connected_with = start_loop
+
+    def publish_ack(self, payload, topic=None) -> bool:
+        self.acks.append((topic, payload))
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeSocketClient:
+    def __init__(self, sock) -> None:
+        self._sock = sock
+        self.reads = 0
+
+    def socket(self):
+        return self._sock
+
+    def want_write(self) -> bool:
+        return False
+
+    def loop_read(self) -> int:
+        self._sock.recv(1024)
+        self.reads += 1
+        return 0
+
+    def loop_write(self) -> int:
+        return 0
+
+    def loop_misc(self) -> int:
+        return 0
+
+
+class AsyncRuntimeTests(unittest.TestCase):
+    def test_serial_transport_delivers_frames_on_readiness(self) -> None:
+        pipe = PipeSerial()
+        reader = SerialReader("/dev/ttyACM0", 9600, serial_factory=lambda *_args, **_kwargs: pipe)
+        received = []
+
+        async def scenario() -> None:
+            transport = AsyncSerialTransport(
+                reader,
+                "rpi-01",
+                on_frame=lambda device_id, frame, _received_at: received.append((device_id, frame)),
+            )
+            task = asyncio.create_task(transport.run())
+            await asyncio.sleep(0.05)
+            os.write(pipe.write_fd, b'{"a":1}\n{"a":2}\n')
+            for _ in range(100):
+                if len(received) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            reader.close()
+
+        self.assertEqual(received, [("rpi-01", b'{"a":1}'), ("rpi-01", b'{"a":2}')])
+
+    def test_command_runner_publishes_ack_after_handler_completes(self) -> None:
+        bridge = FakeBridge()
+
+        def handler(payload, topic):
+            return {"status": "accepted", "payload": payload, "_ack_topic": topic + "/ack"}
+
+        async def scenario() -> None:
+            runner = AsyncCommandRunner(handler)
+            runner.bind(bridge)
+            runner.submit('{"state":"on"}', "home/pi/commands/switch")
+            runner.submit('{"state":"off"}', "home/pi/commands/switch")
+            await runner.drain()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(
+            bridge.acks,
+            [
+                ("home/pi/commands/switch/ack", {"status": "accepted", "payload": '{"state":"on"}'}),
+                ("home/pi/commands/switch/ack", {"status": "accepted", "payload": '{"state":"off"}'}),
+            ],
+        )
+
+    def test_mqtt_adapter_drives_paho_socket_from_event_loop(self) -> None:
+        ours, theirs = socket.socketpair()
+        client = FakeSocketClient(ours)
+        bridge = FakeBridge(client)
+
+        async def scenario() -> None:
+            adapter = AsyncMQTTAdapter(bridge, misc_interval=0.01)
+            await adapter.connect()
+            theirs.send(b"x")
+            for _ in range(100):
+                if client.reads:
+                    break
+                await asyncio.sleep(0.01)
+            await adapter.close()
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            ours.close()
+            theirs.close()
+
+        self.assertFalse(bridge.connected_with)
+        self.assertEqual(client.reads, 1)
+        self.assertTrue(bridge.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
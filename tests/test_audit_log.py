@@ -0,0 +1,152 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from bridge.audit_log import AuditLogWriter, compressed_segments, pending_segments, segment_index_path
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _read_jsonl(path: Path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class AuditLogWriterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "logs" / "commands.jsonl"
+        self.clock = FakeClock()
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_buffers_until_flush_when_flusher_running(self) -> None:
+        writer = AuditLogWriter(self.path, flush_interval=60.0, fsync_policy="none", clock=self.clock)
+        writer.start()
+        writer.write({"status": "accepted", "n": 1})
+        writer.write({"status": "accepted", "n": 2})
+        self.assertEqual(self.path.read_text(encoding="utf-8"), "")
+
+        writer.flush()
+        self.assertEqual([row["n"] for row in _read_jsonl(self.path)], [1, 2])
+        self.assertEqual(writer.stats()["flushes"], 1)
+        writer.close()
+
+    def test_flushes_when_batch_bytes_reached(self) -> None:
+        writer = AuditLogWriter(self.path, max_batch_bytes=40, flush_interval=60.0, fsync_policy="none")
+        writer.start()
+        writer.write({"status": "accepted", "command": "x" * 40})
+        self.assertEqual(len(_read_jsonl(self.path)), 1)
+        writer.close()
+
+    def test_writes_through_without_flusher(self) -> None:
+        writer = AuditLogWriter(self.path, fsync_policy="none")
+        writer.write({"status": "rejected"})
+        self.assertEqual(_read_jsonl(self.path), [{"status": "rejected"}])
+        writer.close()
+
+    def test_fsync_policies(self) -> None:
+        with mock.patch("bridge.audit_log.os.fsync") as fsync:
+            writer = AuditLogWriter(self.path, fsync_policy="batch")
+            writer.write({"n": 1})
+            writer.write({"n": 2})
+            self.assertEqual(fsync.call_count, 2)
+            writer.close()
+
+        with mock.patch("bridge.audit_log.os.fsync") as fsync:
+            writer = AuditLogWriter(self.path, fsync_policy="interval", fsync_interval=5.0, clock=self.clock)
+            writer.write({"n": 1})
+            self.assertEqual(fsync.call_count, 0)
+            self.clock.now = 5.0
+            writer.write({"n": 2})
+            self.assertEqual(fsync.call_count, 1)
+            writer.write({"n": 3})
+            writer.close()
+            self.assertEqual(fsync.call_count, 2)
+
+        with mock.patch("bridge.audit_log.os.fsync") as fsync:
+            writer = AuditLogWriter(self.path, fsync_policy="none")
+            writer.write({"n": 1})
+            writer.close()
+            fsync.assert_not_called()
+
+    def test_close_flushes_pending_and_rejects_writes(self) -> None:
+        writer = AuditLogWriter(self.path, flush_interval=60.0, fsync_policy="none")
+        writer.start()
+        writer.write({"n": 1})
+        writer.close()
+        self.assertEqual(_read_jsonl(self.path), [{"n": 1}])
+        with self.assertRaises(RuntimeError):
+            writer.write({"n": 2})
+
+    def test_rejects_unknown_fsync_policy(self) -> None:
+        with self.assertRaises(ValueError):
+            AuditLogWriter(self.path, fsync_policy="always")
+
+    def test_rotates_by_size_and_compresses_with_index(self) -> None:
+        writer = AuditLogWriter(self.path, fsync_policy="none", rotate_bytes=200, index_block_bytes=150)
+        for idx in range(10):
+            writer.write(
+                {
+                    "status": "accepted",
+                    "receivedAt": f"2026-02-16T12:00:{idx:02d}+00:00",
+                    "command": {"requestId": f"req-{idx}"},
+                }
+            )
+        writer.close()
+
+        segments = compressed_segments(self.path)
+        self.assertGreaterEqual(len(segments), 2)
+        self.assertEqual(pending_segments(self.path), [])
+        index = json.loads(segment_index_path(segments[0]).read_text(encoding="utf-8"))
+        self.assertIn("req-0", index["requests"])
+        self.assertGreaterEqual(len(index["blocks"]), 2)
+        self.assertEqual(index["first_ts"], "2026-02-16T12:00:00+00:00")
+
+        import gzip
+
+        restored = b"".join(gzip.decompress(segment.read_bytes()) for segment in segments)
+        restored += self.path.read_bytes()
+        self.assertEqual([json.loads(line)["command"]["requestId"] for line in restored.splitlines()], [f"req-{idx}" for idx in range(10)])
+
+    def test_rotates_by_age_and_prunes_old_segments(self) -> None:
+        writer = AuditLogWriter(
+            self.path,
+            fsync_policy="none",
+            rotate_seconds=10.0,
+            max_segments=2,
+            clock=self.clock,
+        )
+        for idx in range(4):
+            writer.write({"n": idx})
+            self.clock.now += 10.0
+            writer.flush()
+        writer.close()
+
+        self.assertEqual(writer.stats()["rotations"], 4)
+        self.assertEqual(len(compressed_segments(self.path)), 2)
+        self.assertEqual(len(list(self.path.parent.glob("*.idx.json"))), 2)
+
+    def test_background_compressor_handles_leftover_segments(self) -> None:
+        self.path.parent.mkdir(parents=True)
+        leftover = self.path.with_name("commands.20260101T000000-000001.jsonl")
+        leftover.write_text('{"n":1}\n', encoding="utf-8")
+
+        writer = AuditLogWriter(self.path, fsync_policy="none", rotate_bytes=1024)
+        writer.start()
+        writer.close()
+
+        self.assertFalse(leftover.exists())
+        self.assertEqual([segment.name for segment in compressed_segments(self.path)], [leftover.name + ".gz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
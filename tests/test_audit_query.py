@@ -0,0 +1,64 @@
+import contextlib
+from datetime import datetime, timezone
+import io
+import json
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from bridge import audit_query
+from bridge.audit_log import AuditLogWriter, compressed_segments
+from bridge.audit_query import find_request, query_time_range
+
+
+def _record(idx: int) -> dict:
+    return {
+        "status": "accepted",
+        "receivedAt": f"2026-02-16T12:{idx // 60:02d}:{idx % 60:02d}+00:00",
+        "command": {"requestId": f"req-{idx}", "deviceId": "fan_01", "power": "on"},
+    }
+
+
+class AuditQueryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "commands.jsonl"
+        writer = AuditLogWriter(self.path, fsync_policy="none", rotate_bytes=2048, index_block_bytes=512)
+        for idx in range(100):
+            writer.write(_record(idx))
+        writer.close()
+        self.assertGreater(len(compressed_segments(self.path)), 1)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_find_request_in_compressed_and_active_segments(self) -> None:
+        self.assertEqual(find_request(self.path, "req-3"), [_record(3)])
+        self.assertEqual(find_request(self.path, "req-99"), [_record(99)])
+        self.assertEqual(find_request(self.path, "missing"), [])
+
+    def test_find_request_only_inflates_indexed_block(self) -> None:
+        with mock.patch("bridge.audit_query.gzip.decompress", wraps=audit_query.gzip.decompress) as decompress:
+            find_request(self.path, "req-3")
+        self.assertEqual(decompress.call_count, 1)
+
+    def test_query_time_range(self) -> None:
+        since = datetime(2026, 2, 16, 12, 0, 10, tzinfo=timezone.utc)
+        until = datetime(2026, 2, 16, 12, 1, 5, tzinfo=timezone.utc)
+        records = list(query_time_range(self.path, since, until))
+        self.assertEqual([record["command"]["requestId"] for record in records], [f"req-{idx}" for idx in range(10, 66)])
+
+    def test_cli_prints_matches(self) -> None:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = audit_query.main(["--log", str(self.path), "--request-id", "req-42"])
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(out.getvalue()), _record(42))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(audit_query.main(["--log", str(self.path), "--request-id", "nope"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
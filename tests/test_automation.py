@@ -1,7 +1,18 @@
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import tempfile
 import unittest
 
-from bridge.automation import AutomationController
+from bridge.automation import AutomationController, load_snapshot, save_snapshot
+from bridge.rules import RulePlan
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
 
 
 class AutomationControllerTests(unittest.TestCase):
@@ -69,6 +80,247 @@ class AutomationControllerTests(unittest.TestCase):
         self.assertEqual(fan_cmd["power"], "off")
         self.assertEqual(light_cmd["power"], "off")
 
+    def test_sliding_window_reacts_every_eval_interval(self) -> None:
+        controller = AutomationController(
+            window_seconds=120,
+            fan_on_temp_c=29.0,
+            fan_off_temp_c=27.5,
+            light_on_lux=300.0,
+            light_off_lux=380.0,
+            mode="sliding",
+            eval_interval_seconds=5,
+        )
+        start = datetime(2026, 2, 16, 12, 0, tzinfo=timezone.utc)
+
+        for second in range(0, 120, 5):
+            self.assertEqual(controller.add_sample(26.0, 400.0, observed_at=start + timedelta(seconds=second)), [])
+        self.assertEqual(controller.add_sample(26.0, 400.0, observed_at=start + timedelta(seconds=120)), [])
+
+        # The hot samples push the 120 s mean over 29 C long before a tumbling window would close.
+        commands = []
+        second = 125
+        while not commands:
+            commands = controller.add_sample(40.0, 400.0, observed_at=start + timedelta(seconds=second))
+            second += 5
+        self.assertEqual([(x["deviceId"], x["power"]) for x in commands], [("fan_01", "on")])
+        self.assertLess(second, 200)
+
+    def test_sliding_window_forgets_samples_older_than_window(self) -> None:
+        controller = AutomationController(
+            window_seconds=60,
+            fan_on_temp_c=29.0,
+            fan_off_temp_c=27.5,
+            light_on_lux=300.0,
+            light_off_lux=380.0,
+            mode="sliding",
+            eval_interval_seconds=10,
+        )
+        start = datetime(2026, 2, 16, 12, 0, tzinfo=timezone.utc)
+
+        controller.add_sample(35.0, 400.0, observed_at=start)
+        commands = controller.add_sample(35.0, 400.0, observed_at=start + timedelta(seconds=60))
+        self.assertEqual([(x["deviceId"], x["power"]) for x in commands], [("fan_01", "on")])
+
+        # After a long gap only the new sample is in the window.
+        commands = controller.add_sample(20.0, 400.0, observed_at=start + timedelta(seconds=600))
+        self.assertEqual([(x["deviceId"], x["power"]) for x in commands], [("fan_01", "off")])
+
+    def test_rule_plan_sees_full_sensor_dict(self) -> None:
+        rules = RulePlan.from_dict(
+            {
+                "rules": [
+                    {
+                        "device": "dehumidifier_01",
+                        "sensor": "dht11_humidity",
+                        "aggregate": "min",
+                        "on_above": 70,
+                        "off_below": 60,
+                    },
+                    {
+                        "device": "light_01",
+                        "sensor": "lm393_lux",
+                        "on_below": 300,
+                        "off_above": 380,
+                        "when": [{"sensor": "pir", "aggregate": "max", "min": 1}],
+                    },
+                ]
+            }
+        )
+        controller = AutomationController(
+            window_seconds=60,
+            fan_on_temp_c=29.0,
+            fan_off_temp_c=27.5,
+            light_on_lux=300.0,
+            light_off_lux=380.0,
+            rules=rules,
+        )
+        start = datetime(2026, 2, 16, 12, 0, tzinfo=timezone.utc)
+
+        controller.add_values({"pir": 1, "dht11_humidity": 75.0, "lm393_lux": 120.0}, observed_at=start)
+        commands = controller.add_values(
+            {"pir": 0, "dht11_humidity": 72.0, "lm393_lux": 140.0},
+            observed_at=start + timedelta(seconds=60),
+        )
+
+        self.assertEqual(
+            [(x["deviceId"], x["power"]) for x in commands],
+            [("dehumidifier_01", "on"), ("light_01", "on")],
+        )
+
+    def test_tick_closes_window_on_deadline_without_new_samples(self) -> None:
+        clock = FakeClock()
+        controller = AutomationController(
+            window_seconds=120,
+            fan_on_temp_c=29.0,
+            fan_off_temp_c=27.5,
+            light_on_lux=300.0,
+            light_off_lux=380.0,
+            clock=clock,
+            wall_clock=lambda: 1771243200.0,
+        )
+
+        controller.add_sample(30.0, 400.0)
+        clock.now = 30.0
+        controller.add_sample(31.0, 400.0)
+        self.assertEqual(controller.next_deadline(), 120.0)
+
+        clock.now = 119.9
+        self.assertEqual(controller.tick(), [])
+        clock.now = 120.0
+        commands = controller.tick()
+
+        self.assertEqual([(x["deviceId"], x["power"]) for x in commands], [("fan_01", "on")])
+        self.assertEqual(commands[0]["sentAt"], "2026-02-16T12:00:00+00:00")
+        self.assertIsNone(controller.next_deadline())
+
+    def test_window_with_too_few_samples_is_skipped(self) -> None:
+        clock = FakeClock()
+        controller = AutomationController(
+            window_seconds=60,
+            fan_on_temp_c=29.0,
+            fan_off_temp_c=27.5,
+            light_on_lux=300.0,
+            light_off_lux=380.0,
+            min_samples=3,
+            clock=clock,
+        )
+
+        controller.add_sample(35.0, 400.0)
+        clock.now = 60.0
+        self.assertEqual(controller.tick(), [])
+        self.assertEqual(controller.skipped_windows, 1)
+
+        for second in (61.0, 70.0, 80.0):
+            clock.now = second
+            controller.add_sample(35.0, 400.0)
+        clock.now = 121.0
+        self.assertEqual([x["deviceId"] for x in controller.tick()], ["fan_01"])
+
+    def test_sliding_mode_validates_eval_interval(self) -> None:
+        with self.assertRaises(ValueError):
+            AutomationController(
+                window_seconds=60,
+                fan_on_temp_c=29.0,
+                fan_off_temp_c=27.5,
+                light_on_lux=300.0,
+                light_off_lux=380.0,
+                mode="sliding",
+                eval_interval_seconds=0,
+            )
+
+    def _snapshot_controller(self, clock: FakeClock, wall: FakeClock, mode: str = "tumbling") -> AutomationController:
+        return AutomationController(
+            window_seconds=60,
+            fan_on_temp_c=29.0,
+            fan_off_temp_c=27.5,
+            light_on_lux=300.0,
+            light_off_lux=380.0,
+            mode=mode,
+            eval_interval_seconds=10,
+            clock=clock,
+            wall_clock=wall,
+        )
+
+    def test_snapshot_restores_partial_window_after_restart(self) -> None:
+        clock, wall = FakeClock(), FakeClock()
+        wall.now = 1_000.0
+        controller = self._snapshot_controller(clock, wall)
+        controller.add_sample(35.0, 400.0)
+        clock.now = 20.0
+        controller.add_sample(33.0, 400.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "state" / "automation.json"
+            save_snapshot(path, controller.snapshot())
+            snapshot = load_snapshot(path)
+
+        restarted_clock, restarted_wall = FakeClock(), FakeClock()
+        restarted_clock.now = 5.0
+        restarted_wall.now = 1_010.0
+        restarted = self._snapshot_controller(restarted_clock, restarted_wall)
+        restarted.restore(snapshot)
+
+        self.assertEqual(restarted.next_deadline(), 35.0)
+        restarted_clock.now = 35.0
+        commands = restarted.tick()
+        self.assertEqual([(x["deviceId"], x["power"]) for x in commands], [("fan_01", "on")])
+
+    def test_confirmed_power_wins_over_commanded_power(self) -> None:
+        clock, wall = FakeClock(), FakeClock()
+        controller = self._snapshot_controller(clock, wall)
+        controller.add_sample(35.0, 400.0)
+        clock.now = 61.0
+        self.assertEqual([x["deviceId"] for x in controller.tick()], ["fan_01"])
+        controller.confirm("fan_01", "off")
+        controller.confirm("unknown_device", "on")
+
+        restarted = self._snapshot_controller(FakeClock(), FakeClock())
+        restarted.restore(controller.snapshot())
+
+        self.assertEqual(restarted.power_state(), {"fan_01": "off", "light_01": "off"})
+        self.assertIsNone(restarted.next_deadline())
+
+    def test_stale_tumbling_window_is_discarded_on_restore(self) -> None:
+        clock, wall = FakeClock(), FakeClock()
+        controller = self._snapshot_controller(clock, wall)
+        controller.add_sample(35.0, 400.0)
+        snapshot = controller.snapshot()
+
+        restarted_wall = FakeClock()
+        restarted_wall.now = 120.0
+        restarted = self._snapshot_controller(FakeClock(), restarted_wall)
+        restarted.restore(snapshot)
+
+        self.assertIsNone(restarted.next_deadline())
+        self.assertEqual(restarted.tick(), [])
+
+    def test_sliding_snapshot_ages_buckets_by_downtime(self) -> None:
+        clock, wall = FakeClock(), FakeClock()
+        controller = self._snapshot_controller(clock, wall, mode="sliding")
+        controller.add_sample(10.0, 400.0)
+        clock.now = 45.0
+        controller.add_sample(40.0, 400.0)
+        snapshot = controller.snapshot()
+
+        restarted_clock, restarted_wall = FakeClock(), FakeClock()
+        restarted_clock.now = 100.0
+        restarted_wall.now = 20.0
+        restarted = self._snapshot_controller(restarted_clock, restarted_wall, mode="sliding")
+        restarted.restore(snapshot)
+
+        # The 10 C sample has aged out of the window during the 20 s downtime; only 40 C remains.
+        restarted_clock.now = 110.0
+        commands = restarted.tick()
+        self.assertEqual([(x["deviceId"], x["power"]) for x in commands], [("fan_01", "on")])
+
+    def test_load_snapshot_ignores_missing_and_foreign_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "automation.json"
+            self.assertIsNone(load_snapshot(path))
+            path.write_text('{"version": 99}', encoding="utf-8")
+            with self.assertLogs("bridge.automation", level="WARNING"):
+                self.assertIsNone(load_snapshot(path))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+import io
+import json
+from pathlib import Path
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from bridge.automation import AutomationController
+from bridge.backtest import backtest, iter_sensor_payloads, load_history, main, np, parse_grid
+from bridge.rules import RulePlan
+
+
+def _payload(ts: datetime, temp_c: float) -> dict:
+    return {"device_id": "rpi-01", "received_at": ts.isoformat(), "sensors": {"dht11_temp_c": temp_c, "pir": 0}}
+
+
+class BacktestInputTests(unittest.TestCase):
+    def test_parse_grid_accepts_lists_and_ranges(self) -> None:
+        self.assertEqual(parse_grid("29"), [29.0])
+        self.assertEqual(parse_grid("27,27.5"), [27.0, 27.5])
+        self.assertEqual(parse_grid("28:29:0.5"), [28.0, 28.5, 29.0])
+
+    def test_reads_single_batched_and_topic_prefixed_lines(self) -> None:
+        start = datetime(2026, 2, 16, 12, 0, tzinfo=timezone.utc)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "capture.jsonl"
+            path.write_text(
+                "\n".join(
+                    [
+                        json.dumps(_payload(start, 28.0)),
+                        json.dumps([_payload(start, 29.0), _payload(start, 30.0)]),
+                        "home/pi/sensors/all " + json.dumps(_payload(start, 31.0)),
+                        "not json",
+                    ]
+                ),
+                encoding="utf-8",
+            )
+
+            temps = [payload["sensors"]["dht11_temp_c"] for payload in iter_sensor_payloads(path)]
+
+        self.assertEqual(temps, [28.0, 29.0, 30.0, 31.0])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class BacktestTests(unittest.TestCase):
+    def _history(self):
+        rng = random.Random(7)
+        start = datetime(2026, 2, 16, 12, 0, tzinfo=timezone.utc)
+        ts, temp, samples = start, 28.0, []
+        for _ in range(2000):
+            ts += timedelta(seconds=rng.uniform(0.5, 3.0))
+            temp += rng.gauss(0, 0.15)
+            samples.append(_payload(ts, round(temp, 2)))
+        return samples
+
+    def test_matches_automation_controller_decisions(self) -> None:
+        samples = self._history()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "capture.jsonl"
+            path.write_text("\n".join(json.dumps(sample) for sample in samples), encoding="utf-8")
+            ts, values = load_history([path], "dht11_temp_c")
+
+        results = backtest(ts, values, [30, 120], [28.5, 29.0], [27.5, 28.0], rising=True)
+        sparse = backtest(ts, values, [30], [28.5, 29.0], [27.5, 28.0], rising=True, min_samples=17)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(row["skipped"] for row in sparse))
+
+        for row in results + sparse:
+            rule = {"device": "fan_01", "sensor": "dht11_temp_c", "on_above": row["on"], "off_below": row["off"]}
+            controller = AutomationController(
+                window_seconds=row["window_seconds"],
+                fan_on_temp_c=0,
+                fan_off_temp_c=0,
+                light_on_lux=0,
+                light_off_lux=0,
+                rules=RulePlan.from_dict({"rules": [rule]}),
+                min_samples=17 if row in sparse else 1,
+            )
+            toggles = 0
+            for sample in samples:
+                # The live tick closes a due window before the next sample is added.
+                observed_at = datetime.fromisoformat(sample["received_at"])
+                toggles += len(controller.tick(observed_at))
+                toggles += len(controller.add_values(sample["sensors"], observed_at))
+            self.assertEqual(row["toggles"], toggles, row)
+
+    def test_cli_prints_one_row_per_combination(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "capture.jsonl"
+            path.write_text("\n".join(json.dumps(sample) for sample in self._history()), encoding="utf-8")
+            stdout = io.StringIO()
+            with mock.patch("sys.stdout", stdout), mock.patch("sys.stderr", io.StringIO()):
+                code = main([str(path), "--on", "29:30:0.5", "--off", "27.5", "--window", "60,120", "--json"])
+
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(code, 0)
+        self.assertEqual([(row["window_seconds"], row["on"]) for row in rows][:3], [(60.0, 29.0), (60.0, 29.5), (60.0, 30.0)])
+        self.assertEqual(len(rows), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
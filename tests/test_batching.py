@@ -0,0 +1,67 @@
+import json
+import unittest
+
+from bridge.batching import SensorBatcher
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _sample(index: int) -> dict:
+    return {
+        "device_id": "rpi-01",
+        "source": "arduino-serial",
+        "received_at": f"2026-02-16T12:00:{index:02d}+00:00",
+        "sensors": {"pir": 0, "dht11_temp_c": 27.0},
+    }
+
+
+class SensorBatcherTests(unittest.TestCase):
+    def test_flushes_when_max_count_reached(self) -> None:
+        batcher = SensorBatcher(max_count=3, max_bytes=100000, max_linger_seconds=10.0)
+
+        self.assertEqual(batcher.add(_sample(0)), [])
+        self.assertEqual(batcher.add(_sample(1)), [])
+        batches = batcher.add(_sample(2))
+
+        self.assertEqual(len(batches), 1)
+        samples = json.loads(batches[0])
+        self.assertEqual([x["received_at"] for x in samples], [_sample(i)["received_at"] for i in range(3)])
+        self.assertEqual(len(batcher), 0)
+
+    def test_flushes_before_exceeding_max_bytes(self) -> None:
+        item_size = len(json.dumps(_sample(0), separators=(",", ":")))
+        batcher = SensorBatcher(max_count=100, max_bytes=2 * item_size + 4, max_linger_seconds=10.0)
+
+        batcher.add(_sample(0))
+        batcher.add(_sample(1))
+        batches = batcher.add(_sample(2))
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(len(json.loads(batches[0])), 2)
+        self.assertEqual(len(batcher), 1)
+
+    def test_flush_due_after_linger(self) -> None:
+        clock = FakeClock()
+        batcher = SensorBatcher(max_count=100, max_linger_seconds=1.0, clock=clock)
+        batcher.add(_sample(0))
+
+        clock.now = 0.5
+        self.assertIsNone(batcher.flush_due())
+
+        clock.now = 1.0
+        batch = batcher.flush_due()
+        self.assertEqual(len(json.loads(batch)), 1)
+        self.assertIsNone(batcher.next_deadline())
+
+    def test_flush_returns_none_when_empty(self) -> None:
+        self.assertIsNone(SensorBatcher().flush())
+
+
+if __name__ == "__main__":
+    unittest.main()
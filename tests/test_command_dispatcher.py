@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+import unittest
+
+from bridge.command_dispatcher import CommandDispatcher, command_ordering_key
+from bridge.command_limiter import CommandLimiter
+
+
+class FakeBridge:
+    def __init__(self) -> None:
+        self.acks = []
+        self._lock = threading.Lock()
+
+    def publish_ack(self, payload, topic=None) -> bool:
+        with self._lock:
+            self.acks.append((topic, payload))
+        return True
+
+
+def _device_command(device_id: str, request_id: str) -> str:
+    return json.dumps({"requestId": request_id, "deviceId": device_id, "power": "on"})
+
+
+class CommandDispatcherTests(unittest.TestCase):
+    def test_ordering_key_uses_device_id_or_topic(self) -> None:
+        self.assertEqual(command_ordering_key(_device_command("fan_01", "r1"), "home/pi/commands/device"), "fan_01")
+        self.assertEqual(command_ordering_key('{"state":"on"}', "home/pi/commands/switch"), "home/pi/commands/switch")
+        self.assertEqual(command_ordering_key("not-json", "home/pi/commands/device"), "home/pi/commands/device")
+
+    def test_same_device_commands_run_in_order_and_publish_acks(self) -> None:
+        seen = []
+
+        def handler(payload, topic):
+            parsed = json.loads(payload)
+            seen.append(parsed["requestId"])
+            return {"requestId": parsed["requestId"], "status": "accepted", "_ack_topic": topic + "/ack"}
+
+        bridge = FakeBridge()
+        dispatcher = CommandDispatcher(handler, workers=4)
+        dispatcher.bind(bridge)
+        dispatcher.start()
+        for idx in range(20):
+            dispatcher.submit(_device_command("fan_01", f"r{idx}"), "home/pi/commands/device")
+        dispatcher.stop()
+
+        self.assertEqual(seen, [f"r{idx}" for idx in range(20)])
+        self.assertEqual(len(bridge.acks), 20)
+        self.assertEqual(bridge.acks[0][0], "home/pi/commands/device/ack")
+        self.assertNotIn("_ack_topic", bridge.acks[0][1])
+        stats = dispatcher.stats()
+        self.assertEqual(stats["processed"], 20)
+        self.assertEqual(stats["processing_time"]["count"], 20)
+
+    def test_slow_device_does_not_block_other_devices(self) -> None:
+        release = threading.Event()
+        light_done = threading.Event()
+
+        def handler(payload, _topic):
+            device_id = json.loads(payload)["deviceId"]
+            if device_id == "fan_01":
+                release.wait(5)
+            else:
+                light_done.set()
+            return None
+
+        dispatcher = CommandDispatcher(handler, workers=2)
+        dispatcher.bind(FakeBridge())
+        fan_worker = hash("fan_01") % 2
+        light_id = next(
+            candidate for candidate in (f"light_{idx:02d}" for idx in range(64)) if hash(candidate) % 2 != fan_worker
+        )
+        dispatcher.start()
+        dispatcher.submit(_device_command("fan_01", "slow"), "home/pi/commands/device")
+        dispatcher.submit(_device_command(light_id, "fast"), "home/pi/commands/device")
+
+        self.assertTrue(light_done.wait(2))
+        release.set()
+        dispatcher.stop()
+
+    def test_full_queue_rejects_with_overflow_ack(self) -> None:
+        release = threading.Event()
+        started = threading.Event()
+
+        def handler(_payload, _topic):
+            started.set()
+            release.wait(5)
+            return None
+
+        bridge = FakeBridge()
+        dispatcher = CommandDispatcher(
+            handler,
+            workers=1,
+            queue_size=1,
+            on_overflow=lambda _payload, topic: {"status": "rejected", "reason": "Command queue full", "_ack_topic": topic},
+        )
+        dispatcher.bind(bridge)
+        dispatcher.start()
+        dispatcher.submit(_device_command("fan_01", "r1"), "t")
+        self.assertTrue(started.wait(2))
+        dispatcher.submit(_device_command("fan_01", "r2"), "t")
+        dispatcher.submit(_device_command("fan_01", "r3"), "t")
+
+        self.assertEqual(bridge.acks, [("t", {"status": "rejected", "reason": "Command queue full"})])
+        self.assertEqual(dispatcher.stats()["rejected"], 1)
+        release.set()
+        dispatcher.stop()
+
+    def test_stop_with_full_queue_returns_within_timeout(self) -> None:
+        release = threading.Event()
+        started = threading.Event()
+        seen = []
+
+        def handler(payload, _topic):
+            seen.append(json.loads(payload)["requestId"])
+            started.set()
+            release.wait(5)
+            return None
+
+        dispatcher = CommandDispatcher(handler, workers=1, queue_size=1)
+        dispatcher.start()
+        dispatcher.submit(_device_command("fan_01", "r1"), "t")
+        self.assertTrue(started.wait(2))
+        dispatcher.submit(_device_command("fan_01", "r2"), "t")
+
+        started_at = time.monotonic()
+        with self.assertLogs("bridge.command_dispatcher", level="WARNING"):
+            dispatcher.stop(timeout=0.2)
+        elapsed = time.monotonic() - started_at
+        release.set()
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(seen, ["r1"])
+
+    def test_coalescing_runs_only_latest_command_per_device(self) -> None:
+        seen = []
+        gate = threading.Event()
+
+        def handler(payload, _topic):
+            seen.append(json.loads(payload)["requestId"])
+            return None
+
+        def on_limited(payload, _topic, verdict):
+            return {"requestId": json.loads(payload)["requestId"], "status": verdict}
+
+        bridge = FakeBridge()
+        dispatcher = CommandDispatcher(
+            handler,
+            workers=1,
+            limiter=CommandLimiter(rate=0, coalesce_seconds=0.05),
+            on_limited=on_limited,
+            sleep=lambda _delay: gate.wait(5),
+        )
+        dispatcher.bind(bridge)
+        dispatcher.start()
+        for idx in range(3):
+            dispatcher.submit(_device_command("fan_01", f"r{idx}"), "t")
+        dispatcher.submit(_device_command("light_01", "l0"), "t")
+        gate.set()
+        dispatcher.stop()
+
+        self.assertEqual(seen, ["r2", "l0"])
+        self.assertEqual(
+            [ack for _topic, ack in bridge.acks],
+            [{"requestId": "r0", "status": "superseded"}, {"requestId": "r1", "status": "superseded"}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,10 @@ from pathlib import Path
 import tempfile
 import unittest
 
-from bridge.command_handler import handle_device_command, handle_switch_command
+from bridge.audit_log import AuditLogWriter
+from bridge.command_handler import handle_bulk_device_command, handle_device_command, handle_switch_command
+from bridge.command_limiter import CommandLimiter
+from bridge.request_cache import RequestCache
 
 
 def _read_jsonl(path: Path):
@@ -92,6 +95,113 @@ class CommandHandlerTests(unittest.TestCase):
             self.assertEqual(ack["status"], "rejected")
             self.assertIn("setpoint", ack["reason"])
 
+    def test_handlers_write_through_audit_log_writer(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = Path(temp_dir) / "commands.jsonl"
+            writer = AuditLogWriter(log_path, flush_interval=60.0, fsync_policy="none")
+            writer.start()
+
+            handle_switch_command('{"state":"on"}', writer)
+            handle_device_command('{"requestId":"req-4","deviceId":"fan_01","power":"off"}', writer)
+            writer.close()
+
+            rows = _read_jsonl(log_path)
+            self.assertEqual([row["status"] for row in rows], ["accepted", "accepted"])
+            self.assertEqual(rows[1]["command"]["requestId"], "req-4")
+
+    def test_duplicate_request_id_returns_cached_ack_without_logging(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = Path(temp_dir) / "commands.jsonl"
+            cache = RequestCache(max_entries=8)
+            payload = '{"requestId":"req-5","deviceId":"fan_01","power":"on"}'
+
+            first = handle_device_command(payload, log_path, cache=cache)
+            second = handle_device_command(payload, log_path, cache=cache)
+            rejected = handle_device_command('{"requestId":"req-6","deviceId":"heater"}', log_path, cache=cache)
+            rejected_again = handle_device_command('{"requestId":"req-6","deviceId":"heater"}', log_path, cache=cache)
+
+            self.assertEqual(first, second)
+            self.assertEqual(rejected, rejected_again)
+            self.assertEqual(len(_read_jsonl(log_path)), 2)
+            self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_array_payload_is_validated_as_bulk_and_logged_in_one_batch(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = Path(temp_dir) / "commands.jsonl"
+            writer = AuditLogWriter(log_path, flush_interval=0, fsync_policy="none")
+            payload = json.dumps(
+                [
+                    {"requestId": "b-1", "deviceId": "fan_01", "power": "on"},
+                    {"requestId": "b-2", "deviceId": "ac_01", "power": "on", "setpoint": 40},
+                    "not-a-command",
+                ]
+            )
+
+            ack = handle_device_command(payload, writer)
+            flushes = writer.stats()["flushes"]
+            writer.close()
+
+            self.assertEqual(ack["status"], "partial")
+            self.assertEqual((ack["accepted"], ack["rejected"]), (1, 2))
+            self.assertEqual([result["status"] for result in ack["results"]], ["accepted", "rejected", "rejected"])
+            self.assertEqual(ack["results"][1]["requestId"], "b-2")
+            self.assertEqual(flushes, 1)
+            self.assertEqual(len(_read_jsonl(log_path)), 3)
+
+    def test_bulk_topic_payload_carries_bulk_id_and_enforces_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = Path(temp_dir) / "commands.jsonl"
+            cache = RequestCache(max_entries=8)
+            commands = [{"requestId": f"s-{i}", "deviceId": "light_01", "power": "off"} for i in range(3)]
+
+            ack = handle_bulk_device_command(
+                json.dumps({"requestId": "scene-1", "commands": commands}), log_path, cache=cache
+            )
+            too_many = handle_bulk_device_command(
+                json.dumps({"requestId": "scene-2", "commands": commands}), log_path, max_bulk=2
+            )
+            repeat = handle_device_command(json.dumps(commands[0]), log_path, cache=cache)
+
+            self.assertEqual(ack["requestId"], "scene-1")
+            self.assertEqual(ack["status"], "accepted")
+            self.assertEqual(ack["accepted"], 3)
+            self.assertEqual(too_many["status"], "rejected")
+            self.assertEqual(too_many["reason"], "Bulk command exceeds 2 entries")
+            self.assertEqual(repeat, ack["results"][0])
+            rows = _read_jsonl(log_path)
+            self.assertEqual([row.get("bulkId") for row in rows], ["scene-1", "scene-1", "scene-1", None])
+
+    def test_bulk_entries_are_limited_per_device(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = Path(temp_dir) / "commands.jsonl"
+            commands = [
+                {"requestId": "r-1", "deviceId": "fan_01", "power": "on"},
+                {"requestId": "r-2", "deviceId": "fan_01", "power": "off"},
+                {"requestId": "r-3", "deviceId": "light_01", "power": "on"},
+                {"requestId": "r-4", "deviceId": "fan_01", "power": "on"},
+            ]
+
+            limited = handle_device_command(
+                json.dumps(commands), log_path, limiter=CommandLimiter(rate=1.0, burst=1, clock=lambda: 0.0)
+            )
+            coalesced = handle_bulk_device_command(
+                json.dumps({"requestId": "scene-1", "commands": commands}),
+                log_path,
+                limiter=CommandLimiter(rate=0, coalesce_seconds=0.1),
+            )
+
+            self.assertEqual(limited["status"], "partial")
+            self.assertEqual(
+                [result["status"] for result in limited["results"]],
+                ["accepted", "rate_limited", "accepted", "rate_limited"],
+            )
+            self.assertEqual(limited["results"][1]["requestId"], "r-2")
+            self.assertEqual(
+                [result["status"] for result in coalesced["results"]],
+                ["superseded", "superseded", "accepted", "accepted"],
+            )
+            self.assertEqual(len(_read_jsonl(log_path)), 4)
+
 
 if __name__ == "__main__":
     unittest.main()
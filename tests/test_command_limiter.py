@@ -0,0 +1,50 @@
+import unittest
+
+from bridge.command_limiter import RATE_LIMITED, SUPERSEDED, CommandLimiter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CommandLimiterTests(unittest.TestCase):
+    def test_token_bucket_limits_per_device_and_refills(self) -> None:
+        clock = FakeClock()
+        limiter = CommandLimiter(rate=2.0, burst=3, clock=clock)
+
+        verdicts = [limiter.check("fan_01", limiter.admit("fan_01")) for _ in range(4)]
+        self.assertEqual(verdicts, [None, None, None, RATE_LIMITED])
+        self.assertIsNone(limiter.check("light_01", limiter.admit("light_01")))
+
+        clock.now = 0.5
+        self.assertIsNone(limiter.check("fan_01", limiter.admit("fan_01")))
+        self.assertEqual(limiter.check("fan_01", limiter.admit("fan_01")), RATE_LIMITED)
+        self.assertEqual(limiter.stats()["rate_limited"], 2)
+
+    def test_older_held_command_is_superseded_by_newer_one(self) -> None:
+        limiter = CommandLimiter(rate=0, coalesce_seconds=0.2, clock=FakeClock())
+        first = limiter.admit("fan_01")
+        second = limiter.admit("fan_01")
+        other = limiter.admit("light_01")
+
+        self.assertEqual(limiter.check("fan_01", first), SUPERSEDED)
+        self.assertIsNone(limiter.check("fan_01", second))
+        self.assertIsNone(limiter.check("light_01", other))
+        self.assertEqual(limiter.stats()["superseded"], 1)
+
+    def test_device_state_is_bounded(self) -> None:
+        limiter = CommandLimiter(rate=1.0, burst=1, max_devices=2, clock=FakeClock())
+        for device_id in ("a", "b", "c", "a"):
+            limiter.check(device_id, limiter.admit(device_id))
+
+        stats = limiter.stats()
+        self.assertEqual(stats["devices"], 2)
+        self.assertEqual(stats["evictions"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
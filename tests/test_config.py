@@ -23,6 +23,21 @@ class ConfigTests(unittest.TestCase):
         self.assertEqual(config.auto_light_on_lux, 300.0)
         self.assertEqual(config.auto_light_off_lux, 380.0)
 
+    def test_from_env_reads_qos_policy(self) -> None:
+        config = from_env({"MQTT_SENSOR_QOS": "0", "MQTT_SENSOR_LATEST_TOPIC": "home/pi/sensors/latest"})
+
+        self.assertEqual(config.mqtt_sensor_qos, 0)
+        self.assertEqual(config.mqtt_command_qos, 1)
+        self.assertEqual(config.mqtt_sensor_latest_topic, "home/pi/sensors/latest")
+        with self.assertRaises(ValueError):
+            from_env({"MQTT_ACK_QOS": "3"})
+
+    def test_from_env_rejects_line_reads_of_binary_frames(self) -> None:
+        self.assertEqual(from_env({"SERIAL_READ_MODE": "line"}).serial_frame_format, "json")
+        for frame_format in ("binary", "auto"):
+            with self.assertRaisesRegex(ValueError, "SERIAL_READ_MODE=line"):
+                from_env({"SERIAL_READ_MODE": "line", "SERIAL_FRAME_FORMAT": frame_format})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from bridge.deadband import DeadbandFilter, DeadbandRule, parse_deadband_spec
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _values(**overrides):
+    values = {
+        "pir": 0,
+        "dht11_temp_c": 27.0,
+        "dht11_humidity": 58.0,
+        "lm393_raw": 632,
+        "lm393_lux": 400.0,
+    }
+    values.update(overrides)
+    return values
+
+
+class DeadbandFilterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.filter = DeadbandFilter(
+            parse_deadband_spec("dht11_temp_c=0.5,dht11_humidity=1,lm393_raw=8,lm393_lux=5%"),
+            heartbeat_seconds=60.0,
+            clock=self.clock,
+        )
+
+    def test_parse_deadband_spec_reads_absolute_and_percent(self) -> None:
+        rules = parse_deadband_spec("dht11_temp_c=0.2, lm393_lux=5%")
+
+        self.assertEqual(rules["dht11_temp_c"], DeadbandRule(absolute=0.2))
+        self.assertEqual(rules["lm393_lux"], DeadbandRule(percent=5.0))
+
+    def test_parse_deadband_spec_rejects_unknown_key(self) -> None:
+        with self.assertRaisesRegex(ValueError, "Invalid deadband entry"):
+            parse_deadband_spec("co2=5")
+
+    def test_suppresses_changes_inside_deadband(self) -> None:
+        self.assertTrue(self.filter.should_publish("rpi-01", _values()))
+        self.assertFalse(self.filter.should_publish("rpi-01", _values(dht11_temp_c=27.3, lm393_lux=410.0)))
+        self.assertTrue(self.filter.should_publish("rpi-01", _values(dht11_temp_c=27.6)))
+
+        self.assertEqual(self.filter.stats(), {"published": 2, "suppressed": 1})
+
+    def test_compares_against_last_published_value(self) -> None:
+        self.filter.should_publish("rpi-01", _values())
+        self.assertFalse(self.filter.should_publish("rpi-01", _values(dht11_temp_c=27.3)))
+        self.assertTrue(self.filter.should_publish("rpi-01", _values(dht11_temp_c=27.6)))
+
+    def test_percent_threshold_scales_with_value(self) -> None:
+        self.filter.should_publish("rpi-01", _values())
+
+        self.assertTrue(self.filter.should_publish("rpi-01", _values(lm393_lux=421.0)))
+
+    def test_pir_transitions_always_publish(self) -> None:
+        self.filter.should_publish("rpi-01", _values())
+
+        self.assertTrue(self.filter.should_publish("rpi-01", _values(pir=1)))
+        self.assertTrue(self.filter.should_publish("rpi-01", _values(pir=0)))
+
+    def test_heartbeat_republishes_unchanged_values(self) -> None:
+        self.filter.should_publish("rpi-01", _values())
+
+        self.clock.now = 59.0
+        self.assertFalse(self.filter.should_publish("rpi-01", _values()))
+        self.clock.now = 60.0
+        self.assertTrue(self.filter.should_publish("rpi-01", _values()))
+
+    def test_tracks_devices_independently(self) -> None:
+        self.filter.should_publish("rpi-01", _values())
+
+        self.assertTrue(self.filter.should_publish("rpi-01-ttyACM1", _values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
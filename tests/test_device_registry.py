@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from bridge.command_handler import handle_device_command
+from bridge.device_registry import DeviceRegistry, load_device_registry
+
+
+def _ack(payload: dict, registry=None) -> dict:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        return handle_device_command(json.dumps(payload), Path(temp_dir) / "commands.jsonl", registry=registry)
+
+
+class DefaultRegistryTests(unittest.TestCase):
+    def test_default_registry_keeps_rejection_messages(self) -> None:
+        cases = [
+            ({"requestId": "r", "deviceId": "heater_01", "power": "on"}, "Invalid deviceId"),
+            ({"requestId": "r", "deviceId": "fan_01", "power": "toggle"}, "Invalid power, expected 'on' or 'off'"),
+            ({"requestId": "r", "deviceId": "ac_01", "power": "on", "setpoint": "22"}, "AC setpoint must be numeric"),
+            ({"requestId": "r", "deviceId": "ac_01", "power": "on", "setpoint": True}, "AC setpoint must be numeric"),
+            ({"requestId": "r", "deviceId": "ac_01", "power": "on", "setpoint": 31}, "AC setpoint must be in range 16-27"),
+            ({"requestId": "r", "deviceId": "fan_01", "power": "on", "setpoint": 22}, "setpoint is only valid for ac_01"),
+        ]
+        for payload, reason in cases:
+            with self.subTest(reason=reason):
+                ack = _ack(payload)
+                self.assertEqual(ack["status"], "rejected")
+                self.assertEqual(ack["reason"], reason)
+
+    def test_default_registry_rounds_setpoint(self) -> None:
+        ack = _ack({"requestId": "r", "deviceId": "ac_01", "power": "on", "setpoint": 21.6})
+        self.assertEqual(ack["status"], "accepted")
+        self.assertEqual(ack["setpoint"], 22)
+        self.assertNotIn("setpoint", _ack({"requestId": "r", "deviceId": "ac_01", "power": "off"}))
+
+
+class CustomRegistryTests(unittest.TestCase):
+    def test_registry_with_many_devices_and_parameters(self) -> None:
+        devices = [{"id": f"light_{idx:03d}"} for idx in range(500)]
+        devices.append({"id": "dimmer_01", "parameters": {"level": {"type": "float", "min": 0, "max": 1}}})
+        devices.append({"id": "blind_01", "power": ["open", "closed"]})
+        registry = DeviceRegistry.from_dict({"devices": devices})
+
+        self.assertEqual(len(registry), 502)
+        self.assertIn("light_499", registry)
+        self.assertEqual(_ack({"requestId": "r", "deviceId": "light_499", "power": "on"}, registry)["status"], "accepted")
+
+        ack = _ack({"requestId": "r", "deviceId": "dimmer_01", "power": "on", "level": 0.25}, registry)
+        self.assertEqual(ack["level"], 0.25)
+        ack = _ack({"requestId": "r", "deviceId": "dimmer_01", "power": "on", "level": 2}, registry)
+        self.assertEqual(ack["reason"], "level must be in range 0-1")
+        ack = _ack({"requestId": "r", "deviceId": "light_000", "power": "on", "level": 1}, registry)
+        self.assertEqual(ack["reason"], "level is only valid for dimmer_01")
+        ack = _ack({"requestId": "r", "deviceId": "blind_01", "power": "on"}, registry)
+        self.assertEqual(ack["reason"], "Invalid power, expected 'open' or 'closed'")
+
+    def test_invalid_registry_specs_are_rejected(self) -> None:
+        bad_specs = [
+            {},
+            {"devices": []},
+            {"devices": [{"power": ["on"]}]},
+            {"devices": [{"id": "a"}, {"id": "a"}]},
+            {"devices": [{"id": "a", "power": "on"}]},
+            {"devices": [{"id": "a", "parameters": {"level": {"min": 0}}}]},
+            {"devices": [{"id": "a", "parameters": {"level": {"min": 0, "max": 1, "type": "str"}}}]},
+        ]
+        for spec in bad_specs:
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                DeviceRegistry.from_dict(spec)
+
+    def test_load_registry_from_file(self) -> None:
+        example = Path(__file__).resolve().parents[1] / "deploy" / "device_registry.example.json"
+        registry = load_device_registry(example)
+        self.assertIn("dimmer_01", registry)
+        self.assertEqual(len(load_device_registry("")), 3)
+        with self.assertRaises(ValueError):
+            load_device_registry("/nonexistent/devices.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
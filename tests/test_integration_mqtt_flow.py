@@ -1,8 +1,13 @@
 import json
+import tempfile
+import threading
 import unittest
 
+from bridge.automation import AutomationController
 from bridge.config import Config
+from bridge.main import SensorFrameProcessor, build_command_callback
 from bridge.mqtt_client import MQTTBridgeClient
+from bridge.spool import Spool
 
 
 class FakeMQTTClient:
@@ -14,6 +19,13 @@ class FakeMQTTClient:
         self.connected_to = None
         self.subscriptions = []
         self.published = []
+        self.online = True
+        self.queued = []
+        self.max_queued = 0
+        self.on_publish = None
+        self.ack_immediately = False
+        self.max_inflight = None
+        self._next_mid = 0
 
     def username_pw_set(self, username, password) -> None:
         self.username = username
@@ -29,13 +41,40 @@ class FakeMQTTClient:
         return (0, len(self.subscriptions))
 
     def publish(self, topic, payload, qos=0, retain=False):
-        self.published.append((topic, payload, qos, retain))
+        online = self.online
+        self._next_mid += 1
+        mid = self._next_mid
 
         class Result:
             rc = 0
 
+        Result.mid = mid
+        if online:
+            self.published.append((topic, payload, qos, retain))
+            if self.ack_immediately and self.on_publish:
+                self.on_publish(self, None, mid)
+        elif qos > 0 and (self.max_queued == 0 or len(self.queued) < self.max_queued):
+            # Like paho: QoS>=1 messages are kept while disconnected and sent after reconnecting.
+            self.queued.append((topic, payload, qos, retain))
+            Result.rc = 4
+        else:
+            Result.rc = 15 if qos > 0 else 4
         return Result()
 
+    def reconnect(self) -> None:
+        self.online = True
+        self.published.extend(self.queued)
+        self.queued = []
+
+    def max_inflight_messages_set(self, inflight) -> None:
+        self.max_inflight = inflight
+
+    def puback(self, mid) -> None:
+        self.on_publish(self, None, mid, 0, None)
+
+    def is_connected(self) -> bool:
+        return self.online
+
     def loop_start(self) -> None:
         return None
 
@@ -182,6 +221,386 @@ class MQTTFlowTests(unittest.TestCase):
         self.assertEqual(body["power"], "on")
         self.assertEqual(body["source"], "automation")
 
+    def test_mqtt_bridge_publishes_sensor_batch_to_batch_topic(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+            mqtt_sensor_batch_enabled=True,
+            mqtt_sensor_batch_topic="home/pi/sensors/batch",
+        )
+
+        bridge = MQTTBridgeClient(config, on_command=lambda _payload, _topic: {}, mqtt_factory=lambda: fake_client)
+        bridge.connect()
+
+        self.assertTrue(bridge.publish_sensor_batch('[{"sample":1},{"sample":2}]'))
+
+        publications = [x for x in fake_client.published if x[0] == "home/pi/sensors/batch"]
+        self.assertEqual(len(publications), 1)
+        self.assertEqual(json.loads(publications[0][1]), [{"sample": 1}, {"sample": 2}])
+
+    def test_failed_publishes_are_spooled_and_drained_after_reconnect(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+            mqtt_sensor_qos=0,
+            mqtt_ack_qos=0,
+        )
+
+        with tempfile.TemporaryDirectory() as spool_dir:
+            spool = Spool(spool_dir, drain_rate=100.0)
+            bridge = MQTTBridgeClient(
+                config,
+                on_command=lambda _payload, _topic: {},
+                mqtt_factory=lambda: fake_client,
+                spool=spool,
+            )
+            bridge.connect()
+
+            fake_client.online = False
+            fake_client.max_queued = 1
+            self.assertFalse(bridge.publish_sensor({"sample": 1}))
+            self.assertTrue(bridge.publish_device_command({"deviceId": "fan_01", "power": "on"}))
+            self.assertFalse(bridge.publish_device_command({"deviceId": "fan_01", "power": "off"}))
+            self.assertFalse(bridge.publish_ack({"status": "accepted"}))
+            self.assertEqual(bridge.drain_spool(), 0)
+
+            fake_client.reconnect()
+            self.assertEqual(bridge.drain_spool(), 2)
+            self.assertEqual(
+                [(topic, json.loads(payload)) for topic, payload, _qos, _retain in fake_client.published],
+                [
+                    ("home/pi/commands/device", {"deviceId": "fan_01", "power": "on"}),
+                    ("home/pi/sensors/all", {"sample": 1}),
+                    ("home/pi/commands/device", {"deviceId": "fan_01", "power": "off"}),
+                ],
+            )
+            spool.close()
+
+    def test_qos1_publishes_queued_by_paho_are_not_spooled(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+        )
+
+        with tempfile.TemporaryDirectory() as spool_dir:
+            spool = Spool(spool_dir, drain_rate=100.0)
+            bridge = MQTTBridgeClient(
+                config,
+                on_command=lambda _payload, _topic: {},
+                mqtt_factory=lambda: fake_client,
+                spool=spool,
+            )
+            bridge.connect()
+
+            fake_client.online = False
+            self.assertTrue(bridge.publish_sensor({"sample": 1}))
+            self.assertTrue(bridge.publish_device_command({"deviceId": "fan_01", "power": "on"}))
+            self.assertEqual(spool.pending_bytes, 0)
+            self.assertEqual(bridge.publish_stats()["queued_offline"], 2)
+
+            fake_client.reconnect()
+            self.assertEqual(bridge.drain_spool(), 0)
+            self.assertEqual(
+                [(topic, json.loads(payload)) for topic, payload, _qos, _retain in fake_client.published],
+                [
+                    ("home/pi/sensors/all", {"sample": 1}),
+                    ("home/pi/commands/device", {"deviceId": "fan_01", "power": "on"}),
+                ],
+            )
+            spool.close()
+
+    def test_inflight_window_tracks_pubacks_and_applies_backpressure(self) -> None:
+        fake_client = FakeMQTTClient()
+        now = [0.0]
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+            mqtt_max_inflight=2,
+        )
+
+        bridge = MQTTBridgeClient(
+            config,
+            on_command=lambda _payload, _topic: {},
+            mqtt_factory=lambda: fake_client,
+            clock=lambda: now[0],
+        )
+        bridge.connect()
+        self.assertEqual(fake_client.max_inflight, 2)
+
+        self.assertTrue(bridge.publish_sensor({"sample": 1}))
+        self.assertTrue(bridge.publish_device_command({"deviceId": "fan_01", "power": "on"}))
+        self.assertFalse(bridge.publish_sensor({"sample": 2}))
+
+        stats = bridge.publish_stats()
+        self.assertEqual(stats["inflight"], 2)
+        self.assertEqual(stats["backpressure_rejections"], 1)
+        self.assertEqual(stats["inflight_per_topic"], {"home/pi/sensors/all": 1, "home/pi/commands/device": 1})
+
+        now[0] = 0.004
+        fake_client.puback(1)
+        self.assertTrue(bridge.publish_sensor({"sample": 3}))
+
+        stats = bridge.publish_stats()
+        self.assertEqual(stats["inflight_per_topic"], {"home/pi/sensors/all": 1, "home/pi/commands/device": 1})
+        latency = stats["latency"]["home/pi/sensors/all"]
+        self.assertEqual(latency["count"], 1)
+        self.assertAlmostEqual(latency["max_ms"], 4.0)
+
+    def test_acks_from_worker_threads_bypass_a_full_window(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+            mqtt_max_inflight=1,
+            mqtt_ack_qos=0,
+        )
+
+        bridge = MQTTBridgeClient(config, on_command=lambda _payload, _topic: {}, mqtt_factory=lambda: fake_client)
+        bridge.connect()
+        self.assertTrue(bridge.publish_sensor({"sample": 1}))
+
+        results = {}
+
+        def _worker() -> None:
+            results["ack"] = bridge.publish_ack({"requestId": "req-1", "status": "accepted"}, topic="home/pi/commands/device/ack")
+            results["sensor"] = bridge.publish_sensor({"sample": 2})
+
+        worker = threading.Thread(target=_worker)
+        worker.start()
+        worker.join()
+
+        self.assertEqual(results, {"ack": True, "sensor": False})
+        self.assertEqual([x[0] for x in fake_client.published], ["home/pi/sensors/all", "home/pi/commands/device/ack"])
+
+        fake_client.online = False
+        with self.assertLogs("bridge.mqtt_client", level="WARNING"):
+            self.assertFalse(bridge.publish_ack({"requestId": "req-2", "status": "accepted"}))
+        self.assertEqual(bridge.publish_stats()["failed_acks"], 1)
+
+    def test_puback_before_publish_returns_is_recorded(self) -> None:
+        fake_client = FakeMQTTClient()
+        fake_client.ack_immediately = True
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+        )
+
+        bridge = MQTTBridgeClient(config, on_command=lambda _payload, _topic: {}, mqtt_factory=lambda: fake_client)
+        bridge.connect(start_loop=False)
+        for idx in range(5):
+            self.assertTrue(bridge.publish_sensor({"sample": idx}))
+
+        stats = bridge.publish_stats()
+        self.assertEqual(stats["inflight"], 0)
+        self.assertEqual(stats["latency"]["home/pi/sensors/all"]["count"], 5)
+
+    def test_per_stream_qos_retain_and_latest_topic(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        config = Config(
+            serial_port="/dev/ttyACM0",
+            serial_baud=9600,
+            mqtt_host="127.0.0.1",
+            mqtt_port=1883,
+            mqtt_username="",
+            mqtt_password="",
+            mqtt_sensor_topic="home/pi/sensors/all",
+            mqtt_command_topic="home/pi/commands/switch",
+            mqtt_command_ack_topic="home/pi/commands/switch/ack",
+            mqtt_device_command_topic="home/pi/commands/device",
+            mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+            device_id="rpi-01",
+            command_log_path="/tmp/commands.jsonl",
+            mqtt_sensor_qos=0,
+            mqtt_sensor_latest_topic="home/pi/sensors/latest/{device_id}",
+            mqtt_command_qos=2,
+            mqtt_ack_qos=1,
+            mqtt_ack_retain=True,
+        )
+
+        bridge = MQTTBridgeClient(config, on_command=lambda _payload, _topic: {}, mqtt_factory=lambda: fake_client)
+        bridge.connect()
+
+        self.assertIn(("home/pi/commands/device", 2), fake_client.subscriptions)
+        bridge.publish_sensor({"device_id": "rpi-01-ttyACM0", "sensors": {}})
+        bridge.publish_sensor_batch("[]")
+        bridge.publish_device_command({"deviceId": "fan_01", "power": "on"})
+        bridge.publish_ack({"status": "accepted"})
+
+        policies = [(topic, qos, retain) for topic, _payload, qos, retain in fake_client.published]
+        self.assertEqual(
+            policies,
+            [
+                ("home/pi/sensors/all", 0, False),
+                ("home/pi/sensors/latest/rpi-01-ttyACM0", 0, True),
+                ("home/pi/sensors/batch", 0, False),
+                ("home/pi/commands/device", 2, False),
+                ("home/pi/commands/switch/ack", 1, True),
+            ],
+        )
+
+    def test_bulk_topic_is_subscribed_and_answered_with_one_aggregated_ack(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = Config(
+                serial_port="/dev/ttyACM0",
+                serial_baud=9600,
+                mqtt_host="127.0.0.1",
+                mqtt_port=1883,
+                mqtt_username="",
+                mqtt_password="",
+                mqtt_sensor_topic="home/pi/sensors/all",
+                mqtt_command_topic="home/pi/commands/switch",
+                mqtt_command_ack_topic="home/pi/commands/switch/ack",
+                mqtt_device_command_topic="home/pi/commands/device",
+                mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+                device_id="rpi-01",
+                command_log_path=f"{temp_dir}/commands.jsonl",
+            )
+
+            bridge = MQTTBridgeClient(config, on_command=build_command_callback(config), mqtt_factory=lambda: fake_client)
+            bridge.connect()
+
+            self.assertIn(("home/pi/commands/device/bulk", 1), fake_client.subscriptions)
+            scene = {
+                "requestId": "scene-1",
+                "commands": [
+                    {"requestId": "r-1", "deviceId": "fan_01", "power": "on"},
+                    {"requestId": "r-2", "deviceId": "light_01", "power": "on"},
+                ],
+            }
+            msg = type("Msg", (), {"topic": "home/pi/commands/device/bulk", "payload": json.dumps(scene).encode()})
+            fake_client.on_message(fake_client, None, msg)
+
+        acks = [json.loads(x[1]) for x in fake_client.published if x[0] == "home/pi/commands/device/ack"]
+        self.assertEqual(len(acks), 1)
+        self.assertEqual(acks[0]["requestId"], "scene-1")
+        self.assertEqual(acks[0]["status"], "accepted")
+        self.assertEqual([result["requestId"] for result in acks[0]["results"]], ["r-1", "r-2"])
+
+    def test_local_dispatch_publishes_only_ack_and_mirror(self) -> None:
+        fake_client = FakeMQTTClient()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = Config(
+                serial_port="/dev/ttyACM0",
+                serial_baud=9600,
+                mqtt_host="127.0.0.1",
+                mqtt_port=1883,
+                mqtt_username="",
+                mqtt_password="",
+                mqtt_sensor_topic="home/pi/sensors/all",
+                mqtt_command_topic="home/pi/commands/switch",
+                mqtt_command_ack_topic="home/pi/commands/switch/ack",
+                mqtt_device_command_topic="home/pi/commands/device",
+                mqtt_device_command_ack_topic="home/pi/commands/device/ack",
+                device_id="rpi-01",
+                command_log_path=f"{temp_dir}/commands.jsonl",
+                automation_local_dispatch=True,
+                automation_mirror_topic="home/pi/automation/commands",
+            )
+            automation = AutomationController(
+                window_seconds=120,
+                fan_on_temp_c=29.0,
+                fan_off_temp_c=27.5,
+                light_on_lux=300.0,
+                light_off_lux=380.0,
+            )
+            bridge = MQTTBridgeClient(
+                config,
+                on_command=build_command_callback(config, automation=automation),
+                mqtt_factory=lambda: fake_client,
+            )
+            bridge.connect()
+            processor = SensorFrameProcessor(bridge, automation, local_dispatch=True)
+
+            command = {"requestId": "auto-fan_01-1", "deviceId": "fan_01", "power": "on", "source": "automation"}
+            processor.publish_automation_command(command)
+
+        topics = [x[0] for x in fake_client.published]
+        self.assertNotIn("home/pi/commands/device", topics)
+        self.assertEqual(topics, ["home/pi/automation/commands", "home/pi/commands/device/ack"])
+        self.assertEqual(json.loads(fake_client.published[0][1]), command)
+        ack = json.loads(fake_client.published[1][1])
+        self.assertEqual((ack["requestId"], ack["status"]), ("auto-fan_01-1", "accepted"))
+        self.assertEqual(automation.snapshot()["confirmed"], {"fan_01": "on"})
+
 
 if __name__ == "__main__":
     unittest.main()
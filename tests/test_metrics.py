@@ -0,0 +1,34 @@
+import unittest
+
+from bridge.metrics import LatencyHistogram
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    def test_empty_histogram_has_no_percentiles(self) -> None:
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(histogram.snapshot()["count"], 0)
+
+    def test_percentiles_use_bucket_upper_bounds(self) -> None:
+        histogram = LatencyHistogram(bounds_ms=(1.0, 10.0, 100.0))
+        for _ in range(98):
+            histogram.record(0.0005)
+        histogram.record(0.05)
+        histogram.record(0.07)
+
+        self.assertEqual(histogram.percentile(50), 1.0)
+        self.assertEqual(histogram.percentile(99), 70.0)
+        self.assertEqual(histogram.snapshot()["max_ms"], 70.0)
+
+    def test_values_beyond_last_bound_report_max(self) -> None:
+        histogram = LatencyHistogram(bounds_ms=(1.0,))
+        histogram.record(2.5)
+        self.assertEqual(histogram.percentile(99), 2500.0)
+
+    def test_rejects_unsorted_bounds(self) -> None:
+        with self.assertRaises(ValueError):
+            LatencyHistogram(bounds_ms=(10.0, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+
+from bridge.pipeline import RingBuffer, SensorPipeline
+
+
+class RingBufferTests(unittest.TestCase):
+    def test_drop_oldest_keeps_newest_items(self) -> None:
+        ring = RingBuffer(3, "drop_oldest")
+        for item in range(5):
+            self.assertTrue(ring.put(item))
+
+        self.assertEqual(ring.get_batch(10, timeout=0), [2, 3, 4])
+        self.assertEqual(ring.stats()["dropped"], 2)
+
+    def test_drop_newest_rejects_items_when_full(self) -> None:
+        ring = RingBuffer(3, "drop_newest")
+        results = [ring.put(item) for item in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(ring.get_batch(10, timeout=0), [0, 1, 2])
+        self.assertEqual(ring.stats()["dropped"], 2)
+
+    def test_block_waits_for_consumer(self) -> None:
+        ring = RingBuffer(2, "block")
+        ring.put(0)
+        ring.put(1)
+
+        self.assertFalse(ring.put(2, timeout=0.01))
+
+        consumer = threading.Timer(0.02, lambda: ring.get_batch(1, timeout=0))
+        consumer.start()
+        self.assertTrue(ring.put(3, timeout=1.0))
+        consumer.join()
+
+        self.assertEqual(ring.get_batch(10, timeout=0), [1, 3])
+
+    def test_stats_report_depth_and_high_watermark(self) -> None:
+        ring = RingBuffer(4)
+        for item in range(3):
+            ring.put(item)
+        ring.get_batch(2, timeout=0)
+
+        stats = ring.stats()
+
+        self.assertEqual(stats["depth"], 1)
+        self.assertEqual(stats["high_watermark"], 3)
+        self.assertEqual(stats["pushed"], 3)
+        self.assertEqual(stats["popped"], 2)
+
+
+class SensorPipelineTests(unittest.TestCase):
+    def test_reader_thread_feeds_consumer(self) -> None:
+        batches = [[("rpi-01", b"a"), ("rpi-01", b"b")], [("rpi-01", b"c")]]
+
+        def read_frames():
+            if batches:
+                return batches.pop(0)
+            time.sleep(0.005)
+            return []
+
+        pipeline = SensorPipeline(read_frames, capacity=8)
+        pipeline.start()
+        try:
+            received = []
+            deadline = time.monotonic() + 2.0
+            while len(received) < 3 and time.monotonic() < deadline:
+                received.extend(pipeline.get_batch(timeout=0.05))
+        finally:
+            pipeline.stop()
+
+        self.assertEqual([frame for _device_id, frame, _received_at in received], [b"a", b"b", b"c"])
+        stats = pipeline.stats()
+        self.assertEqual(stats["reader"]["frames_read"], 3)
+        self.assertEqual(stats["publisher"]["frames_processed"], 3)
+        self.assertEqual(stats["buffer"]["depth"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
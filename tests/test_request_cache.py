@@ -0,0 +1,50 @@
+import unittest
+
+from bridge.request_cache import RequestCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RequestCacheTests(unittest.TestCase):
+    def test_hit_returns_copy_of_cached_ack(self) -> None:
+        cache = RequestCache(max_entries=4)
+        cache.put("req-1", {"status": "accepted"})
+
+        first = cache.get("req-1")
+        first["_ack_topic"] = "mutated"
+        self.assertEqual(cache.get("req-1"), {"status": "accepted"})
+        self.assertIsNone(cache.get("req-2"))
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = RequestCache(max_entries=2)
+        cache.put("a", {})
+        cache.put("b", {})
+        cache.get("a")
+        cache.put("c", {})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self) -> None:
+        clock = FakeClock()
+        cache = RequestCache(max_entries=2, ttl_seconds=10.0, clock=clock)
+        cache.put("a", {})
+        clock.now = 10.0
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expired"], 1)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+from pathlib import Path
+import unittest
+
+from bridge.rules import RulePlan, default_rule_spec, load_rule_plan
+
+EXAMPLE_RULES = Path(__file__).resolve().parents[1] / "deploy" / "automation_rules.example.json"
+
+
+class RulePlanTests(unittest.TestCase):
+    def test_default_spec_matches_fan_and_light_thresholds(self) -> None:
+        plan = RulePlan.from_dict(default_rule_spec(29.0, 27.5, 300.0, 380.0))
+
+        self.assertEqual(plan.sensors, ("dht11_temp_c", "lm393_lux"))
+        self.assertEqual(plan.slots, ((0, "mean"), (1, "mean")))
+        self.assertEqual(plan.decide([30.0, 200.0], {}), [("fan_01", "on"), ("light_01", "on")])
+        self.assertEqual(plan.decide([28.0, 350.0], {"fan_01": "on", "light_01": "on"}), [])
+        self.assertEqual(
+            plan.decide([27.0, 400.0], {"fan_01": "on", "light_01": "on"}),
+            [("fan_01", "off"), ("light_01", "off")],
+        )
+
+    def test_aggregates_are_shared_across_rules_and_conditions(self) -> None:
+        plan = load_rule_plan(EXAMPLE_RULES, {})
+
+        self.assertEqual(len(plan), 4)
+        self.assertEqual(plan.sensors, ("dht11_temp_c", "lm393_lux", "pir", "dht11_humidity"))
+        self.assertEqual(len(plan.slots), 5)
+        self.assertEqual(len(set(plan.slots)), 5)
+
+    def test_condition_gates_rule_and_missing_data_holds_state(self) -> None:
+        plan = RulePlan.from_dict(
+            {
+                "rules": [
+                    {
+                        "device": "light_01",
+                        "sensor": "lm393_lux",
+                        "on_below": 300,
+                        "off_above": 380,
+                        "when": [{"sensor": "pir", "aggregate": "max", "min": 1}],
+                    }
+                ]
+            }
+        )
+
+        self.assertEqual(plan.decide([100.0, 0.0], {}), [])
+        self.assertEqual(plan.decide([100.0, 1.0], {}), [("light_01", "on")])
+        self.assertEqual(plan.decide([100.0, 0.0], {"light_01": "on"}), [("light_01", "off")])
+        self.assertEqual(plan.decide([None, 1.0], {"light_01": "on"}), [])
+
+    def test_rejects_invalid_rules(self) -> None:
+        invalid = [
+            {"rules": []},
+            {"rules": [{"device": "fan_01", "sensor": "t", "aggregate": "median", "on_above": 1, "off_below": 0}]},
+            {"rules": [{"device": "fan_01", "sensor": "t", "on_above": 1, "off_above": 2}]},
+            {"rules": [{"device": "fan_01", "sensor": "t", "on_above": 1, "off_below": 2}]},
+            {
+                "rules": [
+                    {"device": "fan_01", "sensor": "t", "on_above": 1, "off_below": 0},
+                    {"device": "fan_01", "sensor": "h", "on_above": 1, "off_below": 0},
+                ]
+            },
+        ]
+        for spec in invalid:
+            with self.assertRaises(ValueError):
+                RulePlan.from_dict(spec)
+
+
+if __name__ == "__main__":
+    unittest.main()
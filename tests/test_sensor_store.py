@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+import unittest
+
+from bridge.sensor_store import COLUMNS, SensorStore
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+
+def sample(temp: float, lux: float = 300.0, pir: int = 0, raw: int = 512) -> dict:
+    return {"pir": pir, "dht11_temp_c": temp, "dht11_humidity": 55.0, "lm393_raw": raw, "lm393_lux": lux}
+
+
+class SensorStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _store(self, **kwargs) -> SensorStore:
+        store = SensorStore(self.directory, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_scan_returns_typed_columns_for_time_range(self) -> None:
+        store = self._store(segment_rows=4)
+        for second in range(10):
+            store.append("rpi-01", sample(20.0 + second, pir=second % 2), ts=1_000.0 + second)
+
+        data = store.scan(1_002.0, 1_007.0)
+
+        self.assertEqual(set(data), set(COLUMNS))
+        self.assertEqual(list(data["ts"]), [1_002.0, 1_003.0, 1_004.0, 1_005.0, 1_006.0])
+        self.assertEqual(list(data["dht11_temp_c"]), [22.0, 23.0, 24.0, 25.0, 26.0])
+        self.assertEqual(list(data["pir"]), [0, 1, 0, 1, 0])
+        self.assertEqual(data["lm393_raw"].typecode, "H")
+
+    def test_ring_drops_oldest_segments(self) -> None:
+        store = self._store(segment_rows=4, max_segments=2)
+        for second in range(12):
+            store.append("rpi-01", sample(20.0), ts=float(second))
+
+        self.assertEqual(list(store.scan(columns=["ts"])["ts"]), [4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0])
+        self.assertEqual(store.stats()["segments"], 2)
+        self.assertEqual(store.stats()["dropped_segments"], 1)
+        self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith(".seg")]), 2)
+
+    def test_device_filter_and_latest(self) -> None:
+        store = self._store(segment_rows=8)
+        store.append("kitchen", sample(21.0), ts=1.0)
+        store.append("garage", sample(11.0), ts=2.0)
+        store.append("kitchen", sample(22.0), ts=3.0)
+
+        kitchen = store.scan(columns=["ts", "dht11_temp_c"], device_id="kitchen")
+        self.assertEqual(list(kitchen["ts"]), [1.0, 3.0])
+        self.assertEqual(list(store.scan(device_id="attic")["ts"]), [])
+        self.assertEqual(store.latest("garage")["dht11_temp_c"], 11.0)
+        self.assertEqual(store.latest()["device"], "kitchen")
+
+    def test_aggregate_per_bucket(self) -> None:
+        store = self._store()
+        for second, temp in enumerate([20.0, 22.0, 30.0, 34.0, 27.0]):
+            store.append("rpi-01", sample(temp), ts=60.0 + second * 30)
+
+        rows = store.aggregate(columns=["dht11_temp_c"], bucket_seconds=60)
+
+        self.assertEqual([(row["start"], row["count"]) for row in rows], [(60, 2), (120, 2), (180, 1)])
+        self.assertEqual(rows[1]["columns"]["dht11_temp_c"], {"min": 30.0, "max": 34.0, "mean": 32.0})
+        (total,) = store.aggregate(columns=["dht11_temp_c"])
+        self.assertEqual(total["count"], 5)
+        self.assertAlmostEqual(total["columns"]["dht11_temp_c"]["mean"], 26.6, places=5)
+
+    def test_wall_clock_step_back_is_clamped(self) -> None:
+        store = self._store()
+        store.append("rpi-01", sample(20.0), ts=100.0)
+        store.append("rpi-01", sample(21.0), ts=90.0)
+
+        self.assertEqual(list(store.scan(columns=["ts"])["ts"]), [100.0, 100.0])
+        self.assertEqual(store.stats()["clamped"], 1)
+
+    def test_reopen_resumes_segment_and_readonly_reader_sees_rows(self) -> None:
+        store = SensorStore(self.directory, segment_rows=8)
+        store.append("rpi-01", sample(20.0), ts=1.0)
+        store.close()
+
+        store = self._store(segment_rows=8)
+        reader = SensorStore(self.directory, readonly=True)
+        store.append("rpi-02", sample(21.0), ts=2.0)
+
+        self.assertEqual(store.stats()["segments"], 1)
+        data = reader.scan(columns=["ts", "device"])
+        self.assertEqual(list(data["ts"]), [1.0, 2.0])
+        self.assertEqual(reader.device_name(data["device"][1]), "rpi-02")
+        self.assertEqual(list(reader.scan(device_id="rpi-02", columns=["ts"])["ts"]), [2.0])
+        with open(os.path.join(self.directory, "devices.json"), encoding="utf-8") as handle:
+            self.assertEqual(json.load(handle), ["rpi-01", "rpi-02"])
+        with self.assertRaises(RuntimeError):
+            reader.append("rpi-01", sample(20.0))
+
+    def test_append_coerces_float_readings_for_integer_columns(self) -> None:
+        store = self._store()
+        store.append("rpi-01", sample(20.0, pir=1.0, raw=512.0), ts=1.0)
+
+        row = store.latest()
+        self.assertEqual((row["pir"], row["lm393_raw"]), (1, 512))
+        with self.assertRaises(ValueError):
+            store.append("rpi-01", sample(20.0, raw=70_000), ts=2.0)
+        with self.assertRaises(ValueError):
+            store.append("rpi-01", sample(20.0, pir=float("inf")), ts=3.0)
+        self.assertEqual(store.stats()["appended"], 1)
+        self.assertEqual(len(store.scan()["ts"]), 1)
+
+    def test_rejects_unknown_columns(self) -> None:
+        with self.assertRaises(ValueError):
+            self._store().scan(columns=["co2"])
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_numpy_scan(self) -> None:
+        store = self._store(segment_rows=2)
+        for second in range(5):
+            store.append("kitchen" if second % 2 else "garage", sample(20.0 + second), ts=float(second))
+
+        data = store.scan(columns=["ts", "dht11_temp_c"], device_id="kitchen", numpy=True)
+
+        self.assertEqual(data["dht11_temp_c"].dtype, np.float32)
+        self.assertEqual(data["ts"].tolist(), [1.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import unittest
+
+from bridge.serial_hub import SerialHub, parse_port_specs
+
+
+class PipeSerial:
+    def __init__(self) -> None:
+        self.read_fd, self.write_fd = os.pipe()
+        self.closed = False
+
+    def fileno(self) -> int:
+        return self.read_fd
+
+    @property
+    def in_waiting(self) -> int:
+        return 4096
+
+    def read(self, size=1) -> bytes:
+        return os.read(self.read_fd, size)
+
+    def close(self) -> None:
+        if not self.closed:
+            os.close(self.read_fd)
+            os.close(self.write_fd)
+            self.closed = True
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SerialHubTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.devices = {}
+        self.present = ["/dev/ttyACM0", "/dev/ttyACM1"]
+        self.clock = FakeClock()
+
+        def factory(port, _baud, timeout=None):
+            if port not in self.present:
+                raise OSError(f"no such port {port}")
+            self.devices[port] = PipeSerial()
+            return self.devices[port]
+
+        self.hub = SerialHub(
+            parse_port_specs("/dev/ttyACM*"),
+            baud=9600,
+            device_id="rpi-01",
+            timeout=0.01,
+            rescan_interval=5.0,
+            serial_factory=factory,
+            glob_func=lambda _pattern: list(self.present),
+            clock=self.clock,
+        )
+
+    def tearDown(self) -> None:
+        self.hub.close()
+
+    def test_parse_port_specs_reads_explicit_device_ids(self) -> None:
+        self.assertEqual(
+            parse_port_specs("/dev/ttyACM0=kitchen, /dev/ttyUSB*"),
+            [("/dev/ttyACM0", "kitchen"), ("/dev/ttyUSB*", None)],
+        )
+
+    def test_poll_tags_frames_with_per_port_device_id(self) -> None:
+        self.hub.rescan()
+        os.write(self.devices["/dev/ttyACM0"].write_fd, b'{"a":1}\n')
+        os.write(self.devices["/dev/ttyACM1"].write_fd, b'{"b":2}\n{"b":3}\n')
+
+        frames = self.hub.poll()
+
+        self.assertCountEqual(
+            frames,
+            [("rpi-01-ttyACM0", b'{"a":1}'), ("rpi-01-ttyACM1", b'{"b":2}'), ("rpi-01-ttyACM1", b'{"b":3}')],
+        )
+
+    def test_rescan_picks_up_and_drops_hotplugged_ports(self) -> None:
+        self.hub.rescan()
+        self.assertEqual(self.hub.ports, ["/dev/ttyACM0", "/dev/ttyACM1"])
+
+        self.present = ["/dev/ttyACM1", "/dev/ttyACM2"]
+        self.clock.now = 10.0
+        self.hub.poll()
+
+        self.assertEqual(self.hub.ports, ["/dev/ttyACM1", "/dev/ttyACM2"])
+        self.assertTrue(self.devices["/dev/ttyACM0"].closed)
+
+    def test_single_explicit_port_uses_bridge_device_id(self) -> None:
+        hub = SerialHub(
+            parse_port_specs("/dev/ttyACM0"),
+            baud=9600,
+            device_id="rpi-01",
+            serial_factory=lambda *_args, **_kwargs: PipeSerial(),
+        )
+        try:
+            self.assertEqual(hub._discover(), {"/dev/ttyACM0": "rpi-01"})
+        finally:
+            hub.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,66 @@
+import os
 import unittest
 
-from bridge.serial_reader import parse_serial_line
+from bridge.serial_reader import (
+    BINARY_FRAME_MAX_ENCODED,
+    SerialReader,
+    cobs_decode,
+    cobs_encode,
+    encode_serial_frame,
+    parse_frame,
+    parse_serial_frame,
+    parse_serial_line,
+    _parse_json_line,
+)
+
+SAMPLE_VALUES = {
+    "pir": 1,
+    "dht11_temp_c": 28.5,
+    "dht11_humidity": 62.1,
+    "lm393_raw": 678,
+    "lm393_lux": 337.5,
+}
+
+
+class FakeSerial:
+    def __init__(self, chunks) -> None:
+        self._chunks = list(chunks)
+        self.closed = False
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._chunks[0]) if self._chunks else 0
+
+    def read(self, size=1) -> bytes:
+        if not self._chunks:
+            return b""
+        chunk = self._chunks.pop(0)
+        if len(chunk) > size:
+            self._chunks.insert(0, chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class PipeSerial:
+    def __init__(self) -> None:
+        self.read_fd, self.write_fd = os.pipe()
+
+    def fileno(self) -> int:
+        return self.read_fd
+
+    @property
+    def in_waiting(self) -> int:
+        return 4096
+
+    def read(self, size=1) -> bytes:
+        return os.read(self.read_fd, size)
+
+    def close(self) -> None:
+        os.close(self.read_fd)
+        os.close(self.write_fd)
 
 
 class SerialReaderParsingTests(unittest.TestCase):
@@ -61,5 +121,161 @@ class SerialReaderParsingTests(unittest.TestCase):
             )
 
 
+class SerialReaderBatchedTests(unittest.TestCase):
+    def test_read_frames_splits_burst_into_frames(self) -> None:
+        fake = FakeSerial([b'{"pir":1}\n{"pir":0}\n{"pi', b'r":1}\n'])
+        reader = SerialReader("/dev/ttyACM0", 9600, serial_factory=lambda *_args, **_kwargs: fake)
+
+        self.assertEqual(reader.read_frames(), [b'{"pir":1}', b'{"pir":0}'])
+        self.assertEqual(reader.read_frames(), [b'{"pir":1}'])
+
+    def test_read_frames_skips_blank_lines_and_strips_carriage_returns(self) -> None:
+        fake = FakeSerial([b'\r\n{"pir":1}\r\n\n'])
+        reader = SerialReader("/dev/ttyACM0", 9600, serial_factory=lambda *_args, **_kwargs: fake)
+
+        self.assertEqual(reader.read_frames(), [b'{"pir":1}'])
+
+    def test_read_frames_discards_oversized_partial_frame(self) -> None:
+        fake = FakeSerial([b"x" * 2048, b'{"pir":1}\n'])
+        reader = SerialReader("/dev/ttyACM0", 9600, serial_factory=lambda *_args, **_kwargs: fake)
+
+        self.assertEqual(reader.read_frames(), [])
+        self.assertEqual(reader.read_frames(), [b'{"pir":1}'])
+
+    def test_read_frames_waits_on_fd_readiness(self) -> None:
+        pipe = PipeSerial()
+        reader = SerialReader("/dev/ttyACM0", 9600, timeout=0.01, serial_factory=lambda *_args, **_kwargs: pipe)
+
+        try:
+            self.assertEqual(reader.read_frames(), [])
+
+            os.write(pipe.write_fd, b'{"pir":1}\n{"pir":0}\n')
+            self.assertEqual(reader.read_frames(), [b'{"pir":1}', b'{"pir":0}'])
+        finally:
+            reader.close()
+
+    def test_parse_serial_line_accepts_bytes_frame(self) -> None:
+        frame = b'{"pir":0,"dht11_temp_c":28.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}'
+
+        self.assertEqual(parse_serial_line(frame)["lm393_raw"], 678)
+
+
+class FastPathParsingTests(unittest.TestCase):
+    FRAMES = [
+        b'{"pir":1,"dht11_temp_c":28.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"pir":0,"dht11_temp_c":0.0,"dht11_humidity":20.0,"lm393_raw":0,"lm393_lux":0.0}',
+        b'{"pir":2,"dht11_temp_c":28.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"pir":1,"dht11_temp_c":55.0,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"pir":1,"dht11_temp_c":28.5,"dht11_humidity":95.0,"lm393_raw":1050,"lm393_lux":337.5}',
+        b'{"pir":1,"dht11_temp_c":28,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":1e3}',
+        b'{"pir":1,"dht11_temp_c":-1.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"pir":1,"dht11_temp_c":05.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"dht11_temp_c":28.5,"pir":1,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"pir":true,"dht11_temp_c":28.5,"dht11_humidity":62.0,"lm393_raw":678,"lm393_lux":337.5}',
+        b'{"pir":1}',
+        b"not-json",
+    ]
+
+    def _generic(self, frame: bytes):
+        try:
+            return _parse_json_line(frame.decode("utf-8", errors="ignore"))
+        except ValueError as exc:
+            return str(exc)
+
+    def _fast(self, frame):
+        try:
+            return parse_serial_line(frame)
+        except ValueError as exc:
+            return str(exc)
+
+    def test_fast_path_matches_generic_results_and_errors(self) -> None:
+        for frame in self.FRAMES:
+            with self.subTest(frame=frame):
+                expected = self._generic(frame)
+                self.assertEqual(self._fast(frame), expected)
+                self.assertEqual(self._fast(memoryview(frame)), expected)
+
+    def test_fast_path_preserves_int_and_float_types(self) -> None:
+        parsed = parse_serial_line(self.FRAMES[0])
+
+        self.assertIsInstance(parsed["pir"], int)
+        self.assertIsInstance(parsed["lm393_raw"], int)
+        self.assertIsInstance(parsed["dht11_temp_c"], float)
+
+
+class BinaryFrameTests(unittest.TestCase):
+    def test_cobs_round_trip_removes_zero_bytes(self) -> None:
+        data = b"\x00\x01\x00\x00\x02" + bytes(range(1, 255)) + b"\x00"
+
+        encoded = cobs_encode(data)
+
+        self.assertNotIn(b"\x00", encoded)
+        self.assertEqual(bytes(cobs_decode(encoded)), data)
+
+    def test_parse_serial_frame_round_trips_json_values(self) -> None:
+        frame = encode_serial_frame(SAMPLE_VALUES)
+
+        self.assertLessEqual(len(frame), BINARY_FRAME_MAX_ENCODED)
+        self.assertEqual(parse_serial_frame(frame[:-1]), SAMPLE_VALUES)
+
+    def test_parse_serial_frame_rejects_crc_mismatch(self) -> None:
+        decoded = cobs_decode(encode_serial_frame(SAMPLE_VALUES)[:-1])
+        decoded[3] ^= 0x01
+
+        with self.assertRaisesRegex(ValueError, "CRC mismatch"):
+            parse_serial_frame(cobs_encode(bytes(decoded)))
+
+    def test_parse_serial_frame_rejects_truncated_frame(self) -> None:
+        with self.assertRaisesRegex(ValueError, "Binary frame must be"):
+            parse_serial_frame(cobs_encode(b"\x01\x01\x02"))
+
+    def test_parse_serial_frame_applies_range_validation(self) -> None:
+        frame = encode_serial_frame(dict(SAMPLE_VALUES, dht11_humidity=95.0))
+
+        with self.assertRaisesRegex(ValueError, "dht11_humidity out of range"):
+            parse_serial_frame(frame[:-1])
+
+    def test_reader_auto_detects_binary_frames(self) -> None:
+        stream = encode_serial_frame(SAMPLE_VALUES) * 3
+        fake = FakeSerial([stream[:5], stream[5:]])
+        reader = SerialReader(
+            "/dev/ttyACM0",
+            9600,
+            frame_format="auto",
+            serial_factory=lambda *_args, **_kwargs: fake,
+        )
+
+        frames = reader.read_frames() + reader.read_frames()
+
+        self.assertEqual(len(frames), 3)
+        self.assertEqual([parse_frame(frame) for frame in frames], [SAMPLE_VALUES] * 3)
+
+    def test_reader_auto_detects_json_lines(self) -> None:
+        line = b'{"pir":1,"dht11_temp_c":28.5,"dht11_humidity":62.1,"lm393_raw":678,"lm393_lux":337.5}\n'
+        fake = FakeSerial([line])
+        reader = SerialReader(
+            "/dev/ttyACM0",
+            9600,
+            frame_format="auto",
+            serial_factory=lambda *_args, **_kwargs: fake,
+        )
+
+        frames = reader.read_frames()
+
+        self.assertEqual([parse_frame(frame) for frame in frames], [SAMPLE_VALUES])
+
+    def test_parse_frame_routes_on_configured_format(self) -> None:
+        line = b' x{"pir":1}'
+        with self.assertRaisesRegex(ValueError, "Invalid JSON frame"):
+            parse_frame(line)
+        with self.assertRaisesRegex(ValueError, "Invalid JSON frame"):
+            parse_frame(line, "json")
+        with self.assertRaisesRegex(ValueError, "Invalid binary frame|Binary frame"):
+            parse_frame(line, "binary")
+        self.assertEqual(parse_frame(encode_serial_frame(SAMPLE_VALUES)[:-1], "binary"), SAMPLE_VALUES)
+        with self.assertRaisesRegex(ValueError, "Invalid binary frame"):
+            parse_frame('{"pir":1}', "binary")
+
+
 if __name__ == "__main__":
     unittest.main()
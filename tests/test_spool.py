@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+from bridge.spool import Spool
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Recorder:
+    def __init__(self, fail_after: int | None = None) -> None:
+        self.published = []
+        self.fail_after = fail_after
+
+    def __call__(self, topic: str, payload: str) -> bool:
+        if self.fail_after is not None and len(self.published) >= self.fail_after:
+            return False
+        self.published.append((topic, payload))
+        return True
+
+
+class SpoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.directory = self._tmp.name
+        self.wall = FakeClock(1_700_000_000.0)
+        self.mono = FakeClock()
+
+    def _spool(self, **kwargs) -> Spool:
+        kwargs.setdefault("drain_rate", 1000.0)
+        spool = Spool(self.directory, clock=self.wall, monotonic=self.mono, **kwargs)
+        self.addCleanup(spool.close)
+        return spool
+
+    def test_drains_in_order_across_segments(self) -> None:
+        spool = self._spool(segment_bytes=64)
+        for idx in range(10):
+            spool.append("home/pi/sensors/all", f'{{"seq":{idx}}}')
+        self.assertGreater(spool.stats()["segments"], 1)
+
+        recorder = Recorder()
+        self.assertEqual(spool.drain(recorder), 10)
+        self.assertEqual([payload for _topic, payload in recorder.published], [f'{{"seq":{idx}}}' for idx in range(10)])
+        self.assertEqual(spool.pending_bytes, 0)
+        self.assertEqual(spool.stats()["segments"], 1)
+
+    def test_failed_publish_keeps_position(self) -> None:
+        spool = self._spool()
+        for idx in range(3):
+            spool.append("t", str(idx))
+
+        self.assertEqual(spool.drain(Recorder(fail_after=1)), 1)
+        recorder = Recorder()
+        spool.drain(recorder)
+        self.assertEqual(recorder.published, [("t", "1"), ("t", "2")])
+
+    def test_offset_index_survives_restart(self) -> None:
+        spool = self._spool(use_mmap=True)
+        for idx in range(4):
+            spool.append("t", str(idx))
+        spool.drain(Recorder(fail_after=2))
+        spool.close()
+
+        reopened = self._spool(use_mmap=True)
+        recorder = Recorder()
+        self.assertEqual(reopened.drain(recorder), 2)
+        self.assertEqual(recorder.published, [("t", "2"), ("t", "3")])
+        reopened.close()
+
+    def test_drain_is_rate_limited(self) -> None:
+        spool = self._spool(drain_rate=2.0)
+        for idx in range(5):
+            spool.append("t", str(idx))
+
+        self.assertEqual(spool.drain(Recorder()), 2)
+        self.assertEqual(spool.drain(Recorder()), 0)
+        self.mono.now += 1.0
+        self.assertEqual(spool.drain(Recorder()), 2)
+
+    def test_max_bytes_drops_oldest_segments(self) -> None:
+        spool = self._spool(segment_bytes=64, max_bytes=128)
+        for idx in range(20):
+            spool.append("t", f"payload-{idx:02d}")
+
+        self.assertLessEqual(spool.pending_bytes, 128)
+        self.assertGreater(spool.stats()["dropped_bytes"], 0)
+        recorder = Recorder()
+        spool.drain(recorder)
+        self.assertEqual(recorder.published[-1], ("t", "payload-19"))
+        self.assertNotIn(("t", "payload-00"), recorder.published)
+
+    def test_expired_records_are_skipped(self) -> None:
+        spool = self._spool(max_age_seconds=60)
+        spool.append("t", "old")
+        self.wall.now += 120
+        spool.append("t", "fresh")
+
+        recorder = Recorder()
+        spool.drain(recorder)
+        self.assertEqual(recorder.published, [("t", "fresh")])
+        self.assertEqual(spool.stats()["expired"], 1)
+
+    def test_torn_tail_record_is_ignored(self) -> None:
+        spool = self._spool()
+        spool.append("t", "complete")
+        spool.close()
+        segment = sorted(name for name in os.listdir(self.directory) if name.endswith(".log"))[0]
+        with open(os.path.join(self.directory, segment), "ab") as handle:
+            handle.write(b"\x20\x00")
+
+        recorder = Recorder()
+        self._spool().drain(recorder)
+        self.assertEqual(recorder.published, [("t", "complete")])
+
+
+if __name__ == "__main__":
+    unittest.main()